@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.audio_codec import CODECS
+from shared.protocol import AUDIO_FRAME_MS
+
+def test_signal(sample_rate, seconds):
+    """Speech-like test audio: a gliding harmonic tone with syllable-rate amplitude and a little noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    audio = 6000 * voice * envelope + 200 * rng.standard_normal(len(t))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+def load_audio(path):
+    import soundfile as sf
+    audio, sample_rate = sf.read(path, dtype="int16", always_2d=True)
+    return audio[:, 0].copy(), sample_rate
+
+def bench(codec, audio, sample_rate, frame_ms):
+    frame = int(sample_rate * frame_ms / 1000)
+    frames = [audio[i:i + frame].tobytes() for i in range(0, len(audio), frame)]
+    seconds = len(audio) / sample_rate
+
+    encoder, decoder = codec.encoder(), codec.decoder()
+    start = time.perf_counter()
+    encoded = [encoder.encode(f) for f in frames]
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = np.frombuffer(b"".join(decoder.decode(e) for e in encoded), dtype=np.int16)
+    decode_time = time.perf_counter() - start
+
+    error = decoded.astype(np.float64) - audio
+    noise = np.mean(error ** 2)
+    snr = 10 * np.log10(np.mean(audio.astype(np.float64) ** 2) / noise) if noise else float("inf")
+    wire_bytes = sum(len(e) for e in encoded)
+    return {
+        "kbit_s": wire_bytes * 8 / seconds / 1000,
+        "encode_ms_per_s": encode_time * 1000 / seconds,
+        "decode_ms_per_s": decode_time * 1000 / seconds,
+        "snr_db": snr,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandwidth and CPU cost of the WebSocket audio codecs")
+    parser.add_argument("--wav", help="audio file to use instead of the synthetic signal")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--frame_ms", type=int, default=AUDIO_FRAME_MS)
+    args = parser.parse_args()
+
+    if args.wav:
+        inputs = [(os.path.basename(args.wav),) + load_audio(args.wav)]
+    else:
+        # Microphone uplink and TTS downlink rates
+        inputs = [(f"synthetic {rate} Hz", test_signal(rate, args.seconds), rate) for rate in (16000, 24000)]
+
+    print(f"{'input':<22}{'codec':<8}{'kbit/s':>9}{'enc ms/s':>10}{'dec ms/s':>10}{'SNR dB':>9}")
+    for label, audio, sample_rate in inputs:
+        for name, codec in CODECS.items():
+            r = bench(codec, audio, sample_rate, args.frame_ms)
+            print(f"{label:<22}{name:<8}{r['kbit_s']:>9.1f}{r['encode_ms_per_s']:>10.2f}"
+                  f"{r['decode_ms_per_s']:>10.2f}{r['snr_db']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
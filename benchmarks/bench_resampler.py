@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.resampler import StreamingResampler, polyphase_bank
+from benchmarks.bench_codecs import test_signal
+
+def sentences(audio, sample_rate, sentence_s):
+    size = int(sample_rate * sentence_s)
+    return [audio[i:i + size].tobytes() for i in range(0, len(audio), size)]
+
+def run_streaming(pieces, src, dst, fresh_filter):
+    """
+    One resampler for the whole reply; fresh_filter rebuilds its filter bank
+    for every piece and keeps the stream state, so only the filter design differs.
+    """
+    resampler = StreamingResampler(src, dst)
+    start = time.perf_counter()
+    for piece in pieces:
+        if fresh_filter:
+            polyphase_bank.cache_clear()
+            resampler.up, resampler.down, resampler.bank, _ = polyphase_bank(src, dst)
+        resampler.process(piece)
+    resampler.flush()
+    return time.perf_counter() - start
+
+def run_scipy(pieces, src, dst):
+    from scipy.signal import resample_poly
+    start = time.perf_counter()
+    for piece in pieces:
+        resample_poly(np.frombuffer(piece, dtype=np.int16).astype(np.float32), dst, src)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of resampling TTS audio to client playback rates")
+    parser.add_argument("--src_rate", type=int, default=24000, help="TTS output rate (Kokoro: 24 kHz)")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--sentence_s", type=float, default=2.0, help="audio per TTS sentence")
+    parser.add_argument("--rates", default="8000,16000,22050,44100,48000")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args()
+
+    src = args.src_rate
+    audio = test_signal(src, args.seconds)
+    pieces = sentences(audio, src, args.sentence_s)
+    methods = {
+        "cached": lambda dst: run_streaming(pieces, src, dst, False),
+        "fresh filter": lambda dst: run_streaming(pieces, src, dst, True),
+    }
+    try:
+        import scipy # noqa: F401
+        methods["scipy"] = lambda dst: run_scipy(pieces, src, dst)
+    except ImportError:
+        pass
+
+    print(f"{src} Hz input, {args.seconds:g} s in {len(pieces)} sentences")
+    print(f"{'output':<10}{'method':<14}{'Msamples/s':>12}{'x realtime':>12}")
+    for dst in (int(r) for r in args.rates.split(",")):
+        for name, run in methods.items():
+            elapsed = min(run(dst) for _ in range(args.repeat))
+            print(f"{dst:<10}{name:<14}{len(audio) / elapsed / 1e6:>12.2f}{args.seconds / elapsed:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.thread_budget import ThreadBudget, available_cpus
+
+SENTENCE = "The quick brown fox jumps over the lazy dog, and then it runs back home for dinner."
+
+def parse_budget(spec, pin):
+    """'vad=1,tts=3' or with inter-op threads and workers, 'tts=1:1x3' (three 1-thread workers)."""
+    budget = ThreadBudget(pin=pin)
+    for part in spec.split(","):
+        name, value = part.split("=")
+        threads, _, workers = value.partition("x")
+        intra, _, inter = threads.partition(":")
+        budget.assign(name.strip(), int(intra), int(inter or 1), int(workers or 1))
+    return budget
+
+def default_budgets(cpus):
+    budgets = [f"vad=1,tts={max(1, cpus - 1)}", f"vad=1,tts=1x{max(1, cpus - 1)}",
+               # Roughly the old defaults: every engine sized to the whole machine
+               f"vad={cpus},tts={cpus}"]
+    if cpus >= 4:
+        budgets.append(f"vad=1,tts={(cpus - 1) // 2}x2")
+    return list(dict.fromkeys(budgets)) # small hosts repeat themselves
+
+def vad_worker(budget, index, args, ready, stop, results):
+    from server.vad_service import OnnxVADService
+    budget.pin("vad", index)
+    service = OnnxVADService(args.vad_model, threads=budget.threads("vad"),
+                             options=budget.session_options("vad", index))
+    service.ensure_loaded()
+    sessions = [service.create_session() for _ in range(args.sessions)]
+    frames = np.random.default_rng(index).uniform(-0.1, 0.1, (args.sessions, service.window_size)).astype(np.float32)
+    ready.wait()
+    windows, latencies = 0, []
+    while not stop.is_set():
+        start = time.perf_counter()
+        service.infer_batch(sessions, frames)
+        latencies.append(time.perf_counter() - start)
+        windows += len(sessions)
+    results.append(("vad", windows, latencies))
+
+def tts_worker(budget, index, args, ready, stop, results):
+    from server.tts_service import TTSService, SAMPLE_RATE
+    budget.pin("tts", index)
+    tts = TTSService(args.tts_model, args.voices, threads=budget.threads("tts"),
+                     options=budget.session_options("tts", index))
+    tts.generate_audio(SENTENCE) # warmup
+    ready.wait()
+    audio_s, latencies = 0.0, []
+    while not stop.is_set():
+        start = time.perf_counter()
+        pcm = tts.generate_audio(SENTENCE)
+        latencies.append(time.perf_counter() - start)
+        audio_s += len(pcm) / 2 / SAMPLE_RATE
+    results.append(("tts", audio_s, latencies))
+
+def run_budget(spec, args):
+    """Runs in a fresh process per budget: onnxruntime and torch thread settings do not reset."""
+    budget = parse_budget(spec, args.pin)
+    engines = {"vad": vad_worker}
+    if os.path.exists(args.tts_model):
+        engines["tts"] = tts_worker
+    workers = [(engines[name], index) for name, (_, _, count) in budget.engines.items() if name in engines
+               for index in range(count)]
+    ready = threading.Barrier(len(workers) + 1)
+    stop = threading.Event()
+    results = []
+    threads = [threading.Thread(target=fn, args=(budget, index, args, ready, stop, results)) for fn, index in workers]
+    for thread in threads:
+        thread.start()
+    ready.wait() # every model loaded and warmed up
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report = {"budget": spec, "threads": budget.total, "oversubscribed": budget.oversubscribed}
+    for name in engines:
+        done = [r for r in results if r[0] == name]
+        if not done:
+            continue
+        latencies = [l for r in done for l in r[2]]
+        report[name] = {"per_s": sum(r[1] for r in done) / args.seconds,
+                        "p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else None}
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="VAD and TTS throughput side by side under different thread budgets")
+    parser.add_argument("--budgets", default=None,
+                        help="';'-separated budgets like 'vad=1,tts=3;vad=1,tts=1x3' (default: a few splits of this host)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured time per budget")
+    parser.add_argument("--sessions", type=int, default=8, help="VAD sessions per batch (concurrent streams)")
+    parser.add_argument("--vad_model", default=os.path.join(os.path.dirname(__file__), "..", "server", "silero_vad.onnx"))
+    parser.add_argument("--tts_model", default="kokoro-v0_19.onnx", help="skipped when the file does not exist")
+    parser.add_argument("--voices", default="voices.index.npz")
+    parser.add_argument("--pin", action="store_true", help="pin every engine to its own cores")
+    parser.add_argument("--run", help=argparse.SUPPRESS) # one budget, in a child process
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_budget(args.run, args)))
+        return
+
+    cpus = len(available_cpus())
+    budgets = args.budgets.split(";") if args.budgets else default_budgets(cpus)
+    if not os.path.exists(args.tts_model):
+        print(f"TTS model {args.tts_model} not found: measuring the VAD alone")
+    print(f"{cpus} CPUs, {args.sessions} VAD streams, {args.seconds:g} s per budget" + (", pinned" if args.pin else ""))
+    print(f"{'budget':<24}{'threads':>8}{'VAD win/s':>12}{'VAD p95 ms':>12}{'TTS x rt':>10}{'TTS p95 s':>11}")
+    for spec in budgets:
+        child = [sys.executable, __file__, "--run", spec] + sys.argv[1:]
+        output = subprocess.run(child, capture_output=True, text=True, check=True).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        vad, tts = report.get("vad"), report.get("tts")
+        threads = f"{report['threads']}{'!' if report['oversubscribed'] else ''}"
+        vad_cols = f"{vad['per_s']:>12.0f}{vad['p95_ms']:>12.2f}" if vad else f"{'-':>12}{'-':>12}"
+        tts_cols = f"{tts['per_s']:>10.2f}{tts['p95_ms'] / 1000:>11.2f}" if tts else f"{'-':>10}{'-':>11}"
+        print(f"{spec:<24}{threads:>8}{vad_cols}{tts_cols}")
+    print("'!' marks budgets with more threads than CPUs")
+
+if __name__ == "__main__":
+    main()
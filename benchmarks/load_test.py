@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+import websockets
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared import protocol
+from shared.audio_codec import get_codec
+
+SAMPLE_RATE = 16000
+
+def load_utterances(paths):
+    """
+    Read WAV files as 16 kHz mono int16 arrays. Files may be given directly or as directories.
+    """
+    import soundfile as sf
+    from scipy.signal import resample_poly
+
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path]
+    utterances = []
+    for path in files:
+        audio, rate = sf.read(path, dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+        if rate != SAMPLE_RATE:
+            audio = resample_poly(audio, SAMPLE_RATE, rate)
+        utterances.append((np.clip(audio, -1, 1) * 32767).astype(np.int16))
+    return utterances
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+class SimulatedDevice:
+    """
+    One client on /ws. Like a real microphone it streams audio in real time
+    for the whole session: silence for a random pause, an utterance, then
+    silence until the reply has been received.
+    """
+    def __init__(self, index, uri, utterances, args):
+        self.index = index
+        self.uri = uri
+        self.utterances = utterances
+        self.args = args
+        self.random = random.Random(args.seed + index)
+        self.chunk = SAMPLE_RATE * args.chunk_ms // 1000
+        self.turns = [] # dicts with latency and time to first audio, in seconds
+        self.timeouts = 0
+        self.interrupted = 0
+        self.errors = 0
+
+    async def run(self, deadline):
+        try:
+            async with websockets.connect(self.uri, max_size=None) as ws:
+                await ws.send(protocol.pack_control(protocol.MSG_HELLO, codecs=[self.args.codec]))
+                hello = protocol.parse_control(protocol.unpack_frame(await ws.recv()))
+                self.session_id = hello.get(protocol.KEY_SESSION, 0)
+                self.encoder = get_codec(hello.get(protocol.KEY_CODEC, protocol.DEFAULT_CODEC)).encoder()
+                self.seq = 0
+                self.next_send = asyncio.get_running_loop().time()
+                self.reply = None
+                receiver = asyncio.create_task(self.receive(ws))
+                try:
+                    await self.speak(ws, deadline)
+                finally:
+                    receiver.cancel()
+        except Exception as e:
+            self.errors += 1
+            print(f"Device {self.index} error: {e!r}", file=sys.stderr)
+
+    async def speak(self, ws, deadline):
+        loop = asyncio.get_running_loop()
+        silence = np.zeros(self.chunk, dtype=np.int16)
+        for _ in range(self.args.turns):
+            if loop.time() >= deadline:
+                break
+            pause = self.random.lognormvariate(np.log(self.args.pause_s), 0.4)
+            for _ in range(max(1, int(pause * 1000 / self.args.chunk_ms))):
+                await self.send(ws, silence)
+
+            audio = self.random.choice(self.utterances)
+            for start in range(0, len(audio), self.chunk):
+                await self.send(ws, audio[start:start + self.chunk])
+
+            # The turn is timed from the end of speech, as the server's endpointing sees it
+            self.reply = {"end": time.perf_counter(), "first_audio": None, "interrupted": False,
+                          "done": asyncio.Event()}
+            reply_deadline = loop.time() + self.args.turn_timeout
+            while not self.reply["done"].is_set():
+                if loop.time() >= reply_deadline:
+                    self.timeouts += 1
+                    break
+                await self.send(ws, silence)
+            else:
+                if self.reply["interrupted"]:
+                    self.interrupted += 1
+                else:
+                    done = self.reply["done_at"]
+                    first = self.reply["first_audio"] or done
+                    self.turns.append({"latency": done - self.reply["end"], "ttfa": first - self.reply["end"]})
+            self.reply = None
+
+    async def send(self, ws, samples):
+        # Paced on an absolute schedule so sending never drifts from real time
+        loop = asyncio.get_running_loop()
+        self.next_send += len(samples) / SAMPLE_RATE
+        await ws.send(protocol.pack_frame(protocol.FRAME_AUDIO, self.encoder.encode(samples.tobytes()),
+                                          self.session_id, self.seq))
+        self.seq += 1
+        await asyncio.sleep(max(0.0, self.next_send - loop.time()))
+
+    async def receive(self, ws):
+        async for message in ws:
+            frame = protocol.unpack_frame(message)
+            reply = self.reply
+            if reply is None:
+                continue
+            if frame.kind == protocol.FRAME_CONTROL:
+                if protocol.parse_control(frame).get(protocol.KEY_TYPE) == protocol.MSG_INTERRUPT:
+                    reply["interrupted"] = True
+                    reply["done"].set()
+                continue
+            if frame.kind != protocol.FRAME_AUDIO:
+                continue
+            now = time.perf_counter()
+            if reply["first_audio"] is None and len(frame.payload):
+                reply["first_audio"] = now
+            if frame.end_of_stream:
+                reply["done_at"] = now
+                reply["done"].set()
+
+
+def spawn_server(args):
+    """
+    Start the server with the offline STT/LLM/TTS stand-ins.
+    """
+    env = dict(os.environ, STT_BACKEND="fake", LLM_BACKEND="fake", TTS_BACKEND="stub",
+               FAKE_STT_MS=str(args.stt_ms), FAKE_LLM_FIRST_TOKEN_MS=str(args.llm_first_token_ms),
+               FAKE_LLM_TOKEN_MS=str(args.llm_token_ms), FAKE_TTS_MS=str(args.tts_ms),
+               FAKE_LATENCY_SIGMA=str(args.sigma), TTS_CACHE_DIR="", GROQ_API_KEY=os.getenv("GROQ_API_KEY", "unused"),
+               ACK_CLIPS="0") # time to first audio should measure the pipeline, not the filler clips
+    root = os.path.join(os.path.dirname(__file__), '..')
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(args.port),
+                             "--log-level", "warning"], cwd=root, env=env)
+
+async def wait_for_server(uri, timeout=120):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            async with websockets.connect(uri):
+                return
+        except (OSError, websockets.exceptions.WebSocketException):
+            if loop.time() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+async def run(args):
+    utterances = load_utterances(args.wav)
+    if not utterances:
+        raise SystemExit("No WAV files found; pass utterance recordings with --wav")
+
+    uri = args.uri or f"ws://localhost:{args.port}/ws"
+    server = spawn_server(args) if args.spawn else None
+    try:
+        await wait_for_server(uri)
+        devices = [SimulatedDevice(i, uri, utterances, args) for i in range(args.clients)]
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        deadline = loop.time() + args.duration_s
+        tasks = []
+        for device in devices:
+            tasks.append(asyncio.create_task(device.run(deadline)))
+            await asyncio.sleep(args.ramp_s / max(1, args.clients)) # stagger connections
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    turns = [t for d in devices for t in d.turns]
+    return {
+        "clients": args.clients,
+        "codec": args.codec,
+        "elapsed_s": round(elapsed, 2),
+        "turns": len(turns),
+        "turns_per_s": round(len(turns) / elapsed, 3) if elapsed else 0.0,
+        "timeouts": sum(d.timeouts for d in devices),
+        "interrupted": sum(d.interrupted for d in devices),
+        "errors": sum(d.errors for d in devices),
+        "turn_latency_s": percentiles([t["latency"] for t in turns]),
+        "time_to_first_audio_s": percentiles([t["ttfa"] for t in turns]),
+        "stand_ins": {"stt_ms": args.stt_ms, "llm_first_token_ms": args.llm_first_token_ms,
+                      "llm_token_ms": args.llm_token_ms, "tts_ms": args.tts_ms, "sigma": args.sigma}
+        if args.spawn else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the voice server with a swarm of simulated devices")
+    parser.add_argument("--wav", nargs="+", required=True, help="utterance WAV files or directories of them")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5, help="turns per client")
+    parser.add_argument("--duration_s", type=float, default=300, help="stop starting new turns after this")
+    parser.add_argument("--pause_s", type=float, default=1.5, help="median silence before each utterance")
+    parser.add_argument("--ramp_s", type=float, default=5, help="spread client connections over this long")
+    parser.add_argument("--turn_timeout", type=float, default=30)
+    parser.add_argument("--chunk_ms", type=int, default=20)
+    parser.add_argument("--codec", default="pcm")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--uri", help="server to test; default is the one started with --spawn")
+    parser.add_argument("--spawn", action="store_true", help="start the server with offline stand-ins")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stt_ms", type=int, default=300)
+    parser.add_argument("--llm_first_token_ms", type=int, default=250)
+    parser.add_argument("--llm_token_ms", type=int, default=15)
+    parser.add_argument("--tts_ms", type=int, default=150)
+    parser.add_argument("--sigma", type=float, default=0.3, help="log-normal spread of stand-in latencies")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
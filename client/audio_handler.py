@@ -2,13 +2,20 @@ import sounddevice as sd
 import numpy as np
 import queue
 import sys
+import time
+
+from client.jitter_buffer import JitterBuffer
 
 class AudioHandler:
-    def __init__(self, sample_rate=16000, channels=1):
+    def __init__(self, sample_rate=16000, channels=1, prebuffer_ms=60):
         self.sample_rate = sample_rate
         self.channels = channels
+        self.prebuffer_ms = prebuffer_ms
         self.q_rec = queue.Queue()
         self.recording = False
+        self.out_stream = None
+        self.jitter = None
+        self.stream_id = None
 
     def start_recording(self):
         self.recording = True
@@ -33,9 +40,16 @@ class AudioHandler:
         if status:
             print(status, file=sys.stderr)
         if self.recording:
-            self.q_rec.put(bytes(indata))
+            # Capture time of the first sample, in the protocol's wall-clock microseconds
+            latency = time_info.currentTime - time_info.inputBufferAdcTime
+            self.q_rec.put((time.time_ns() // 1000 - int(latency * 1e6), bytes(indata)))
 
     def get_chunk(self):
+        timed = self.get_timed_chunk()
+        return timed[1] if timed else None
+
+    def get_timed_chunk(self):
+        """(capture time in microseconds, PCM bytes), or None."""
         try:
             return self.q_rec.get_nowait()
         except queue.Empty:
@@ -51,3 +65,48 @@ class AudioHandler:
         sd.play(audio_np, self.sample_rate)
         sd.wait()
         print("Playback finished.")
+
+    def play_frame(self, frame, sample_rate: int):
+        """
+        Queue one decoded audio frame (shared.protocol.Frame) for playback.
+        The first frame of a new stream opens an output stream at sample_rate;
+        playback starts once prebuffer_ms of audio is buffered.
+        """
+        if frame.stream_id != self.stream_id:
+            self.stop_playback()
+            self.stream_id = frame.stream_id
+            self.jitter = JitterBuffer(int(sample_rate * self.prebuffer_ms / 1000))
+            self.out_stream = sd.OutputStream(
+                samplerate=sample_rate,
+                channels=1,
+                dtype='int16',
+                callback=self._play_callback
+            )
+            self.out_stream.start()
+            print("Playing audio response...")
+
+        self.jitter.put(frame.seq, frame.payload, frame.end_of_stream)
+
+    def _play_callback(self, outdata, frames, time_info, status):
+        if status:
+            print(status, file=sys.stderr)
+        self.jitter.read(outdata[:, 0])
+
+    def wait_playback(self):
+        """
+        Block until the current stream has been played out, then close it.
+        """
+        if self.jitter:
+            self.jitter.finished.wait()
+            if self.jitter.underruns:
+                print(f"Playback underruns: {self.jitter.underruns}")
+        self.stop_playback()
+        print("Playback finished.")
+
+    def stop_playback(self):
+        if self.out_stream:
+            self.out_stream.stop()
+            self.out_stream.close()
+            self.out_stream = None
+        self.jitter = None
+        self.stream_id = None
@@ -0,0 +1,85 @@
+import collections
+import threading
+import numpy as np
+
+class JitterBuffer:
+    """
+    Holds incoming reply audio between the network and the output stream.
+    Frames are released in sequence order (late or duplicate frames are
+    dropped). Playback only starts once prebuffer_samples are queued or the
+    stream has ended, and an underrun plays silence and re-enters prebuffering.
+    read() is called from the sounddevice callback thread, put() from the
+    network side.
+    """
+    def __init__(self, prebuffer_samples: int, max_out_of_order=16):
+        self.prebuffer_samples = prebuffer_samples
+        self.max_out_of_order = max_out_of_order
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.chunks = collections.deque()
+        self.offset = 0 # samples already read from chunks[0]
+        self.buffered = 0
+        self.pending = {} # seq -> (samples, end_of_stream), frames that arrived early
+        self.next_seq = 0
+        self.playing = False
+        self.ended = False
+        self.underruns = 0
+
+    def put(self, seq: int, pcm, end_of_stream=False):
+        """
+        Add one frame of int16 PCM bytes.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        with self.lock:
+            if seq < self.next_seq or seq in self.pending:
+                return # late or duplicate
+            self.pending[seq] = (samples, end_of_stream)
+
+            # A frame that never arrives must not stall the stream forever.
+            if len(self.pending) > self.max_out_of_order and self.next_seq not in self.pending:
+                self.next_seq = min(self.pending)
+
+            while self.next_seq in self.pending:
+                samples, eos = self.pending.pop(self.next_seq)
+                self.next_seq += 1
+                if len(samples):
+                    self.chunks.append(samples)
+                    self.buffered += len(samples)
+                if eos:
+                    self.ended = True
+                    self.pending.clear()
+                    break
+
+            if not self.playing and (self.buffered >= self.prebuffer_samples or self.ended):
+                self.playing = True
+            if self.ended and self.buffered == 0:
+                self.finished.set()
+
+    def read(self, out: np.ndarray) -> int:
+        """
+        Fill out (1-D int16) with buffered audio, padding with silence.
+        Returns the number of real samples written.
+        """
+        with self.lock:
+            written = 0
+            if self.playing:
+                while written < len(out) and self.chunks:
+                    chunk = self.chunks[0]
+                    n = min(len(out) - written, len(chunk) - self.offset)
+                    out[written:written + n] = chunk[self.offset:self.offset + n]
+                    written += n
+                    self.offset += n
+                    if self.offset == len(chunk):
+                        self.chunks.popleft()
+                        self.offset = 0
+                self.buffered -= written
+
+            out[written:] = 0
+            if self.buffered == 0:
+                if self.ended:
+                    self.finished.set()
+                elif self.playing and written < len(out):
+                    # Underrun: wait for the prebuffer to refill before resuming.
+                    self.underruns += 1
+                    self.playing = False
+            return written
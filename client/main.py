@@ -9,26 +9,39 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from client.wakeword_listener import WakewordListener
 from client.audio_handler import AudioHandler
 from client.network_client import NetworkClient
+from shared import protocol
+from shared.thread_budget import ThreadBudget, available_cpus
 
 async def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--checkpoint", default=r".\exp\wake_mdtc_noaug_avg\2.pt", help="wakeword model checkpoint")
     parser.add_argument("--config", default=r".\exp\wake_mdtc_noaug_avg\config.yaml", help="wakeword model config")
     parser.add_argument("--server_uri", default="ws://localhost:8000/ws", help="server websocket uri")
+    parser.add_argument("--codecs", default="adpcm,pcm", help="audio codecs to offer the server, preferred first")
+    parser.add_argument("--output_rate", type=int, default=0,
+                        help="playback rate to ask the server for, e.g. 48000 (0 uses the TTS model's rate)")
+    parser.add_argument("--prebuffer_ms", type=int, default=60, help="audio to buffer before reply playback starts")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="torch threads for the wakeword model (0: all cores but one, for audio I/O)")
     args = parser.parse_args()
 
+    # THREADS_WAKEWORD in the environment overrides the default as well
+    budget = ThreadBudget.from_env({"wakeword": args.threads or max(1, len(available_cpus()) - 1)})
+
     # Initialize components
     wakeword = WakewordListener(
         checkpoint_path=args.checkpoint,
         config_path=args.config,
-        threshold=0.7
+        threshold=0.7,
+        threads=budget.threads("wakeword")
     )
     
-    audio_handler = AudioHandler()
+    audio_handler = AudioHandler(prebuffer_ms=args.prebuffer_ms)
     network_client = NetworkClient(uri=args.server_uri)
     
     # Connect to server
     await network_client.connect()
+    await network_client.negotiate(args.codecs.split(","), args.output_rate)
     
     try:
         while True:
@@ -60,31 +73,36 @@ async def main():
                 
                 print("Recording command...")
                 for _ in range(50): # 50 * 0.1s = 5 seconds (approx)
-                    chunk = audio_handler.get_chunk()
-                    if chunk:
-                        await network_client.send_audio(chunk)
+                    timed = audio_handler.get_timed_chunk()
+                    if timed:
+                        capture_us, chunk = timed
+                        await network_client.send_audio(chunk, capture_us)
                     await asyncio.sleep(0.1)
                 
                 audio_handler.stop_recording()
                 print("Finished recording. Waiting for response...")
                 
                 # 3. Wait for Response
-                # We expect audio bytes back
-                response = await network_client.receive()
-                
-                if response:
-                    if isinstance(response, bytes):
-                        print(f"Received audio response: {len(response)} bytes")
-                        audio_handler.play_audio(response)
-                    elif isinstance(response, str):
-                        # Could be text message
-                        print(f"Received text: {response}")
-                        # If text, maybe audio follows?
-                        # My server sends text then audio.
-                        # So receive again.
-                        response_audio = await network_client.receive()
-                        if isinstance(response_audio, bytes):
-                             audio_handler.play_audio(response_audio)
+                # The server streams the reply as text frames and sequenced audio
+                # frames; playback starts as soon as the jitter buffer is primed.
+                while True:
+                    frame = await network_client.receive()
+                    if frame is None:
+                        break
+                    if frame.kind == protocol.FRAME_AUDIO:
+                        audio_handler.play_frame(frame, network_client.output_rate)
+                        if frame.end_of_stream:
+                            break
+                    elif frame.kind == protocol.FRAME_TEXT:
+                        print(f"Received text: {bytes(frame.payload).decode('utf-8')}")
+                    elif frame.kind == protocol.FRAME_CONTROL:
+                        message = protocol.parse_control(frame)
+                        if message.get(protocol.KEY_TYPE) == protocol.MSG_INTERRUPT:
+                            # Reply was cut off (barge-in), drop whatever is still queued
+                            audio_handler.stop_playback()
+                            break
+
+                await asyncio.to_thread(audio_handler.wait_playback)
                 
     except KeyboardInterrupt:
         print("Exiting...")
@@ -1,11 +1,19 @@
 import websockets
 import asyncio
-import json
+
+from shared import protocol
+from shared.audio_codec import CODECS, get_codec
 
 class NetworkClient:
     def __init__(self, uri="ws://localhost:8000/ws"):
         self.uri = uri
         self.websocket = None
+        self.session_id = 0 # Assigned by the server in the hello reply
+        self.seq = 0 # Uplink audio frames sent
+        self.codec = protocol.DEFAULT_CODEC
+        self.output_rate = protocol.DEFAULT_OUTPUT_RATE
+        self.encoder = get_codec(self.codec).encoder()
+        self.decoder = get_codec(self.codec).decoder()
 
     async def connect(self):
         try:
@@ -14,23 +22,58 @@ class NetworkClient:
         except Exception as e:
             print(f"Connection failed: {e}")
 
-    async def send_audio(self, audio_data: bytes):
+    async def negotiate(self, codecs=("adpcm", "pcm"), output_rate=None):
+        """
+        Agree on the audio codec with the server. Call right after connect().
+        output_rate asks for reply audio at that rate instead of the TTS model's own.
+        """
+        if not self.websocket:
+            return
+        hello = {protocol.KEY_CODECS: [name for name in codecs if name in CODECS]}
+        if output_rate:
+            hello[protocol.KEY_SAMPLE_RATE] = output_rate
+        await self.send_control(protocol.MSG_HELLO, **hello)
+        reply = protocol.parse_control(protocol.unpack_frame(await self.websocket.recv()))
+        self.codec = reply.get(protocol.KEY_CODEC, protocol.DEFAULT_CODEC)
+        self.session_id = reply.get(protocol.KEY_SESSION, 0)
+        self.output_rate = reply.get(protocol.KEY_SAMPLE_RATE, protocol.DEFAULT_OUTPUT_RATE)
+        self.encoder = get_codec(self.codec).encoder()
+        self.decoder = get_codec(self.codec).decoder()
+        print(f"Session {self.session_id}: audio codec {self.codec}, replies at {self.output_rate} Hz")
+
+    async def send_audio(self, audio_data: bytes, capture_us=None):
+        """
+        Send one mic chunk as an audio frame, stamped with its capture time.
+        """
         if self.websocket:
-            await self.websocket.send(audio_data) # Send raw bytes
+            await self.websocket.send(protocol.pack_frame(
+                protocol.FRAME_AUDIO, self.encoder.encode(audio_data), self.session_id, self.seq,
+                timestamp_us=capture_us))
+            self.seq += 1
 
     async def send_text(self, text: str):
         if self.websocket:
-            message = json.dumps({"text": text})
-            await self.websocket.send(message)
+            await self.websocket.send(protocol.pack_text(text, self.session_id))
+
+    async def send_control(self, msg_type: str, **data):
+        if self.websocket:
+            await self.websocket.send(protocol.pack_control(msg_type, self.session_id, **data))
 
     async def receive(self):
+        """
+        Next frame from the server, with audio payloads decoded to int16 PCM.
+        None once the connection is closed.
+        """
         if self.websocket:
             try:
                 message = await self.websocket.recv()
-                return message
             except websockets.exceptions.ConnectionClosed:
                 print("Connection closed")
                 return None
+            frame = protocol.unpack_frame(message)
+            if frame.kind == protocol.FRAME_AUDIO:
+                frame = frame._replace(payload=self.decoder.decode(frame.payload))
+            return frame
         return None
 
     async def close(self):
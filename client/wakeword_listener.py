@@ -20,9 +20,11 @@ if wekws_path not in sys.path:
 
 from wekws.model.kws_model import init_model
 from wekws.utils.checkpoint import load_checkpoint
+from shared.thread_budget import configure_torch
 
 class WakewordListener:
-    def __init__(self, checkpoint_path, config_path, threshold=0.7, buffer_sec=2.0, chunk_sec=0.5, device_index=None):
+    def __init__(self, checkpoint_path, config_path, threshold=0.7, buffer_sec=2.0, chunk_sec=0.5, device_index=None,
+                 threads=None):
         self.checkpoint_path = checkpoint_path
         self.config_path = config_path
         self.threshold = threshold
@@ -31,6 +33,9 @@ class WakewordListener:
         self.device_index = device_index
         
         self.device = torch.device("cpu")
+        # torch defaults to one thread per core, leaving none for audio capture and playback
+        if threads:
+            configure_torch(threads)
         self.model = self._load_kws_model()
         self.input_dim = self.model.idim
         self.sample_rate = 16000
@@ -1,27 +1,18 @@
-import json
-import numpy as np
-import os
+import sys
+from server.voice_store import convert_json, convert_npz
 
-def convert_voices():
-    print("Loading voices.json...")
-    with open("server/voices.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    print(f"Found {len(data)} voices.")
-    
-    voices = {}
-    for name, embedding in data.items():
-        # Embedding is a list of lists or similar. 
-        # Kokoro expects numpy array.
-        # Based on voices.json header "af": [[...]], it looks like 2D array?
-        # Let's convert to float32 array.
-        voices[name] = np.array(embedding, dtype=np.float32)
-        
-    print("Saving to server/voices.bin...")
-    # Use savez to save as compressed npz (or uncompressed)
-    # We name it .bin because that's what some docs suggested, but np.load handles it.
-    np.savez("server/voices.bin", **voices)
-    print("Conversion complete.")
+def convert_voices(source="server/voices.json", index_path="server/voices.index.npz"):
+    """
+    Build the memory-mapped voice store (voices.index.npz + voices.f32) that
+    TTSService reads, from voices.json or from an npz of voices (e.g. the old
+    server/voices.bin.npz). The JSON is streamed, never loaded whole.
+    """
+    print(f"Converting {source} to the voice store {index_path}...")
+    if source.endswith(".npz"):
+        count = convert_npz(source, index_path)
+    else:
+        count = convert_json(source, index_path)
+    print(f"Conversion complete: {count} voices.")
 
 if __name__ == "__main__":
-    convert_voices()
+    convert_voices(*sys.argv[1:3])
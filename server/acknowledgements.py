@@ -0,0 +1,120 @@
+import random
+import asyncio
+import numpy as np
+from shared import protocol
+from shared.audio_codec import get_codec
+from server.resampler import StreamingResampler
+
+DEFAULT_PHRASES = ("Mm-hmm.", "Okay.", "Let me think.", "Hmm, let me see.")
+
+
+class LatencyPredictor:
+    """
+    Exponentially weighted average of end of speech to first reply audio.
+    Predicts initial_ms until a turn has been measured (by default 0, so no
+    acknowledgement is played before the pipeline is known to be slow); the
+    first measurement then replaces it.
+    """
+    def __init__(self, initial_ms=0, alpha=0.2):
+        self.estimate = initial_ms / 1000
+        self.alpha = alpha
+        self.observed = False
+
+    def observe(self, seconds: float):
+        if not self.observed:
+            self.observed = True
+            self.estimate = seconds
+            return
+        self.estimate += self.alpha * (seconds - self.estimate)
+
+    def predict_ms(self) -> float:
+        return self.estimate * 1000
+
+
+class AcknowledgementBank:
+    """
+    Short filler clips ("Mm-hmm", "Let me think") synthesized once at startup
+    and kept in memory as ready-to-send frames, so a turn can start playing
+    one the moment speech ends without waiting for, or adding to, TTS work.
+    Frames are resampled and encoded per (output rate, codec) on executor (None
+    for the loop's default), off the event loop: at load for the pairs given
+    and when a connection negotiates another one. pick() never prepares frames
+    itself; it skips a pair whose frames are not ready yet.
+    """
+    def __init__(self, phrases=DEFAULT_PHRASES, sample_rate=24000, frame_ms=protocol.AUDIO_FRAME_MS, seed=None,
+                 executor=None):
+        self.phrases = list(phrases)
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.executor = executor
+        self.clips = [] # int16 PCM at sample_rate, one per synthesized phrase
+        self.frames = {} # (output_rate, codec) -> per clip, list of (encoded payload, pcm bytes)
+        self._preparing = {} # (output_rate, codec) -> future of its frames
+        self.random = random.Random(seed)
+        self.last = None
+
+    async def load(self, synthesize, pairs=()):
+        """
+        synthesize: async fn(text) -> int16 PCM bytes at sample_rate. Frames for
+        pairs, (output_rate, codec) tuples, are ready when this returns.
+        """
+        for phrase in self.phrases:
+            pcm = bytes(await synthesize(phrase))
+            if pcm:
+                self.clips.append(pcm)
+        self.frames.clear()
+        self._preparing.clear()
+        await asyncio.gather(*(self.prepare(output_rate, codec) for output_rate, codec in pairs),
+                             return_exceptions=True)
+        print(f"Acknowledgements: {len(self.clips)} of {len(self.phrases)} clips ready")
+
+    def prepare(self, output_rate: int, codec: str):
+        """
+        Start preparing the frames for (output_rate, codec) unless they are
+        ready or under way. Returns a future that is done when they are ready.
+        """
+        key = (output_rate, codec)
+        future = self._preparing.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._prepare_clips, list(self.clips), output_rate, codec)
+            future.add_done_callback(lambda f: self._prepared(key, f))
+            self._preparing[key] = future
+        return future
+
+    def pick(self, output_rate: int, codec: str):
+        """
+        Frames of a random clip, never the same one twice in a row; None if
+        there are none, or none prepared for this pair yet.
+        """
+        frames = self.frames.get((output_rate, codec))
+        if not self.clips or frames is None:
+            return None
+        choices = [i for i in range(len(self.clips)) if i != self.last] or [0]
+        self.last = self.random.choice(choices)
+        return frames[self.last]
+
+    def _prepared(self, key, future):
+        if self._preparing.get(key) is not future:
+            return # reloaded meanwhile
+        if future.cancelled() or future.exception() is not None:
+            del self._preparing[key] # the next prepare() tries again
+            if not future.cancelled():
+                print(f"Acknowledgements: could not prepare frames for {key}: {future.exception()}")
+            return
+        self.frames[key] = future.result()
+
+    def _prepare_clips(self, clips, output_rate, codec):
+        return [self._prepare(pcm, output_rate, codec) for pcm in clips]
+
+    def _prepare(self, pcm, output_rate, codec):
+        resampler = StreamingResampler(self.sample_rate, output_rate)
+        samples = np.frombuffer(resampler.process(pcm) + resampler.flush(), dtype=np.int16)
+        frame = int(output_rate * self.frame_ms / 1000)
+        # Every ADPCM frame carries its decoder state, so encoded frames can be reused as is
+        encoder = get_codec(codec).encoder()
+        frames = []
+        for start in range(0, len(samples), frame):
+            chunk = samples[start:start + frame].tobytes()
+            frames.append((encoder.encode(chunk), chunk))
+        return frames
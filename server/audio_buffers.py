@@ -0,0 +1,96 @@
+import numpy as np
+
+class PcmRingBuffer:
+    """
+    Fixed-capacity ring of int16 samples that always holds the most recent audio.
+    The storage is allocated once; writes copy into it with at most two slice
+    assignments, so feeding a chunk never allocates.
+    """
+    def __init__(self, capacity_samples: int):
+        self.capacity = max(1, int(capacity_samples))
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.write_pos = 0
+        self.size = 0
+
+    @classmethod
+    def from_duration(cls, duration_ms: int, sample_rate=16000):
+        return cls(sample_rate * duration_ms // 1000)
+
+    def write(self, pcm):
+        """
+        Append int16 PCM bytes, overwriting the oldest samples when full.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        n = len(samples)
+        if n >= self.capacity:
+            self.buffer[:] = samples[n - self.capacity:]
+            self.write_pos = 0
+            self.size = self.capacity
+            return
+
+        first = min(n, self.capacity - self.write_pos)
+        self.buffer[self.write_pos:self.write_pos + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+        self.write_pos = (self.write_pos + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def drain_into(self, out: bytearray):
+        """
+        Append the buffered audio, oldest first, to out and empty the ring.
+        """
+        start = (self.write_pos - self.size) % self.capacity
+        if start + self.size <= self.capacity:
+            out.extend(memoryview(self.buffer[start:start + self.size]))
+        else:
+            out.extend(memoryview(self.buffer[start:]))
+            out.extend(memoryview(self.buffer[:self.write_pos]))
+        self.clear()
+        return out
+
+    def clear(self):
+        self.write_pos = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+
+class PcmReframer:
+    """
+    Cuts a stream of int16 PCM chunks of any size into exact windows of
+    frame_size samples, as float32 in [-1, 1). Samples that do not fill a
+    window yet wait in a preallocated buffer for the next chunk. Each sample
+    is copied once, converted straight into the returned (n, frame_size) array.
+    """
+    def __init__(self, frame_size: int):
+        self.frame_size = frame_size
+        self.pending = np.zeros(frame_size, dtype=np.int16)
+        self.size = 0
+
+    def feed(self, pcm) -> np.ndarray:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        frame = self.frame_size
+        n = (self.size + len(samples)) // frame
+        if n == 0:
+            self.pending[self.size:self.size + len(samples)] = samples
+            self.size += len(samples)
+            return np.zeros((0, frame), dtype=np.float32)
+
+        frames = np.empty((n, frame), dtype=np.float32)
+        # The first window completes the pending samples, the rest are whole windows of the chunk
+        head = frame - self.size
+        frames[0, :self.size] = self.pending[:self.size]
+        frames[0, self.size:] = samples[:head]
+        used = head + (n - 1) * frame
+        frames[1:] = samples[head:used].reshape(n - 1, frame)
+        frames *= 1 / 32768.0
+
+        self.size = len(samples) - used
+        self.pending[:self.size] = samples[used:]
+        return frames
+
+    def clear(self):
+        self.size = 0
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+from shared import protocol
+from shared.audio_codec import get_codec
+from server.resampler import StreamingResampler
+
+_stream_ids = itertools.count(1)
+
+class FrameSender:
+    """
+    The outgoing side of one connection. Everything is sent as binary frames
+    (see shared/protocol.py) tagged with the session id, and reply audio is
+    resampled to the rate and encoded with the codec negotiated in the hello
+    handshake. With an executor, encoding runs there instead of on the event loop.
+    """
+    def __init__(self, websocket, session_id: int, codec=protocol.DEFAULT_CODEC, output_rate=None, executor=None):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.codec = codec
+        self.output_rate = output_rate # None sends audio at the rate it was produced
+        self.executor = executor
+
+    async def send_control(self, msg_type: str, **data):
+        await self.websocket.send_bytes(protocol.pack_control(msg_type, self.session_id, **data))
+
+    async def send_text(self, text: str, stream_id=0):
+        await self.websocket.send_bytes(protocol.pack_text(text, self.session_id, stream_id))
+
+    def audio_stream(self, sample_rate: int, frame_ms=protocol.AUDIO_FRAME_MS):
+        return AudioStreamWriter(self.websocket, sample_rate, frame_ms, self.codec, self.session_id,
+                                 self.output_rate or sample_rate, self.executor)
+
+
+class AudioStreamWriter:
+    """
+    Sends one reply's audio as sequenced frames (see shared/protocol.py).
+    Audio can be written piece by piece as TTS produces it; close() sends the
+    end-of-stream frame. Audio written at sample_rate is sent at output_rate;
+    the resampler's state carries over between writes, so sentences join
+    seamlessly. Each frame's PCM is encoded with the connection's codec; all
+    frames of a write are encoded in one call on executor, if given.
+    """
+    def __init__(self, websocket, sample_rate: int, frame_ms=protocol.AUDIO_FRAME_MS, codec=protocol.DEFAULT_CODEC,
+                 session_id=0, output_rate=None, executor=None):
+        self.websocket = websocket
+        self.sample_rate = output_rate or sample_rate
+        self.session_id = session_id
+        self.stream_id = next(_stream_ids) & 0xFFFF
+        self.resampler = StreamingResampler(sample_rate, self.sample_rate)
+        self.frame_bytes = int(self.sample_rate * frame_ms / 1000) * 2 # int16 mono
+        self.encoder = get_codec(codec).encoder()
+        # PCM passes through as is; ADPCM encoding loops over samples in Python
+        self.executor = executor if codec != "pcm" else None
+        self.seq = 0
+        self.bytes_sent = 0 # PCM bytes
+        self.wire_bytes = 0 # encoded bytes
+        self.closed = False
+
+    async def write(self, pcm: bytes):
+        await self._send(self.resampler.process(pcm))
+
+    async def _send(self, pcm):
+        view = memoryview(pcm).cast("B")
+        payloads = [view[start:start + self.frame_bytes] for start in range(0, len(view), self.frame_bytes)]
+        if self.executor and payloads:
+            frames = await asyncio.get_running_loop().run_in_executor(self.executor, self._encode, payloads)
+        else:
+            frames = self._encode(payloads)
+        for payload, encoded in zip(payloads, frames):
+            await self.websocket.send_bytes(protocol.pack_frame(
+                protocol.FRAME_AUDIO, encoded, self.session_id, self.seq, self.stream_id))
+            self.seq += 1
+            self.bytes_sent += len(payload)
+            self.wire_bytes += len(encoded)
+
+    def _encode(self, payloads):
+        return [self.encoder.encode(payload) for payload in payloads]
+
+    async def write_frames(self, frames):
+        """
+        Send frames that are already encoded for this stream's rate and codec,
+        as (payload, pcm) pairs, e.g. a cached acknowledgement clip.
+        """
+        for encoded, pcm in frames:
+            await self.websocket.send_bytes(protocol.pack_frame(
+                protocol.FRAME_AUDIO, encoded, self.session_id, self.seq, self.stream_id))
+            self.seq += 1
+            self.bytes_sent += len(pcm)
+            self.wire_bytes += len(encoded)
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        await self._send(self.resampler.flush())
+        await self.websocket.send_bytes(protocol.pack_frame(
+            protocol.FRAME_AUDIO, b"", self.session_id, self.seq, self.stream_id, end_of_stream=True))
+        self.seq += 1
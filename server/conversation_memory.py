@@ -0,0 +1,106 @@
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about 4 characters per token for English).
+    Good enough for budgeting without loading a tokenizer.
+    """
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+    """
+    One conversation's history, kept within a token budget.
+    The system prompt and the last keep_turns exchanges are always sent in
+    full. Older exchanges are folded into a running summary by
+    LLMService.compact(); until that happens, messages() drops the oldest
+    exchanges so the prompt never exceeds max_tokens.
+    """
+    def __init__(self, system_prompt: str, max_tokens=1500, keep_turns=4):
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary = ""
+        self.messages_list = [] # user/assistant messages, oldest first
+        self.forked_at = 0 # length of messages_list when this copy was forked
+
+    def add_user(self, text: str) -> dict:
+        message = {"role": "user", "content": text}
+        self.messages_list.append(message)
+        return message
+
+    def discard(self, message: dict):
+        """
+        Take back a message added earlier, e.g. the user turn of a reply that
+        was cancelled before it produced anything, so the history never holds
+        two user turns in a row.
+        """
+        for i in range(len(self.messages_list) - 1, -1, -1):
+            if self.messages_list[i] is message:
+                del self.messages_list[i]
+                return
+
+    def add_assistant(self, text: str):
+        self.messages_list.append({"role": "assistant", "content": text})
+
+    def system_message(self):
+        content = self.system_prompt
+        if self.summary:
+            content += f"\n\nSummary of the earlier conversation:\n{self.summary}"
+        return {"role": "system", "content": content}
+
+    def messages(self) -> list:
+        """
+        Messages to send to the LLM, newest kept first when over budget.
+        """
+        system = self.system_message()
+        budget = self.max_tokens - estimate_tokens(system["content"])
+        kept = []
+        for message in reversed(self.messages_list):
+            cost = estimate_tokens(message["content"])
+            # Always keep the latest message (the user's question), even if it alone is over budget.
+            if kept and cost > budget:
+                break
+            kept.append(message)
+            budget -= cost
+        return [system] + kept[::-1]
+
+    def token_count(self) -> int:
+        return estimate_tokens(self.system_message()["content"]) + \
+            sum(estimate_tokens(m["content"]) for m in self.messages_list)
+
+    def needs_compaction(self) -> bool:
+        return self.token_count() > self.max_tokens and len(self.messages_list) > self.keep_turns * 2
+
+    def compactable(self) -> list:
+        """
+        Messages older than the last keep_turns exchanges.
+        """
+        return self.messages_list[:max(0, len(self.messages_list) - self.keep_turns * 2)]
+
+    def apply_summary(self, summary: str, count: int):
+        """
+        Replace the first count messages with the new running summary.
+        Messages added while the summary was being written are kept.
+        """
+        self.summary = summary
+        del self.messages_list[:count]
+
+    def fork(self):
+        """
+        Copy to run a speculative reply against without touching this history.
+        """
+        other = ConversationMemory(self.system_prompt, self.max_tokens, self.keep_turns)
+        other.summary = self.summary
+        other.messages_list = list(self.messages_list)
+        other.forked_at = len(other.messages_list)
+        return other
+
+    def merge(self, fork):
+        """
+        Take over the messages a fork added since it was created.
+        A compaction of this memory in the meantime is kept.
+        """
+        self.messages_list.extend(fork.messages_list[fork.forked_at:])
+
+    def clear(self):
+        self.summary = ""
+        self.messages_list = []
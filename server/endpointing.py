@@ -0,0 +1,153 @@
+class UtteranceBuffer:
+    """
+    PCM of the current utterance, stored in fixed-size blocks up to a hard cap.
+    Growing never reallocates (and copies) what is already stored, and
+    extend() stops at max_bytes. Slicing returns bytes, like a bytearray.
+    """
+    def __init__(self, max_bytes: int, block_bytes=32000):
+        self.max_bytes = max_bytes
+        self.block_bytes = block_bytes
+        self.blocks = []
+        self.size = 0
+
+    def extend(self, data) -> int:
+        """Append as much of data as fits; returns the number of bytes stored."""
+        data = memoryview(data).cast("B")[:self.max_bytes - self.size]
+        offset = 0
+        while offset < len(data):
+            used = self.size % self.block_bytes
+            if used == 0:
+                self.blocks.append(bytearray(self.block_bytes))
+            n = min(len(data) - offset, self.block_bytes - used)
+            self.blocks[-1][used:used + n] = data[offset:offset + n]
+            self.size += n
+            offset += n
+        return len(data)
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_bytes
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("UtteranceBuffer only supports slicing")
+        start, stop, step = index.indices(self.size)
+        if step != 1:
+            raise ValueError("UtteranceBuffer slices must be contiguous")
+        parts = []
+        while start < stop:
+            block, offset = divmod(start, self.block_bytes)
+            n = min(stop - start, self.block_bytes - offset)
+            parts.append(memoryview(self.blocks[block])[offset:offset + n])
+            start += n
+        return b"".join(parts)
+
+    def __bytes__(self):
+        return self[:]
+
+
+class Endpointer:
+    """
+    Decides where utterances begin and end, on top of the VAD's start/end events.
+
+    - hangover_ms: after the VAD reports the end of speech, keep listening this
+      long; speech resuming within it continues the same utterance.
+    - min_utterance_ms: utterances with less speech than this (clicks, knocks)
+      are discarded instead of being transcribed.
+    - max_utterance_ms: an utterance is cut when it reaches this length; the
+      rest of that stretch of speech is ignored until the VAD reports its end.
+    - max_buffer_bytes: hard cap on the audio held for the utterance.
+
+    Both caps count the utterance's own audio; the pre-roll in front of it is
+    held on top.
+
+    feed() returns the decisions for a chunk as a list of event dicts:
+      {"type": "start"}
+      {"type": "end", "reason": "silence" | "max_duration" | "buffer_full", "audio": bytes, "duration_ms": ...}
+      {"type": "discard", "reason": "too_short", "duration_ms": ...}
+    """
+    def __init__(self, sample_rate=16000, hangover_ms=0, min_utterance_ms=250, max_utterance_ms=30000,
+                 max_buffer_bytes=2_000_000):
+        self.bytes_per_ms = sample_rate * 2 / 1000
+        self.hangover_bytes = hangover_ms * self.bytes_per_ms
+        self.min_speech_bytes = min_utterance_ms * self.bytes_per_ms
+        self.max_bytes = int(min(max_utterance_ms * self.bytes_per_ms, max_buffer_bytes)) // 2 * 2
+        self.max_reason = "max_duration" if max_utterance_ms * self.bytes_per_ms <= max_buffer_bytes else "buffer_full"
+        self.buffer = None # UtteranceBuffer while in an utterance
+        self.speech_start = 0 # buffer offset after the pre-roll
+        self.speech_bytes = 0 # speech in the utterance, without pre-roll and hangover
+        self.hangover = None # bytes heard since the VAD end event, or None while speech continues
+        self.last_silence_ms = 0.0
+        self.suppressed = False # cut at max length, waiting for the VAD to end
+
+    @property
+    def active(self) -> bool:
+        return self.buffer is not None
+
+    @property
+    def in_speech(self) -> bool:
+        """
+        In an utterance, or in the rest of a stretch of speech cut at max
+        length; either way the audio is not pre-roll for the next utterance.
+        """
+        return self.buffer is not None or self.suppressed
+
+    def trailing_silence_ms(self, vad_silence_ms: float) -> float:
+        """The VAD's trailing silence, extended through the hangover."""
+        if self.hangover is None:
+            self.last_silence_ms = vad_silence_ms
+            return vad_silence_ms
+        return self.last_silence_ms + self.hangover / self.bytes_per_ms
+
+    def feed(self, audio_chunk: bytes, vad_events: list, pre_roll=None) -> list:
+        """
+        Process one chunk with the VAD events it produced, in the order they
+        happened. pre_roll, a PcmRingBuffer, is drained into a new utterance
+        before the chunk.
+        """
+        events = []
+        for vad_event in vad_events or ():
+            if 'start' in vad_event:
+                if self.buffer is None:
+                    lead = pre_roll.drain_into(bytearray()) if pre_roll is not None else b""
+                    self.buffer = UtteranceBuffer(self.max_bytes + len(lead))
+                    self.buffer.extend(lead)
+                    self.speech_start = len(self.buffer)
+                    events.append({"type": "start"})
+                self.hangover = None
+            elif self.suppressed:
+                # The end of the stretch of speech cut at max length
+                self.suppressed = False
+            elif self.buffer is not None and self.hangover is None:
+                self.hangover = 0
+                self.speech_bytes = len(self.buffer) - self.speech_start
+
+        if self.buffer is None:
+            return events
+
+        self.buffer.extend(audio_chunk)
+        if self.hangover is not None:
+            self.hangover += len(audio_chunk)
+            if self.hangover >= self.hangover_bytes:
+                events.append(self._finish("silence"))
+        elif self.buffer.full:
+            self.speech_bytes = len(self.buffer) - self.speech_start
+            self.suppressed = True
+            events.append(self._finish(self.max_reason))
+        return events
+
+    def reset(self):
+        self.buffer = None
+        self.hangover = None
+        self.suppressed = False
+
+    def _finish(self, reason):
+        buffer, self.buffer = self.buffer, None
+        self.hangover = None
+        duration_ms = self.speech_bytes / self.bytes_per_ms
+        if self.speech_bytes < self.min_speech_bytes:
+            return {"type": "discard", "reason": "too_short", "duration_ms": duration_ms}
+        return {"type": "end", "reason": reason, "audio": bytes(buffer), "duration_ms": duration_ms}
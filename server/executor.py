@@ -0,0 +1,105 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from server.worker_pool import ForkedWorkerPool
+
+class StageExecutor:
+    """
+    Runs the blocking pipeline stages (VAD, STT, LLM, TTS) off the event loop.
+    Each stage gets its own bounded pool, so a slow stage can only queue up
+    its own work and never stalls audio ingestion for other connections.
+    """
+    def __init__(self):
+        self.pools = {}
+        self.semaphores = {}
+        self.limits = {}
+        self.pending = {}
+
+    def add_stage(self, name, max_workers, kind="thread", initializer=None, initargs=(), worker_init=None):
+        """
+        Register a stage backed by a thread pool (I/O bound or GIL-releasing work)
+        or a process pool (CPU bound Python work). Process stages need picklable,
+        module-level callables; use initializer to load models once per worker.
+        A "fork" stage runs initializer once here and forks workers that share
+        what it loaded, then runs worker_init(index) in each (see server/worker_pool.py).
+        """
+        max_workers = max(1, int(max_workers))
+        if kind == "fork":
+            pool = ForkedWorkerPool(max_workers, initializer=initializer, initargs=initargs,
+                                    worker_init=worker_init)
+        elif kind == "process":
+            pool = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs)
+        elif kind == "thread":
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-stage",
+                                      initializer=initializer, initargs=initargs)
+        else:
+            raise ValueError(f"Unknown executor kind for stage {name}: {kind}")
+
+        self.pools[name] = pool
+        self.limits[name] = max_workers
+        self.pending[name] = 0
+        print(f"Stage '{name}': {kind} pool with {max_workers} workers")
+        return pool
+
+    def add_async_stage(self, name, max_concurrency):
+        """
+        Register a stage served by an async client. There is no pool; the
+        limit is enforced with a semaphore, see slot().
+        """
+        max_concurrency = max(1, int(max_concurrency))
+        self.semaphores[name] = asyncio.Semaphore(max_concurrency)
+        self.limits[name] = max_concurrency
+        self.pending[name] = 0
+        print(f"Stage '{name}': async with {max_concurrency} concurrent calls")
+
+    def slot(self, name):
+        """Usage: async with stage_executor.slot("llm"): ..."""
+        return _StageSlot(self, name)
+
+    def pool(self, name):
+        return self.pools[name]
+
+    async def run(self, stage: str, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the stage's pool and await the result.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        self.pending[stage] += 1
+        try:
+            return await loop.run_in_executor(self.pools[stage], call)
+        finally:
+            self.pending[stage] -= 1
+
+    def shutdown(self, wait=False):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class _StageSlot:
+    def __init__(self, executor, name):
+        self.executor = executor
+        self.name = name
+
+    async def __aenter__(self):
+        self.executor.pending[self.name] += 1
+        try:
+            await self.executor.semaphores[self.name].acquire()
+        except BaseException:
+            self.executor.pending[self.name] -= 1
+            raise
+
+    async def __aexit__(self, *exc):
+        self.executor.semaphores[self.name].release()
+        self.executor.pending[self.name] -= 1
+
+
+def stage_limit(name: str, default: int) -> int:
+    """Read <NAME>_CONCURRENCY from the environment, e.g. TTS_CONCURRENCY=4."""
+    value = os.getenv(f"{name.upper()}_CONCURRENCY")
+    try:
+        return int(value) if value else default
+    except ValueError:
+        print(f"WARNING: invalid {name.upper()}_CONCURRENCY={value!r}, using {default}")
+        return default
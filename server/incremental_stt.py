@@ -0,0 +1,77 @@
+import asyncio
+import numpy as np
+
+class IncrementalTranscriber:
+    """
+    Transcribes an utterance in segments while the user is still speaking.
+
+    Once segment_ms of speech has accumulated past the last cut, the audio is
+    cut at the quietest 20 ms frame within the next search_ms (a pause between
+    words, so no word is split) and that segment is sent to STT in the
+    background. When speech ends only the tail after the last cut still has
+    to be transcribed; the final transcript is the segments joined in order.
+    """
+    def __init__(self, transcribe, sample_rate=16000, segment_ms=2500, search_ms=600):
+        self.transcribe = transcribe # async fn(audio_bytes) -> str
+        self.sample_rate = sample_rate
+        self.segment_bytes = sample_rate * segment_ms // 1000 * 2
+        self.search_bytes = sample_rate * search_ms // 1000 * 2
+        self.frame_bytes = sample_rate // 50 * 2 # 20 ms
+        self.committed = 0 # byte offset of the last cut
+        self.segments = [] # tasks, in audio order
+
+    def feed(self, audio_buffer: bytearray):
+        """
+        Call after audio was appended to the utterance buffer.
+        Starts a background transcription when a segment is ready.
+        """
+        if len(audio_buffer) - self.committed < self.segment_bytes + self.search_bytes:
+            return
+        start = self.committed + self.segment_bytes
+        cut = self._quietest_frame(audio_buffer, start, start + self.search_bytes)
+        segment = bytes(audio_buffer[self.committed:cut])
+        self.committed = cut
+        self.segments.append(asyncio.create_task(self.transcribe(segment)))
+
+    def preview(self, audio_buffer: bytearray):
+        """
+        Transcript of the utterance so far, without cutting it: the segments
+        plus the audio after the last cut. The audio is captured when this is
+        called; cancelling the returned awaitable leaves the segments running.
+        """
+        tail = bytes(audio_buffer[self.committed:])
+        parts = [asyncio.shield(task) for task in self.segments]
+        if tail:
+            parts.append(self.transcribe(tail))
+        return self._join(parts)
+
+    async def _join(self, parts):
+        texts = await asyncio.gather(*parts)
+        return " ".join(t.strip() for t in texts if t and t.strip())
+
+    async def finish(self, audio_buffer: bytearray) -> str:
+        """
+        Transcribe the tail and return the full transcript.
+        """
+        tail = bytes(audio_buffer[self.committed:])
+        tasks = list(self.segments)
+        if tail:
+            tasks.append(asyncio.create_task(self.transcribe(tail)))
+        try:
+            texts = await asyncio.gather(*tasks)
+        except BaseException:
+            self.cancel()
+            raise
+        return " ".join(t.strip() for t in texts if t and t.strip())
+
+    def cancel(self):
+        for task in self.segments:
+            task.cancel()
+
+    def _quietest_frame(self, audio_buffer, start, end):
+        samples = np.frombuffer(bytes(audio_buffer[start:end]), dtype=np.int16)
+        frame = self.frame_bytes // 2
+        n = len(samples) // frame
+        energy = np.abs(samples[:n * frame].astype(np.int32)).reshape(n, frame).sum(axis=1)
+        # Cut in the middle of the quietest frame
+        return start + int(np.argmin(energy)) * self.frame_bytes + self.frame_bytes // 2
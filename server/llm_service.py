@@ -1,25 +1,52 @@
-from groq import Groq
+import re
+import random
+import asyncio
+from groq import Groq, AsyncGroq
+from server.conversation_memory import ConversationMemory
+
+SUMMARY_PROMPT = """Summarize the conversation below between an English learner (user) and their tutor (assistant).
+Keep the topics discussed, facts the user shared about themselves, and recurring grammar mistakes.
+Write at most 120 words."""
 
 class LLMService:
-    def __init__(self, api_key):
-        self.client = Groq(api_key=api_key)
+    def __init__(self, api_key, max_history_tokens=1500, keep_turns=4):
+        self.client, self.async_client = self.create_clients(api_key)
+        self.model = "openai/gpt-oss-20b" # Fast and good for chat
+        self.fallback_response = "I'm sorry, I'm having trouble thinking right now."
         self.system_prompt = """You are a helpful and friendly English language assistant. 
         Your goal is to help the user practice English conversation. 
         Keep your responses concise and natural. 
         Correct any major grammatical errors the user makes in a gentle way, but focus on keeping the conversation flowing.
         """
-        self.history = [{"role": "system", "content": self.system_prompt}]
+        self.max_history_tokens = max_history_tokens
+        self.keep_turns = keep_turns
+        # Used when no per-session memory is passed in
+        self.memory = self.create_memory()
+
+    def create_clients(self, api_key):
+        return Groq(api_key=api_key), AsyncGroq(api_key=api_key)
 
-    def get_response(self, user_text: str) -> str:
+    def create_memory(self) -> ConversationMemory:
+        """
+        New conversation history, one per connected client.
+        """
+        return ConversationMemory(self.system_prompt, self.max_history_tokens, self.keep_turns)
+
+    @property
+    def history(self):
+        return self.memory.messages()
+
+    def get_response(self, user_text: str, memory: ConversationMemory = None) -> str:
         """
         Get response from Groq LLM.
         """
-        self.history.append({"role": "user", "content": user_text})
+        memory = memory or self.memory
+        memory.add_user(user_text)
         
         try:
             completion = self.client.chat.completions.create(
-                model="openai/gpt-oss-20b", # Fast and good for chat
-                messages=self.history,
+                model=self.model,
+                messages=memory.messages(),
                 temperature=0.7,
                 top_p=1,
                 stream=False,
@@ -27,11 +54,131 @@ class LLMService:
             )
             
             response_text = completion.choices[0].message.content
-            self.history.append({"role": "assistant", "content": response_text})
+            memory.add_assistant(response_text)
             return response_text
         except Exception as e:
             print(f"LLM Error: {e}")
-            return "I'm sorry, I'm having trouble thinking right now."
+            return self.fallback_response
+
+    async def stream_response(self, user_text: str, memory: ConversationMemory = None):
+        """
+        Stream the response from Groq LLM, yielding text deltas as they arrive.
+        The full response is added to the history once the stream ends; if it
+        is cancelled before the first token, the user turn is taken back.
+        """
+        memory = memory or self.memory
+        user_message = memory.add_user(user_text)
+        parts = []
+
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=memory.messages(),
+                temperature=0.7,
+                top_p=1,
+                stream=True,
+                stop=None,
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            if not parts:
+                parts.append(self.fallback_response)
+                yield self.fallback_response
+        finally:
+            if parts:
+                memory.add_assistant("".join(parts))
+            else:
+                memory.discard(user_message)
+
+    async def compact(self, memory: ConversationMemory = None):
+        """
+        Fold the turns older than keep_turns into the running summary once the
+        history is over its token budget. Call it after a reply has been sent so
+        it stays off the latency path.
+        """
+        memory = memory or self.memory
+        if not memory.needs_compaction():
+            return
+
+        old = memory.compactable()
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in old)
+        if memory.summary:
+            transcript = f"Earlier summary: {memory.summary}\n{transcript}"
+
+        try:
+            completion = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": transcript},
+                ],
+                temperature=0.3,
+                stream=False,
+            )
+            summary = completion.choices[0].message.content.strip()
+        except Exception as e:
+            # messages() still enforces the budget by dropping the oldest turns
+            print(f"LLM Summary Error: {e}")
+            return
+
+        memory.apply_summary(summary, len(old))
+        print(f"Compacted {len(old)} messages, history now ~{memory.token_count()} tokens")
 
     def clear_history(self):
-        self.history = [{"role": "system", "content": self.system_prompt}]
+        self.memory.clear()
+
+
+class FakeLLMService(LLMService):
+    """
+    Offline stand-in for load tests: streams a canned reply word by word.
+    The first token arrives after a log-normal delay around first_token_ms
+    (sigma controls the tail), each further word after about token_ms.
+    History and compaction behave like the real service, without any API calls.
+    """
+    def __init__(self, reply="That sounds great! Tell me more about what you did today, and how you felt about it.",
+                 first_token_ms=250, token_ms=15, sigma=0.3, max_history_tokens=1500, keep_turns=4, seed=None):
+        super().__init__(None, max_history_tokens, keep_turns)
+        self.model = "fake"
+        self.fallback_response = reply
+        self.words = re.findall(r"\S+\s*", reply)
+        self.first_token = first_token_ms / 1000
+        self.token = token_ms / 1000
+        self.sigma = sigma
+        self.random = random.Random(seed)
+
+    def create_clients(self, api_key):
+        return None, None # no API calls
+
+    def get_response(self, user_text: str, memory: ConversationMemory = None) -> str:
+        memory = memory or self.memory
+        memory.add_user(user_text)
+        memory.add_assistant(self.fallback_response)
+        return self.fallback_response
+
+    async def stream_response(self, user_text: str, memory: ConversationMemory = None):
+        memory = memory or self.memory
+        user_message = memory.add_user(user_text)
+        parts = []
+        try:
+            await asyncio.sleep(self.first_token * self.random.lognormvariate(0, self.sigma))
+            for i, word in enumerate(self.words):
+                if i:
+                    await asyncio.sleep(self.token * self.random.lognormvariate(0, self.sigma))
+                parts.append(word)
+                yield word
+        finally:
+            if parts:
+                memory.add_assistant("".join(parts))
+            else:
+                memory.discard(user_message)
+
+    async def compact(self, memory: ConversationMemory = None):
+        memory = memory or self.memory
+        if memory.needs_compaction():
+            old = memory.compactable()
+            memory.apply_summary(f"{len(old)} earlier messages.", len(old))
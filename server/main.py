@@ -1,15 +1,31 @@
 import os
-import json
 import asyncio
+import collections
+import itertools
+import time
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import numpy as np
 
 # Import services
-from server.vad_service import VADService
-from server.stt_service import STTService
-from server.llm_service import LLMService
-from server.tts_service import TTSService
+from server.vad_service import create_vad_service, VADScheduler
+from server.stt_backends import create_stt_backend
+from server.llm_service import LLMService, FakeLLMService
+from server.tts_service import TTSService, StubTTSService, init_worker, partition_worker_cache, generate_in_worker, SAMPLE_RATE as TTS_SAMPLE_RATE
+from server.audio_stream import FrameSender
+from server.audio_buffers import PcmRingBuffer
+from server.endpointing import Endpointer
+from server.acknowledgements import AcknowledgementBank, LatencyPredictor, DEFAULT_PHRASES
+from server.tts_scheduler import TTSScheduler
+from server.incremental_stt import IncrementalTranscriber
+from server.speculation import SpeculationController, SpeculationStats
+from server.executor import StageExecutor, stage_limit
+from server.text_chunker import SentenceChunker
+from server.metrics import MetricsRegistry, monitor_loop_lag
+from shared import protocol
+from shared.audio_codec import CODECS, get_codec
+from shared.thread_budget import ThreadBudget, available_cpus
 
 # Load environment variables
 load_dotenv()
@@ -24,10 +40,150 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     print("WARNING: GROQ_API_KEY not found in .env")
 
-vad_service = VADService()
-stt_service = STTService(api_key=GROQ_API_KEY)
-llm_service = LLMService(api_key=GROQ_API_KEY)
-tts_service = TTSService() # Ensure kokoro-v0_19.onnx and voices.json are in the working directory or path
+# Blocking work runs on bounded per-stage pools so one user's turn never freezes the event loop.
+# Limits come from STT_CONCURRENCY, LLM_CONCURRENCY and TTS_CONCURRENCY.
+# TTS_EXECUTOR=process runs Kokoro in worker processes forked after the model is loaded, so
+# they share one copy of it; each runs onnxruntime on a single thread.
+TTS_EXECUTOR = os.getenv("TTS_EXECUTOR", "thread")
+# Inference threads per engine (shared/thread_budget.py): one for the VAD, the other cores for TTS.
+# THREADS_VAD and THREADS_TTS override; PIN_THREADS=1 pins each engine to its own cores.
+thread_budget = ThreadBudget.from_env({"vad": 1, "tts": max(1, len(available_cpus()) - 1)})
+stage_executor = StageExecutor()
+stage_executor.add_stage("vad", 1)
+# Reply audio is encoded off the event loop (ADPCM is a per-sample Python loop)
+stage_executor.add_stage("codec", 1)
+stage_executor.add_async_stage("stt", stage_limit("stt", 16))
+stage_executor.add_async_stage("llm", stage_limit("llm", 8))
+
+# VAD_BACKEND=onnx (default) runs the Silero ONNX model from SILERO_VAD_MODEL with onnxruntime,
+# offline; VAD_BACKEND=torch fetches the TorchScript model through torch.hub.
+VAD_BACKEND = os.getenv("VAD_BACKEND", "onnx")
+vad_options = {"model_path": os.getenv("SILERO_VAD_MODEL")} if os.getenv("SILERO_VAD_MODEL") else {}
+vad_options["threads"] = thread_budget.threads("vad")
+if VAD_BACKEND == "onnx":
+    vad_options["options"] = thread_budget.session_options("vad")
+vad_service = create_vad_service(VAD_BACKEND, **vad_options)
+# One model for all connections; windows from every active session are batched together.
+vad_scheduler = VADScheduler(vad_service, executor=stage_executor.pool("vad"))
+
+# Offline stand-ins for load tests (benchmarks/load_test.py): STT_BACKEND=fake, LLM_BACKEND=fake
+# and TTS_BACKEND=stub. Their latencies are log-normal around the FAKE_*_MS medians.
+FAKE_LATENCY_SIGMA = float(os.getenv("FAKE_LATENCY_SIGMA", "0.3"))
+
+# STT_BACKEND=groq uses the pooled, retrying, hedged Groq client; STT_BACKEND=fake runs offline.
+# STT_UPLOAD_FORMAT=flac or opus compresses uploads to Groq (default wav, sent without copying).
+STT_BACKEND = os.getenv("STT_BACKEND", "groq")
+if STT_BACKEND == "groq":
+    stt_options = {"upload_format": os.getenv("STT_UPLOAD_FORMAT", "wav")}
+else:
+    stt_options = {"median_ms": int(os.getenv("FAKE_STT_MS", "300")), "sigma": FAKE_LATENCY_SIGMA}
+stt_backend = create_stt_backend(STT_BACKEND, api_key=GROQ_API_KEY, **stt_options)
+# Each connection gets its own history, bounded by LLM_HISTORY_TOKENS; older turns are summarized.
+llm_options = dict(max_history_tokens=int(os.getenv("LLM_HISTORY_TOKENS", "1500")),
+                   keep_turns=int(os.getenv("LLM_KEEP_TURNS", "4")))
+if os.getenv("LLM_BACKEND", "groq") == "fake":
+    llm_service = FakeLLMService(first_token_ms=int(os.getenv("FAKE_LLM_FIRST_TOKEN_MS", "250")),
+                                 token_ms=int(os.getenv("FAKE_LLM_TOKEN_MS", "15")),
+                                 sigma=FAKE_LATENCY_SIGMA, **llm_options)
+else:
+    llm_service = LLMService(api_key=GROQ_API_KEY, **llm_options)
+
+# Synthesized phrases are cached in memory and on disk (TTS_CACHE_DIR, empty to disable).
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MB = int(os.getenv("TTS_CACHE_MB", "64"))
+
+if os.getenv("TTS_BACKEND", "kokoro") == "stub":
+    tts_service = StubTTSService(median_ms=int(os.getenv("FAKE_TTS_MS", "150")), sigma=FAKE_LATENCY_SIGMA)
+    stage_executor.add_stage("tts", stage_limit("tts", os.cpu_count() or 2))
+    synthesize = tts_service.generate_audio
+elif TTS_EXECUTOR == "process":
+    # One worker per TTS thread; a thread pool started before the fork would not exist in the workers
+    tts_workers = stage_limit("tts", thread_budget.threads("tts"))
+    thread_budget.assign("tts", 1, workers=tts_workers)
+    # The workers share the cache directory and split its memory and disk budgets between them
+    def init_tts_worker(index):
+        thread_budget.pin("tts", index)
+        partition_worker_cache(index, tts_workers)
+    stage_executor.add_stage("tts", tts_workers, kind="fork", initializer=init_worker,
+                             initargs=("kokoro-v0_19.onnx", "voices.index.npz", TTS_CACHE_DIR, TTS_CACHE_MB, 1),
+                             worker_init=init_tts_worker)
+    synthesize = generate_in_worker
+else:
+    # Concurrent syntheses share the session's intra-op pool: only run as many as the cores
+    # left over after the VAD can feed at THREADS_TTS each (one, with the default budget)
+    tts_threads = thread_budget.threads("tts")
+    tts_workers = stage_limit("tts", max(1, (len(thread_budget.cpus) - thread_budget.threads("vad")) // tts_threads))
+    thread_budget.assign("tts", tts_threads, thread_budget.inter("tts"), workers=tts_workers)
+    tts_service = TTSService(cache_dir=TTS_CACHE_DIR, cache_mb=TTS_CACHE_MB, threads=tts_threads,
+                             options=thread_budget.session_options("tts")) # Ensure kokoro-v0_19.onnx and the voice store (voices.index.npz, voices.f32) are in the working directory
+    stage_executor.add_stage("tts", tts_workers)
+    synthesize = tts_service.generate_audio
+print(f"Thread budget: {thread_budget.describe()}")
+
+# Sentences from all sessions go through one scheduler: requests within TTS_BATCH_WINDOW_MS
+# are gathered when every worker is busy, and identical sentences share one synthesis.
+tts_scheduler = TTSScheduler(synthesize, stage_executor, window_ms=int(os.getenv("TTS_BATCH_WINDOW_MS", "15")))
+
+# Audio kept from before the VAD start event so the first syllable is not clipped.
+PRE_ROLL_MS = int(os.getenv("PRE_ROLL_MS", "300"))
+# Acknowledgement clips ("Mm-hmm", "Let me think") mask a slow reply: they are synthesized once at
+# startup, and one is streamed as soon as speech ends when the predicted time to the first reply
+# audio is at least ACK_THRESHOLD_MS. ACK_PHRASES is a |-separated list; ACK_CLIPS=0 disables them.
+ACK_CLIPS = os.getenv("ACK_CLIPS", "1") == "1"
+ACK_THRESHOLD_MS = int(os.getenv("ACK_THRESHOLD_MS", "800"))
+ack_bank = AcknowledgementBank(os.getenv("ACK_PHRASES").split("|") if os.getenv("ACK_PHRASES") else DEFAULT_PHRASES,
+                               TTS_SAMPLE_RATE, executor=stage_executor.pool("codec"))
+reply_latency = LatencyPredictor()
+# Endpointing on top of the VAD events: ENDPOINT_HANGOVER_MS of extra listening after the VAD's
+# end of speech, utterances with less than ENDPOINT_MIN_UTTERANCE_MS of speech are dropped, and
+# utterances are cut at ENDPOINT_MAX_UTTERANCE_MS or ENDPOINT_MAX_BUFFER_BYTES, whichever is smaller
+# (the pre-roll in front of an utterance is not counted).
+ENDPOINT_HANGOVER_MS = int(os.getenv("ENDPOINT_HANGOVER_MS", "0"))
+ENDPOINT_MIN_UTTERANCE_MS = int(os.getenv("ENDPOINT_MIN_UTTERANCE_MS", "250"))
+ENDPOINT_MAX_UTTERANCE_MS = int(os.getenv("ENDPOINT_MAX_UTTERANCE_MS", "30000"))
+ENDPOINT_MAX_BUFFER_BYTES = int(os.getenv("ENDPOINT_MAX_BUFFER_BYTES", "2000000"))
+endpoint_counts = collections.Counter()
+# Transcribe long utterances in segments while the user is still speaking (0 to disable).
+INCREMENTAL_STT = os.getenv("INCREMENTAL_STT", "1") == "1"
+# Start the LLM from a partial transcript once it is stable for SPECULATION_STABLE_MS and the
+# user has paused for SPECULATION_SILENCE_MS; the reply is kept only if the final transcript matches.
+SPECULATION = os.getenv("SPECULATION", "1") == "1"
+SPECULATION_SILENCE_MS = int(os.getenv("SPECULATION_SILENCE_MS", "60"))
+SPECULATION_STABLE_MS = int(os.getenv("SPECULATION_STABLE_MS", "300"))
+SPECULATION_POLL_MS = int(os.getenv("SPECULATION_POLL_MS", "500"))
+speculation_stats = SpeculationStats()
+
+# Metrics, served on /metrics in the Prometheus text format
+metrics = MetricsRegistry()
+vad_latency = metrics.histogram("vad_chunk_seconds", "VAD time per received audio chunk")
+utterance_duration = metrics.histogram("utterance_seconds", "Speech per utterance, start to end of speech")
+stt_latency = metrics.histogram("stt_seconds", "Wait for the final transcript after the end of speech")
+llm_first_token = metrics.histogram("llm_first_token_seconds", "LLM request to first streamed token")
+llm_response = metrics.histogram("llm_response_seconds", "LLM request to end of the streamed reply")
+tts_latency = metrics.histogram("tts_sentence_seconds", "Synthesis per sentence, including queueing")
+send_latency = metrics.histogram("ws_send_seconds", "Sending one sentence's text and audio frames")
+first_audio_latency = metrics.histogram("turn_first_audio_seconds", "End of speech to the first reply audio sent")
+turn_latency = metrics.histogram("turn_seconds", "End of speech to the end of the reply")
+loop_lag = metrics.histogram("event_loop_lag_seconds", "How late the event loop wakes up from a timer")
+loop_lag_current = metrics.gauge("event_loop_lag_current_seconds", "Latest event loop lag sample")
+turns = metrics.counter("turns_total", "Turns started")
+interrupts = metrics.counter("interrupts_total", "Replies cut off by barge-in or an interrupt message")
+acks_sent = metrics.counter("acknowledgements_total", "Acknowledgement clips played ahead of a slow reply")
+metrics.gauge("predicted_first_audio_seconds", "Expected end of speech to first reply audio",
+              fn=lambda: reply_latency.estimate)
+active_sessions = metrics.gauge("active_sessions", "Open WebSocket connections")
+metrics.gauge("stage_pending", "Jobs queued or running per executor stage",
+              fn=lambda: dict(stage_executor.pending), label="stage")
+metrics.gauge("vad_queued_windows", "VAD windows waiting for batched inference", fn=lambda: vad_scheduler.depth())
+metrics.gauge("tts_scheduler_keys", "Sentences waiting for or in synthesis", label="state",
+              fn=lambda: {k: v for k, v in tts_scheduler.stats().items() if k in ("waiting", "inflight")})
+metrics.gauge("speculation", "Early LLM replies by outcome", label="outcome",
+              fn=lambda: {k: v for k, v in speculation_stats.as_dict().items()
+                          if k in ("started", "hits", "misses", "abandoned")})
+metrics.gauge("endpoints", "Utterances by endpointing decision", label="reason", fn=lambda: dict(endpoint_counts))
+
+_session_ids = itertools.count(1)
+_compactions = {} # id(memory) -> compaction task, see compact_in_background()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -35,96 +191,334 @@ async def websocket_endpoint(websocket: WebSocket):
     print("Client connected")
     
     # Per-connection state
-    audio_buffer = bytearray()
-    is_speaking = False
-    silence_counter = 0
-    SILENCE_THRESHOLD = 10 # chunks of silence to trigger end of speech (approx 0.5s if chunk is 50ms)
+    link = FrameSender(websocket, next(_session_ids), executor=stage_executor.pool("codec"))
+    active_sessions.inc()
+    vad_session = vad_service.create_session()
+    memory = llm_service.create_memory()
+    endpointer = Endpointer(hangover_ms=ENDPOINT_HANGOVER_MS, min_utterance_ms=ENDPOINT_MIN_UTTERANCE_MS,
+                            max_utterance_ms=ENDPOINT_MAX_UTTERANCE_MS, max_buffer_bytes=ENDPOINT_MAX_BUFFER_BYTES)
+    pre_roll = PcmRingBuffer.from_duration(PRE_ROLL_MS)
+    uplink = get_codec(link.codec).decoder() # Until the client's hello picks another codec
+    transcriber = None # Segments of the current utterance already sent to STT
+    speculation = None # Early reply from a partial transcript of the current utterance
+    turn_task = None # The reply currently being produced; cancelled on barge-in
     
     try:
         while True:
             # Receive message
-            # We expect binary audio chunks or text JSON control messages
-            # For simplicity, let's assume client sends binary audio chunks directly
-            # or we can use a specific protocol.
-            # Let's support mixed: text for control, bytes for audio.
-            
-            message = await websocket.receive()
-            
-            if "bytes" in message:
-                audio_chunk = message["bytes"]
-                
-                # 1. VAD Processing
-                # vad_service.process_chunk returns dict if speech start/end detected, but we also need to know if current chunk is speech
-                # Silero VAD iterator is stateful.
-                
-                # For simplicity with the VAD wrapper we wrote:
-                # It returns a dict with 'start' or 'end' keys if a transition happens.
-                # However, we also need to accumulate audio.
-                
-                speech_status = vad_service.process_chunk(audio_chunk)
+            # Every message is a binary frame (shared/protocol.py); audio frames
+            # are handled without any JSON parsing. Malformed frames are dropped.
+            frame = await receive_frame(websocket)
+            if frame is None:
+                continue
+
+            if frame.kind == protocol.FRAME_AUDIO:
+                try:
+                    audio_chunk = uplink.decode(frame.payload)
+                except ValueError as e:
+                    print(f"Dropped malformed audio frame: {e}")
+                    continue
                 
-                if speech_status:
-                    if 'start' in speech_status:
+                # Each connection has its own VAD session; the scheduler batches windows across sessions.
+                # It returns the chunk's start/end transitions in the order they happened.
+                with vad_latency.time():
+                    vad_events = await vad_scheduler.process_chunk(vad_session, audio_chunk)
+
+                # The endpointer turns VAD transitions into utterances and holds their audio,
+                # starting with the pre-roll so the first syllable is not clipped.
+                was_in_speech = endpointer.in_speech
+                for event in endpointer.feed(audio_chunk, vad_events, pre_roll):
+                    if event["type"] == "start":
                         print("Speech started")
-                        is_speaking = True
-                        audio_buffer = bytearray(audio_chunk) # Start fresh buffer or keep context?
-                        # Usually keep a bit of context.
-                    
-                    if 'end' in speech_status:
-                        print("Speech ended")
-                        is_speaking = False
-                        # Process the accumulated audio
-                        await process_audio_input(websocket, audio_buffer)
-                        audio_buffer = bytearray()
-                
-                # If we are in a speaking state, accumulate
-                # Note: Silero VAD iterator handles the "speech" state internally.
-                # If we want to capture the audio *during* speech, we need to know if we are currently speaking.
-                # The wrapper I wrote returns events.
-                # A better approach for the wrapper might be to return "is_speech" boolean for the chunk.
-                # But let's stick to the event-based for now.
-                # Actually, if 'start' was triggered, we are speaking until 'end' is triggered.
-                
-                if is_speaking:
-                    audio_buffer.extend(audio_chunk)
-                else:
-                    # We might want to keep a rolling buffer for context if we were doing advanced VAD
-                    pass
-                    
-            elif "text" in message:
-                data = json.loads(message["text"])
+                        # Barge-in: the user is talking again, drop the reply in flight.
+                        await interrupt_turn(link, turn_task)
+                        if transcriber:
+                            transcriber.cancel()
+                        if speculation:
+                            speculation.cancel()
+                        transcriber = IncrementalTranscriber(transcribe_audio) if INCREMENTAL_STT else None
+                        speculation = create_speculation(memory, transcriber) if SPECULATION else None
+                        continue
+
+                    endpoint_counts[event["reason"]] += 1
+                    if event["type"] == "discard":
+                        print(f"Dropped utterance: {event['reason']} ({event['duration_ms']:.0f} ms)")
+                        if transcriber:
+                            transcriber.cancel()
+                        if speculation:
+                            speculation.cancel()
+                    else:
+                        print(f"Speech ended: {event['reason']}")
+                        utterance_duration.observe(event["duration_ms"] / 1000)
+                        # Process the utterance as a cancellable turn so we keep
+                        # listening (and can barge in) while the reply is generated.
+                        if speculation:
+                            speculation.stop()
+                        turn_task = asyncio.create_task(
+                            run_turn(link, event["audio"], memory, transcriber, speculation))
+                    transcriber = None
+                    speculation = None
+
+                if endpointer.active:
+                    if transcriber:
+                        transcriber.feed(endpointer.buffer)
+                    if speculation:
+                        speculation.observe(endpointer.buffer,
+                                            endpointer.trailing_silence_ms(vad_session.trailing_silence_ms))
+                elif not was_in_speech and not endpointer.in_speech:
+                    # Keep the last PRE_ROLL_MS of non-speech audio for the next utterance
+                    pre_roll.write(audio_chunk)
+
+            elif frame.kind == protocol.FRAME_CONTROL:
+                try:
+                    data = protocol.parse_control(frame)
+                except ValueError as e:
+                    print(f"Dropped malformed control message: {e}")
+                    continue
                 print(f"Received control message: {data}")
-                # Handle control messages if any
+                if data.get(protocol.KEY_TYPE) == protocol.MSG_HELLO:
+                    link.codec = protocol.negotiate_codec(data.get(protocol.KEY_CODECS), CODECS)
+                    link.output_rate = protocol.negotiate_output_rate(data.get(protocol.KEY_SAMPLE_RATE),
+                                                                      TTS_SAMPLE_RATE)
+                    uplink = get_codec(link.codec).decoder()
+                    await link.send_control(protocol.MSG_HELLO, **{protocol.KEY_CODEC: link.codec,
+                                                                   protocol.KEY_SESSION: link.session_id,
+                                                                   protocol.KEY_SAMPLE_RATE: link.output_rate})
+                    print(f"Session {link.session_id}: audio codec {link.codec}, replies at {link.output_rate} Hz")
+                    if ACK_CLIPS:
+                        ack_bank.prepare(link.output_rate or TTS_SAMPLE_RATE, link.codec)
+                elif data.get(protocol.KEY_TYPE) == protocol.MSG_INTERRUPT:
+                    await interrupt_turn(link, turn_task)
+            else:
+                print(f"Ignoring frame of kind {frame.kind}")
 
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        if turn_task:
+            turn_task.cancel()
+        if transcriber:
+            transcriber.cancel()
+        if speculation:
+            speculation.cancel()
+        vad_scheduler.remove(vad_session)
+        active_sessions.dec()
+
+async def receive_frame(websocket: WebSocket):
+    """
+    The client's next frame, or None for a malformed one (logged and dropped).
+    Text messages are not part of the protocol: the connection is closed with
+    1003 (unsupported data).
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is None:
+        print("Text message received, closing: the protocol is binary frames only")
+        await websocket.close(code=1003)
+        raise WebSocketDisconnect(1003)
+    try:
+        return protocol.unpack_frame(message["bytes"])
+    except ValueError as e:
+        print(f"Dropped malformed frame: {e}")
+        return None
+
+async def interrupt_turn(link: FrameSender, turn_task):
+    """
+    Cancel the turn in flight, if any, and tell the client to drop queued audio.
+    Cancelling stops the LLM stream, removes queued STT/TTS jobs from the stage
+    pools and stops sending audio frames mid-reply.
+    """
+    if turn_task is None or turn_task.done():
+        return
+    turn_task.cancel()
+    await asyncio.wait([turn_task])
+    interrupts.inc()
+    await link.send_control(protocol.MSG_INTERRUPT)
+    print("Turn interrupted")
+
+async def run_turn(link: FrameSender, audio_data: bytearray, memory, transcriber=None, speculation=None):
+    try:
+        await process_audio_input(link, audio_data, memory, transcriber, speculation)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Turn Error: {e}")
 
-async def process_audio_input(websocket: WebSocket, audio_data: bytearray):
+async def transcribe_audio(audio_data: bytes) -> str:
+    async with stage_executor.slot("stt"):
+        return await stt_backend.transcribe(audio_data)
+
+def create_speculation(memory, transcriber=None):
+    def preview(audio_buffer):
+        if transcriber:
+            return transcriber.preview(audio_buffer)
+        return transcribe_audio(bytes(audio_buffer))
+    return SpeculationController(preview, start_reply, memory, speculation_stats,
+                                 silence_ms=SPECULATION_SILENCE_MS, stable_ms=SPECULATION_STABLE_MS,
+                                 poll_ms=SPECULATION_POLL_MS)
+
+def start_reply(text: str, memory=None):
+    """
+    Start streaming the LLM reply to text; returns its sentence queue and producer task.
+    """
+    sentences = asyncio.Queue()
+    producer = asyncio.create_task(stream_sentences(text, sentences, memory))
+    return sentences, producer
+
+async def process_audio_input(link: FrameSender, audio_data: bytearray, memory=None, transcriber=None,
+                              speculation=None):
     print(f"Processing audio: {len(audio_data)} bytes")
+    turn_start = time.perf_counter()
+    turns.inc()
+    audio_stream = link.audio_stream(TTS_SAMPLE_RATE)
+
+    # 1. If the reply is expected to take a while, fill the silence with a short
+    # acknowledgement from memory. An early reply already under way is fast enough.
+    if ACK_CLIPS and not (speculation and speculation.speculation) \
+            and reply_latency.predict_ms() >= ACK_THRESHOLD_MS:
+        clip = ack_bank.pick(audio_stream.sample_rate, link.codec)
+        if clip:
+            await audio_stream.write_frames(clip)
+            acks_sent.inc()
     
     # 2. STT
-    text = stt_service.transcribe(audio_data)
+    # With an incremental transcriber most of the utterance is already transcribed;
+    # only the tail after its last cut is sent now.
+    try:
+        with stt_latency.time():
+            if transcriber:
+                text = await transcriber.finish(audio_data)
+            else:
+                text = await transcribe_audio(audio_data)
+    except BaseException as e:
+        if speculation:
+            speculation.cancel()
+        if audio_stream.seq and not isinstance(e, asyncio.CancelledError):
+            await audio_stream.close() # end the acknowledgement so the client stops waiting
+        raise
     print(f"Transcribed: {text}")
+
+    # A reply started early from a partial transcript is used only if the final one matches.
+    early = None
+    if speculation and speculation.speculation:
+        early = speculation.resolve(text)
+        print(f"Speculation {'hit' if early else 'miss'}: {speculation_stats.as_dict()}")
+    elif speculation:
+        speculation.cancel() # a partial still in flight is of no use now
     
     if not text.strip():
+        if audio_stream.seq:
+            await audio_stream.close()
         return
 
-    # 3. LLM
-    response_text = llm_service.get_response(text)
-    print(f"LLM Response: {response_text}")
-    
-    # 4. TTS
-    audio_response = tts_service.generate_audio(response_text)
-    
-    # 5. Send back to client
-    # Send text first (optional)
-    await websocket.send_text(json.dumps({"type": "text_response", "data": response_text}))
-    
-    # Send audio
-    await websocket.send_bytes(audio_response)
-    print("Sent audio response")
+    # 3. LLM -> TTS, pipelined per sentence
+    # The LLM keeps streaming in the background while finished sentences are
+    # synthesized and sent, so the first audio only waits for the first sentence.
+    if early:
+        early.commit(memory)
+        sentences, producer = early.sentences, early.producer
+    else:
+        sentences, producer = start_reply(text, memory)
+
+    first_sentence = True
+    try:
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                break
+            print(f"LLM Sentence: {sentence}")
+
+            # 4. TTS
+            with tts_latency.time():
+                audio_response = await tts_scheduler.synthesize(sentence)
+
+            # 5. Send back to client: text first (optional), then its audio as stream frames
+            if first_sentence:
+                first_sentence = False
+                first_audio_latency.observe(time.perf_counter() - turn_start)
+                reply_latency.observe(time.perf_counter() - turn_start)
+            with send_latency.time():
+                await link.send_text(sentence, audio_stream.stream_id)
+                await audio_stream.write(audio_response)
+
+        await audio_stream.close()
+        turn_latency.observe(time.perf_counter() - turn_start)
+        print(f"Sent audio response: {audio_stream.seq} frames, {audio_stream.bytes_sent} bytes "
+              f"({audio_stream.wire_bytes} as {link.codec})")
+        if TTS_EXECUTOR != "process" and tts_service.cache:
+            print(f"TTS cache: {tts_service.cache.stats()}")
+    finally:
+        producer.cancel()
+
+    # Summarize old turns now that the reply is out, keeping the next prompt small.
+    compact_in_background(memory)
+
+def compact_in_background(memory):
+    """
+    Run the history compaction as its own task rather than as part of the turn:
+    the turn is done once the reply is sent, so a barge-in during compaction has
+    no reply to interrupt and must not cut the summary short. One compaction per
+    conversation at a time; apply_summary keeps messages added meanwhile.
+    """
+    task = _compactions.get(id(memory))
+    if task and not task.done():
+        return
+    task = asyncio.create_task(compact_history(memory))
+    _compactions[id(memory)] = task
+    task.add_done_callback(lambda _: _compactions.pop(id(memory), None))
+
+async def compact_history(memory):
+    async with stage_executor.slot("llm"):
+        await llm_service.compact(memory)
+
+async def stream_sentences(text: str, sentences: asyncio.Queue, memory=None):
+    """
+    Feed LLM tokens through the sentence chunker and queue each fragment for TTS.
+    A None marks the end of the reply.
+    """
+    chunker = SentenceChunker()
+    start = time.perf_counter()
+    first = True
+    try:
+        async with stage_executor.slot("llm"):
+            async for token in llm_service.stream_response(text, memory):
+                if first:
+                    llm_first_token.observe(time.perf_counter() - start)
+                    first = False
+                for sentence in chunker.push(token):
+                    await sentences.put(sentence)
+        llm_response.observe(time.perf_counter() - start)
+        tail = chunker.flush()
+        if tail:
+            await sentences.put(tail)
+    finally:
+        sentences.put_nowait(None)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def load_vad():
+    thread_budget.pin("vad")
+    vad_service.ensure_loaded()
+
+@app.on_event("startup")
+async def start_monitoring():
+    # Load and warm up the VAD before the first client instead of on its first chunk, from its
+    # pinned stage thread so the session's own threads stay on the VAD's cores
+    await asyncio.get_running_loop().run_in_executor(stage_executor.pool("vad"), load_vad)
+    app.state.loop_lag_task = asyncio.create_task(monitor_loop_lag(loop_lag, loop_lag_current))
+    if ACK_CLIPS:
+        # Every codec at the native rate is ready up front; other rates when a client asks for them
+        await ack_bank.load(tts_scheduler.synthesize, [(TTS_SAMPLE_RATE, codec) for codec in CODECS])
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await stt_backend.close()
+    stage_executor.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,140 @@
+import asyncio
+import bisect
+import time
+
+# Latency buckets in seconds, from a single VAD window up to a slow LLM reply
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and two increments with no
+    lock: the event loop is the only writer, and a rare lost update from a
+    worker thread does not matter for monitoring.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1) # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self):
+        """with histogram.time(): ... records the block's duration."""
+        return _Timer(self)
+
+    def render(self):
+        lines = []
+        total = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            total += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {total}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {total}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Gauge:
+    """
+    Current value, either set() directly or read from fn at scrape time.
+    fn may return a dict to export one series per label value.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, fn=None, label=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def render(self):
+        value = self.fn() if self.fn else self.value
+        if isinstance(value, dict):
+            return [f'{self.name}{{{self.label}="{key}"}} {v}' for key, v in value.items()]
+        return [f"{self.name} {value}"]
+
+
+class MetricsRegistry:
+    """
+    Holds the server's metrics and renders them in the Prometheus text format.
+    """
+    def __init__(self, prefix="voice_"):
+        self.prefix = prefix
+        self.metrics = []
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, help, buckets))
+
+    def counter(self, name, help):
+        return self._add(Counter(self.prefix + name, help))
+
+    def gauge(self, name, help, fn=None, label=None):
+        return self._add(Gauge(self.prefix + name, help, fn, label))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+async def monitor_loop_lag(histogram: Histogram, gauge: Gauge, interval=0.25):
+    """
+    Sleep for interval and record how late the loop woke up. Lag means a
+    callback is blocking the event loop, which delays every session.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        histogram.observe(lag)
+        gauge.set(lag)
@@ -0,0 +1,101 @@
+import functools
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Zero crossings of the windowed sinc on each side, at the lower of the two rates
+FILTER_ZEROS = 16
+# Passband edge as a fraction of the lower Nyquist frequency
+ROLLOFF = 0.92
+KAISER_BETA = 8.6
+
+
+@functools.lru_cache(maxsize=None)
+def polyphase_bank(src_rate: int, dst_rate: int):
+    """
+    Anti-aliasing low-pass for src_rate -> dst_rate, split into its polyphase
+    components. Built once per rate pair.
+
+    Returns (up, down, bank, center): bank has shape (up, taps) with each
+    phase's taps reversed, so phase p applied to the taps input samples ending
+    at n is window @ bank[p]; center is the filter delay in upsampled samples.
+    """
+    g = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    taps = math.ceil(2 * FILTER_ZEROS * max(up, down) / ROLLOFF / up)
+    length = taps * up
+    center = length // 2
+    cutoff = ROLLOFF * 0.5 / max(up, down) # cycles per upsampled sample
+    t = np.arange(length) - center
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, KAISER_BETA)
+    h *= up / h.sum() # unity gain after zero-stuffing by up
+    bank = h.reshape(taps, up).T[:, ::-1] # bank[p, taps-1-j] = h[p + j*up]
+    return up, down, np.ascontiguousarray(bank, dtype=np.float32), center
+
+
+class StreamingResampler:
+    """
+    Polyphase resampler for a stream of int16 PCM pieces (e.g. one TTS
+    sentence at a time). The last taps-1 input samples and the output phase
+    carry over between calls, so the pieces join without clicks; flush()
+    returns the samples still held back by the filter delay.
+    """
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up, self.down, self.bank, center = polyphase_bank(src_rate, dst_rate)
+        self.taps = self.bank.shape[1]
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Next output's position in upsampled samples, relative to the start of history
+        self.position = center + (self.taps - 1) * self.up
+        self.samples_in = 0
+        self.samples_out = 0
+
+    @property
+    def passthrough(self) -> bool:
+        return self.src_rate == self.dst_rate
+
+    def process(self, pcm) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        self.samples_in += len(samples)
+        if self.passthrough:
+            self.samples_out += len(samples)
+            return pcm
+        return self._emit(self._run(samples.astype(np.float32)))
+
+    def flush(self) -> bytes:
+        """Output for the end of the stream; the resampler is reset afterwards."""
+        if self.passthrough:
+            return b""
+        expected = -(-self.samples_in * self.up // self.down)
+        out = self._run(np.zeros(self.taps, dtype=np.float32))[:max(0, expected - self.samples_out)]
+        tail = self._emit(out)
+        self.__init__(self.src_rate, self.dst_rate)
+        return tail
+
+    def _run(self, samples):
+        x = np.concatenate([self.history, samples])
+        up, down = self.up, self.down
+        count = max(0, (len(x) * up - 1 - self.position) // down + 1)
+        out = np.empty(count, dtype=np.float32)
+        if count:
+            windows = sliding_window_view(x, self.taps)
+            # Outputs r, r+up, r+2*up, ... share a phase and step through the input by down
+            for r in range(min(up, count)):
+                pos = self.position + r * down
+                start = pos // up - (self.taps - 1)
+                n = len(range(r, count, up))
+                if down == 1:
+                    # Consecutive windows: a plain correlation, without gathering them
+                    out[r::up] = np.correlate(x[start:start + n - 1 + self.taps], self.bank[pos % up])
+                else:
+                    out[r::up] = windows[start:start + (n - 1) * down + 1:down] @ self.bank[pos % up]
+        self.position += count * down
+        consumed = len(x) - (self.taps - 1)
+        self.position -= consumed * up
+        self.history = x[consumed:]
+        return out
+
+    def _emit(self, out):
+        self.samples_out += len(out)
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16).tobytes()
@@ -0,0 +1,175 @@
+import asyncio
+import re
+import time
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase words only, so casing and punctuation differences still match."""
+    return " ".join(re.findall(r"[\w']+", text.lower()))
+
+
+class SpeculationStats:
+    """Counters shared by all sessions."""
+    def __init__(self):
+        self.started = 0
+        self.hits = 0 # final transcript matched, the early reply was used
+        self.misses = 0 # final transcript differed, the early reply was dropped
+        self.abandoned = 0 # dropped because the user kept talking or the turn was cancelled
+        self.saved_ms = 0.0 # how long hit replies had been running when the final transcript arrived
+
+    def as_dict(self) -> dict:
+        resolved = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "abandoned": self.abandoned,
+            "hit_rate": self.hits / resolved if resolved else 0.0,
+            "avg_saved_ms": self.saved_ms / self.hits if self.hits else 0.0,
+        }
+
+
+class Speculation:
+    """
+    A reply started from a partial transcript. It runs against a fork of the
+    conversation memory; commit() merges the fork back once the reply is done.
+    """
+    def __init__(self, text, memory, start_reply):
+        self.text = text
+        self.memory = memory
+        self.started_at = time.perf_counter()
+        self.sentences, self.producer = start_reply(text, memory)
+        self._target = None
+
+    def commit(self, memory):
+        self._target = memory
+        if self.producer.done():
+            self._merge()
+        else:
+            self.producer.add_done_callback(lambda _: self._merge())
+
+    def cancel(self):
+        self.producer.cancel()
+
+    def _merge(self):
+        self._target.merge(self.memory)
+
+
+class SpeculationController:
+    """
+    Starts the LLM before the end of an utterance.
+
+    While the user speaks, the utterance so far is transcribed every poll_ms
+    (and right away when a pause begins). When the VAD has seen at least
+    silence_ms of trailing silence and the partial transcript has not changed
+    for stable_ms, the reply is started from it. resolve() is called with the
+    final transcript: if it matches, the running reply is handed over (hit),
+    otherwise it is cancelled (miss) and the caller starts a new one. Speech
+    resuming before the end event drops the early reply.
+
+    The VAD's end event usually comes before the pause's partial transcript
+    does. That partial covers the whole utterance, so when it arrives after
+    stop() the reply starts from it right away, without the stability check,
+    and still races the final transcript.
+    """
+    def __init__(self, preview, start_reply, memory, stats, silence_ms=60, stable_ms=300, poll_ms=500):
+        self.preview = preview # fn(audio_buffer) -> awaitable transcript
+        self.start_reply = start_reply # fn(text, memory) -> (sentence queue, producer task)
+        self.memory = memory
+        self.stats = stats
+        self.silence_ms = silence_ms
+        self.stable = stable_ms / 1000
+        self.poll = poll_ms / 1000
+        self.partial = None # transcription of the utterance so far, in flight
+        self.partial_in_pause = False # the partial was started after the user stopped talking
+        self.last_poll = 0.0
+        self.last_text = None
+        self.stable_since = 0.0
+        self.silent = False
+        self.stopped = False
+        self.closed = False # resolved or cancelled: nothing may start any more
+        self.speculation = None
+
+    def observe(self, audio_buffer: bytearray, trailing_silence_ms: float):
+        """
+        Call after each chunk is added to the utterance buffer.
+        """
+        silent = trailing_silence_ms >= self.silence_ms
+        if trailing_silence_ms == 0 and self.silent:
+            # Speech resumed: whatever was started from the pause is stale.
+            self._drop_speculation()
+            self.partial_in_pause = False
+        pause_began = silent and not self.silent
+        self.silent = silent
+
+        if self.speculation or (self.partial and not self.partial.done()):
+            return
+        now = time.perf_counter()
+        if not pause_began and now - self.last_poll < self.poll:
+            return
+        self.last_poll = now
+        self.partial = asyncio.ensure_future(self.preview(audio_buffer))
+        self.partial_in_pause = silent
+        self.partial.add_done_callback(self._on_partial)
+
+    def stop(self):
+        """
+        End of utterance: no more partials. A started reply keeps running, and
+        so does a partial sent during the final pause.
+        """
+        self.stopped = True
+
+    def resolve(self, final_text: str):
+        """
+        Return the early reply if it was started from final_text, else None.
+        """
+        self.stop()
+        self.closed = True
+        self._cancel_partial()
+        speculation, self.speculation = self.speculation, None
+        if speculation is None:
+            return None
+        if normalize_transcript(speculation.text) == normalize_transcript(final_text):
+            self.stats.hits += 1
+            self.stats.saved_ms += (time.perf_counter() - speculation.started_at) * 1000
+            return speculation
+        self.stats.misses += 1
+        speculation.cancel()
+        return None
+
+    def cancel(self):
+        self.stop()
+        self.closed = True
+        self._cancel_partial()
+        self._drop_speculation()
+
+    def _cancel_partial(self):
+        if self.partial:
+            self.partial.cancel()
+
+    def _drop_speculation(self):
+        if self.speculation:
+            self.stats.abandoned += 1
+            self.speculation.cancel()
+            self.speculation = None
+
+    def _on_partial(self, task):
+        # A partial that finished just before resolve() or cancel() still has
+        # this callback queued; cancelling it then had no effect.
+        if self.closed or task is not self.partial:
+            return
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.stopped and not self.partial_in_pause:
+            return # the user spoke after this partial was sent
+        text = task.result()
+        normalized = normalize_transcript(text)
+        if not normalized:
+            return
+        now = time.perf_counter()
+        if normalized != self.last_text:
+            self.last_text = normalized
+            self.stable_since = now
+        stable = self.stopped or now - self.stable_since >= self.stable
+        if self.silent and self.speculation is None and stable:
+            self.stats.started += 1
+            self.speculation = Speculation(text, self.memory.fork(), self.start_reply)
@@ -0,0 +1,217 @@
+import asyncio
+import collections
+import random
+import time
+
+import httpx
+
+from server.stt_service import STTUpload
+
+class STTBackend:
+    """
+    Interface for speech-to-text backends used by the server.
+    transcribe() returns the text, or "" if the audio could not be transcribed.
+    """
+    name = "base"
+
+    async def transcribe(self, audio_data: bytes, sample_rate=16000) -> str:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+    async def close(self):
+        pass
+
+
+class RetryableError(Exception):
+    """Timeouts, rate limits and 5xx responses: worth trying again."""
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies (seconds)."""
+    def __init__(self, window=200):
+        self.samples = collections.deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+
+class GroqSTTBackend(STTBackend):
+    """
+    Async Groq Whisper client.
+    - One pooled httpx.AsyncClient, so TLS connections are reused across utterances.
+    - Every transcription has an overall deadline; attempts inside it are
+      retried with exponential backoff and jitter on retryable failures.
+    - With hedging on, if an attempt has not answered by the observed p95
+      latency a duplicate request is fired and the first answer wins.
+    - The PCM is streamed into the request behind a WAV header without
+      copying it; upload_format "flac" or "opus" trades CPU for upload bytes.
+    """
+    name = "groq"
+
+    def __init__(self, api_key, model="whisper-large-v3-turbo", language="en",
+                 base_url="https://api.groq.com/openai/v1", deadline=10.0, attempt_timeout=6.0,
+                 max_retries=2, backoff_base=0.2, backoff_max=2.0, hedge=True,
+                 hedge_min_samples=20, hedge_default_delay=1.5, max_connections=32, upload_format="wav",
+                 transport=None):
+        self.model = model
+        self.language = language
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay = hedge_default_delay
+        self.upload_format = upload_format
+        self.latency = LatencyTracker()
+        self.counters = collections.Counter()
+
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(attempt_timeout, connect=3.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                keepalive_expiry=60.0),
+            transport=transport,
+        )
+
+    async def transcribe(self, audio_data: bytes, sample_rate=16000) -> str:
+        """
+        Transcribe audio bytes using Groq API (Whisper).
+        """
+        if self.upload_format == "wav":
+            upload = STTUpload(audio_data, sample_rate)
+        else:
+            # Compressing takes milliseconds (FLAC) to tens of milliseconds per second of audio (Opus)
+            upload = await asyncio.to_thread(STTUpload, audio_data, sample_rate, self.upload_format)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self.counters["transcriptions"] += 1
+        self.counters["audio_bytes"] += len(upload.pcm)
+
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            try:
+                return await asyncio.wait_for(self._hedged(upload), timeout=remaining)
+            except (RetryableError, asyncio.TimeoutError) as e:
+                attempt += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                if attempt > self.max_retries or loop.time() + delay >= deadline:
+                    self.counters["failures"] += 1
+                    print(f"STT Error: giving up after {attempt} attempts: {e!r}")
+                    return ""
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+            except Exception as e:
+                self.counters["failures"] += 1
+                print(f"STT Error: {e}")
+                return ""
+
+    async def _hedged(self, upload: STTUpload) -> str:
+        first = asyncio.ensure_future(self._request(upload))
+        if not self.hedge:
+            return await first
+
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay())
+            if not done:
+                self.counters["hedges"] += 1
+                second = asyncio.ensure_future(self._request(upload))
+                tasks.add(second)
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _hedge_delay(self):
+        if len(self.latency.samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return self.latency.percentile(95)
+
+    async def _request(self, upload: STTUpload) -> str:
+        start = time.perf_counter()
+        self.counters["requests"] += 1
+        self.counters["upload_bytes"] += upload.nbytes
+        try:
+            response = await self.client.post(
+                "/audio/transcriptions",
+                files={"file": upload.file()},
+                data={"model": self.model, "response_format": "text", "language": self.language},
+            )
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}") from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"HTTP {response.status_code}: {response.text[:200]}")
+        response.raise_for_status()
+
+        self.latency.add(time.perf_counter() - start)
+        return response.text.strip()
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency.percentile(50), self.latency.percentile(95)
+        return dict(self.counters, p50=p50, p95=p95)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class FakeSTTBackend(STTBackend):
+    """
+    Offline stand-in for load tests. Latency is log-normal around median_ms
+    (sigma controls the tail), and failure_rate of the calls return "".
+    """
+    name = "fake"
+
+    def __init__(self, transcripts=("Hello, how are you today?",), median_ms=300, sigma=0.3,
+                 failure_rate=0.0, seed=None):
+        self.transcripts = list(transcripts)
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.latency = LatencyTracker()
+        self.counters = collections.Counter()
+
+    async def transcribe(self, audio_data: bytes, sample_rate=16000) -> str:
+        delay = self.median * self.random.lognormvariate(0, self.sigma)
+        await asyncio.sleep(delay)
+        self.latency.add(delay)
+        self.counters["transcriptions"] += 1
+        self.counters["audio_bytes"] += len(audio_data)
+        if self.random.random() < self.failure_rate:
+            self.counters["failures"] += 1
+            return ""
+        return self.transcripts[(self.counters["transcriptions"] - 1) % len(self.transcripts)]
+
+    def stats(self) -> dict:
+        return dict(self.counters, p50=self.latency.percentile(50), p95=self.latency.percentile(95))
+
+
+def create_stt_backend(name: str, api_key=None, **kwargs) -> STTBackend:
+    if name == "groq":
+        return GroqSTTBackend(api_key, **kwargs)
+    if name == "fake":
+        return FakeSTTBackend(**kwargs)
+    raise ValueError(f"Unknown STT backend: {name}")
@@ -1,30 +1,116 @@
 import os
-from groq import Groq
 import io
+import struct
+from groq import Groq
 import soundfile as sf
 import numpy as np
 
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI") # 44 bytes: RIFF, fmt and data chunk headers
+
+def wav_header(num_bytes: int, sample_rate=16000, channels=1, sample_width=2) -> bytes:
+    """
+    Canonical 44-byte header for num_bytes of little-endian PCM.
+    """
+    return WAV_HEADER.pack(b"RIFF", 36 + num_bytes, b"WAVE", b"fmt ", 16, 1, channels, sample_rate,
+                           sample_rate * channels * sample_width, channels * sample_width, sample_width * 8,
+                           b"data", num_bytes)
+
+
+class WavReader(io.RawIOBase):
+    """
+    Read-only file over a WAV header and a memoryview of the PCM.
+    HTTP clients stream it into the request body chunk by chunk, so the
+    utterance is never copied whole.
+    """
+    def __init__(self, header: bytes, pcm: memoryview):
+        self.header = header
+        self.pcm = pcm
+        self.size = len(header) + len(pcm)
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def readinto(self, b):
+        out = memoryview(b).cast("B")
+        n = 0
+        header_len = len(self.header)
+        if self.pos < header_len:
+            part = self.header[self.pos:self.pos + len(out)]
+            out[:len(part)] = part
+            n = len(part)
+        start = max(0, self.pos + n - header_len)
+        part = self.pcm[start:start + len(out) - n]
+        out[n:n + len(part)] = part
+        n += len(part)
+        self.pos += n
+        return n
+
+
+class STTUpload:
+    """
+    One utterance prepared for a transcription request.
+    upload_format "wav" sends the PCM as is behind a 44-byte header; "flac"
+    (lossless, roughly half the bytes) and "opus" (Ogg Opus, a small
+    fraction of the bytes) are encoded once and reused across retries.
+    """
+    FORMATS = {
+        "wav": ("audio.wav", "audio/wav", None),
+        "flac": ("audio.flac", "audio/flac", ("FLAC", "PCM_16")),
+        "opus": ("audio.ogg", "audio/ogg", ("OGG", "OPUS")),
+    }
+
+    def __init__(self, audio_data, sample_rate=16000, upload_format="wav"):
+        if upload_format not in self.FORMATS:
+            raise ValueError(f"Unknown STT upload format: {upload_format}")
+        self.filename, self.content_type, encoding = self.FORMATS[upload_format]
+        self.pcm = memoryview(audio_data).cast("B")
+        if encoding is None:
+            self.header = wav_header(len(self.pcm), sample_rate)
+            self.encoded = None
+            self.nbytes = len(self.header) + len(self.pcm)
+        else:
+            buffer = io.BytesIO()
+            sf.write(buffer, np.frombuffer(self.pcm, dtype=np.int16), sample_rate,
+                     format=encoding[0], subtype=encoding[1])
+            self.encoded = buffer.getvalue()
+            self.nbytes = len(self.encoded)
+
+    def file(self):
+        """
+        (filename, content, content_type) for a multipart upload.
+        A new reader each call, so concurrent (hedged) requests don't share a position.
+        """
+        if self.encoded is not None:
+            return (self.filename, self.encoded, self.content_type)
+        return (self.filename, WavReader(self.header, self.pcm), self.content_type)
+
 class STTService:
-    def __init__(self, api_key):
+    def __init__(self, api_key, upload_format="wav"):
         self.client = Groq(api_key=api_key)
+        self.upload_format = upload_format
 
     def transcribe(self, audio_data: bytes, sample_rate=16000) -> str:
         """
         Transcribe audio bytes using Groq API (Whisper).
         """
         try:
-            # Convert raw bytes to a file-like object that Groq API accepts
             # We need to wrap the raw PCM data into a WAV container or similar for the API
-            audio_int16 = np.frombuffer(audio_data, dtype=np.int16)
-            
-            # Create an in-memory file
-            buffer = io.BytesIO()
-            sf.write(buffer, audio_int16, sample_rate, format='WAV')
-            buffer.seek(0)
-            buffer.name = "audio.wav" # Groq client checks filename extension
+            upload = STTUpload(audio_data, sample_rate, self.upload_format)
 
             transcription = self.client.audio.transcriptions.create(
-                file=(buffer.name, buffer.read()),
+                file=upload.file()[:2], # Groq client checks filename extension
                 model="whisper-large-v3-turbo", # Or distil-whisper-large-v3-en
                 response_format="text",
                 language="en"
@@ -0,0 +1,88 @@
+import re
+
+# Words whose trailing period does not end a sentence.
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "a.m", "p.m", "u.s"}
+
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s')
+CLAUSE_END = re.compile(r'[,;:—]\s')
+
+class SentenceChunker:
+    """
+    Cuts a stream of LLM tokens into speakable fragments.
+    Complete sentences are released as soon as their boundary arrives. Long
+    sentences are also cut at clause boundaries (, ; :) so TTS is never kept
+    waiting on a run-on sentence, and the first fragment of a reply may be cut
+    at a clause early to get audio out sooner.
+    """
+    def __init__(self, min_chars=12, max_clause_chars=80, first_clause_chars=25):
+        self.min_chars = min_chars
+        self.max_clause_chars = max_clause_chars
+        self.first_clause_chars = first_clause_chars
+        self.buffer = ""
+        self.emitted = 0
+
+    def push(self, token: str) -> list:
+        """
+        Add a token and return the fragments that are now complete.
+        """
+        self.buffer += token
+        fragments = []
+        while True:
+            fragment = self._next_fragment()
+            if not fragment:
+                break
+            fragments.append(fragment)
+        return fragments
+
+    def flush(self) -> str:
+        """
+        Return whatever is left once the stream has finished.
+        """
+        rest = self.buffer.strip()
+        self.buffer = ""
+        if rest:
+            self.emitted += 1
+        return rest
+
+    def _next_fragment(self):
+        cut = self._sentence_cut()
+        if cut is None:
+            clause_limit = self.first_clause_chars if self.emitted == 0 else self.max_clause_chars
+            if len(self.buffer) >= clause_limit:
+                cut = self._clause_cut()
+        if cut is None:
+            return None
+
+        fragment = self.buffer[:cut].strip()
+        self.buffer = self.buffer[cut:].lstrip()
+        if not fragment:
+            return None
+        self.emitted += 1
+        return fragment
+
+    def _sentence_cut(self):
+        for match in SENTENCE_END.finditer(self.buffer):
+            end = match.end()
+            if end < self.min_chars:
+                continue
+            if self._is_abbreviation(match.start()):
+                continue
+            return end
+        return None
+
+    def _clause_cut(self):
+        cut = None
+        for match in CLAUSE_END.finditer(self.buffer):
+            if match.end() >= self.min_chars:
+                cut = match.end()
+        return cut
+
+    def _is_abbreviation(self, dot_index):
+        if self.buffer[dot_index] != ".":
+            return False
+        words = self.buffer[:dot_index].split()
+        if not words:
+            return False
+        word = words[-1].lower().lstrip("(\"'")
+        # Single letters are initials ("J. Smith"), digits are numbered lists ("1. ").
+        return word in ABBREVIATIONS or len(word) == 1
@@ -0,0 +1,189 @@
+import os
+import re
+import hashlib
+import threading
+import collections
+import numpy as np
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different strings share an entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+def file_fingerprint(*paths) -> str:
+    """
+    Cheap identity for model files (name, size, mtime) so a new model or
+    voice file invalidates the cache without hashing hundreds of megabytes.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        try:
+            st = os.stat(path)
+            h.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{path}:missing;".encode())
+    return h.hexdigest()[:16]
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized int16 PCM.
+    Two tiers: an in-memory LRU bounded by max_memory_bytes, and a directory
+    of raw .pcm files (bounded by max_disk_bytes) that survives restarts.
+    Disk entries are opened with np.memmap, so a hit is served from the page
+    cache without reading the file into Python first.
+    Safe to use from several TTS worker threads; forked TTS worker processes
+    share the directory after partition().
+    """
+    def __init__(self, cache_dir="tts_cache", max_memory_bytes=64 << 20, max_disk_bytes=512 << 20, model_id=""):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.model_id = model_id
+        self.lock = threading.Lock()
+        self.memory = collections.OrderedDict() # key -> memoryview of PCM bytes
+        self.memory_bytes = 0
+        self.disk = collections.OrderedDict() # key -> size, oldest first
+        self.disk_bytes = 0
+        self.shared = False # other processes write to cache_dir too
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    def key(self, text: str, voice: str, speed: float, lang: str) -> str:
+        raw = f"{self.model_id}\0{voice}\0{speed:.3f}\0{lang}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Return the cached PCM as a byte memoryview, or None.
+        """
+        with self.lock:
+            pcm = self.memory.get(key)
+            if pcm is not None:
+                self.memory.move_to_end(key)
+                self.hits_memory += 1
+                return pcm
+            on_disk = key in self.disk
+        if not on_disk and self.shared:
+            # Written by another worker; it stays in that worker's index, not ours
+            on_disk = os.path.exists(self._path(key))
+
+        if on_disk:
+            pcm = self._read_disk(key)
+            if pcm is not None:
+                with self.lock:
+                    self.hits_disk += 1
+                    if key in self.disk:
+                        self.disk.move_to_end(key)
+                    self._remember(key, pcm)
+                return pcm
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, pcm: bytes):
+        if not pcm:
+            return
+        view = memoryview(pcm).cast("B")
+        with self.lock:
+            self._remember(key, view)
+        if self.cache_dir:
+            self._write_disk(key, view)
+
+    def partition(self, index: int, count: int):
+        """
+        Make this one of count processes sharing cache_dir (the forked TTS
+        workers, which all inherit one cache from before the fork). It keeps
+        1/count of both budgets and indexes only the existing files whose key
+        falls to index, so every file has one owner that may evict it and the
+        directory stays within max_disk_bytes overall.
+        """
+        with self.lock:
+            self.max_memory_bytes //= count
+            self.max_disk_bytes //= count
+            for key in [k for k in self.disk if int(k[:8], 16) % count != index]:
+                self.disk_bytes -= self.disk.pop(key)
+            self.shared = True
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "disk_entries": len(self.disk),
+                "disk_bytes": self.disk_bytes,
+            }
+
+    def _remember(self, key, view):
+        # Caller holds the lock
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        if view.nbytes > self.max_memory_bytes:
+            return
+        self.memory[key] = view
+        self.memory_bytes += view.nbytes
+        while self.memory_bytes > self.max_memory_bytes:
+            _, old = self.memory.popitem(last=False)
+            self.memory_bytes -= old.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".pcm")
+
+    def _read_disk(self, key):
+        try:
+            audio = np.memmap(self._path(key), dtype=np.int16, mode="r")
+        except (OSError, ValueError):
+            with self.lock:
+                self.disk_bytes -= self.disk.pop(key, 0)
+            return None
+        return memoryview(audio).cast("B")
+
+    def _write_disk(self, key, view):
+        path = self._path(key)
+        # Unique per writer: forked TTS workers share the directory and may have equal thread idents
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(view)
+            os.replace(tmp, path) # atomic, readers never see a partial file
+        except OSError as e:
+            print(f"TTS Cache Warning: could not write {path}: {e}")
+            return
+
+        with self.lock:
+            if key not in self.disk:
+                self.disk[key] = view.nbytes
+                self.disk_bytes += view.nbytes
+            evicted = []
+            while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 1:
+                old, size = self.disk.popitem(last=False)
+                self.disk_bytes -= size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def _scan_disk(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pcm"):
+                    st = os.stat(os.path.join(root, name))
+                    entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_bytes += size
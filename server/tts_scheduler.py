@@ -0,0 +1,134 @@
+import asyncio
+
+class TTSScheduler:
+    """
+    Collects sentence synthesis requests from all sessions and dispatches them
+    to the TTS stage pool.
+
+    Requests arriving within window_ms of each other are gathered together.
+    Identical requests (same text and voice) in the window, or already being
+    synthesized, share one inference. With a batch_fn the gathered requests
+    run as batches of up to max_batch; without one they go to the stage's
+    fixed-size worker pool, and the window is skipped while a worker is idle
+    so a lightly loaded server adds no latency.
+    """
+    def __init__(self, synthesize, executor, stage="tts", window_ms=15, max_batch=8, batch_fn=None):
+        self.synthesize_fn = synthesize
+        self.executor = executor
+        self.stage = stage
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batch_fn = batch_fn
+        self._waiting = {} # (text, voice) -> [futures], not dispatched yet
+        self._inflight = {} # (text, voice) -> _Job
+        self._flush_handle = None
+        self._active = 0 # dispatched jobs not finished yet
+        self.requests = 0
+        self.coalesced = 0
+        self.jobs = 0
+
+    async def synthesize(self, text: str, voice="af_sarah"):
+        """
+        Queue one sentence and wait for its PCM.
+        """
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (text, voice)
+
+        job = self._inflight.get(key)
+        if job is not None:
+            self.coalesced += 1
+            job.add_waiter(key, future)
+            return await future
+
+        if key in self._waiting:
+            self.coalesced += 1
+        self._waiting.setdefault(key, []).append(future)
+
+        if self.batch_fn is None and self._has_idle_worker():
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "coalesced": self.coalesced, "jobs": self.jobs,
+                "waiting": len(self._waiting), "inflight": len(self._inflight)}
+
+    def _has_idle_worker(self):
+        busy = max(self._active, self.executor.pending[self.stage])
+        return busy < self.executor.limits[self.stage]
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        waiting, self._waiting = self._waiting, {}
+        # Requests whose turn was cancelled (barge-in) while waiting are dropped here
+        groups = {}
+        for key, futures in waiting.items():
+            futures = [f for f in futures if not f.done()]
+            if futures:
+                groups[key] = futures
+
+        keys = list(groups)
+        size = 1 if self.batch_fn is None else self.max_batch
+        for i in range(0, len(keys), size):
+            self._start({key: groups[key] for key in keys[i:i + size]})
+
+    def _start(self, groups):
+        self.jobs += 1
+        self._active += 1
+        job = _Job(self, groups)
+        for key in groups:
+            self._inflight[key] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(list(groups)))
+        job.task.add_done_callback(job.finish)
+
+    async def _run(self, keys):
+        if self.batch_fn is None:
+            text, voice = keys[0]
+            return [await self.executor.run(self.stage, self.synthesize_fn, text, voice)]
+        return await self.executor.run(self.stage, self.batch_fn, keys)
+
+
+class _Job:
+    """One dispatched inference and the futures waiting on each of its keys."""
+    def __init__(self, scheduler, groups):
+        self.scheduler = scheduler
+        self.keys = list(groups)
+        self.waiters = {key: list(futures) for key, futures in groups.items()}
+        self.task = None
+        for futures in groups.values():
+            for future in futures:
+                future.add_done_callback(self._waiter_done)
+
+    def add_waiter(self, key, future):
+        self.waiters[key].append(future)
+        future.add_done_callback(self._waiter_done)
+
+    def _waiter_done(self, future):
+        # If every session waiting on this job went away, stop it so a queued
+        # job frees its place in the pool for the next turn.
+        if future.cancelled() and self.task and not self.task.done():
+            if all(f.done() for futures in self.waiters.values() for f in futures):
+                self.task.cancel()
+
+    def finish(self, task):
+        self.scheduler._active -= 1
+        for key in self.keys:
+            if self.scheduler._inflight.get(key) is self:
+                del self.scheduler._inflight[key]
+
+        for i, key in enumerate(self.keys):
+            for future in self.waiters[key]:
+                if future.done():
+                    continue
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result()[i])
@@ -1,40 +1,120 @@
 import soundfile as sf
+import onnxruntime
+from shared.thread_budget import session_options
 from kokoro_onnx import Kokoro
 import numpy as np
 import io
+import time
+import random
+from server.tts_cache import TTSCache, file_fingerprint
+from server.voice_store import VoiceStore
+
+SAMPLE_RATE = 24000 # Kokoro always outputs 24 kHz audio
 
 class TTSService:
-    def __init__(self, model_path="kokoro-v0_19.onnx", voices_path="voices.bin.npz"):
+    def __init__(self, model_path="kokoro-v0_19.onnx", voices_path="voices.index.npz", cache_dir=None, cache_mb=64,
+                 threads=None, options=None):
+        self.sample_rate = SAMPLE_RATE
+        # Voices come from the memory-mapped store (server/voice_store.py) when voices_path is
+        # its index; a plain npz of voices is still handed to Kokoro as is.
+        self.voices = VoiceStore(voices_path) if VoiceStore.is_store(voices_path) else None
+        # Optional cache of synthesized phrases, keyed on the model and voice files too
+        self.cache = None
+        if cache_dir:
+            voice_files = (voices_path, self.voices.data_path) if self.voices else (voices_path,)
+            self.cache = TTSCache(cache_dir, max_memory_bytes=cache_mb << 20,
+                                  model_id=file_fingerprint(model_path, *voice_files))
         # Assuming model and voices are downloaded/available locally or we need to handle that.
         # For now, we'll initialize assuming the files exist or will be provided.
         # If the user hasn't provided them, we might need a setup script or instructions.
         # But for the code structure:
         try:
-             self.kokoro = Kokoro(model_path, voices_path)
+            if threads or options:
+                # Fixed onnxruntime threads (e.g. 1 per forked worker process) or a ThreadBudget's options
+                options = options or session_options(threads)
+                session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                       providers=["CPUExecutionProvider"])
+                self.kokoro = Kokoro.from_session(session, voices_path)
+            else:
+                self.kokoro = Kokoro(model_path, voices_path)
         except Exception as e:
             print(f"TTS Init Warning: {e}. Make sure model files are present.")
             self.kokoro = None
 
-    def generate_audio(self, text: str, voice="af_sarah") -> bytes:
+    def generate_audio(self, text: str, voice="af_sarah", speed=1.0, lang="en-us") -> bytes:
         """
         Generate audio from text using Kokoro ONNX.
-        Returns raw audio bytes (PCM).
+        Returns raw audio bytes (PCM). Cache hits come back as a memoryview.
         """
+        key = None
+        if self.cache:
+            key = self.cache.key(text, voice, speed, lang)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
         if not self.kokoro:
             print("TTS model not initialized.")
             return b""
 
         try:
             # generate returns (audio, sample_rate)
+            style = self.voices[voice] if self.voices else voice
             audio, sample_rate = self.kokoro.create(
-                text, voice=voice, speed=1.0, lang="en-us"
+                text, voice=style, speed=speed, lang=lang
             )
             
             # Convert float32 numpy array to int16 bytes for transmission
             # Audio is typically float32 in [-1, 1]
             audio_int16 = (audio * 32767).astype(np.int16)
             
-            return audio_int16.tobytes()
+            audio_bytes = audio_int16.tobytes()
+            if key:
+                self.cache.put(key, audio_bytes)
+            return audio_bytes
         except Exception as e:
             print(f"TTS Generation Error: {e}")
             return b""
+
+
+class StubTTSService:
+    """
+    Offline stand-in for load tests. Each call blocks its worker for a
+    log-normal time around median_ms plus ms_per_char per character, like a
+    CPU-bound model would, and returns a quiet tone about as long as the
+    sentence takes to say.
+    """
+    def __init__(self, median_ms=150, ms_per_char=1.0, sigma=0.3, seed=None):
+        self.sample_rate = SAMPLE_RATE
+        self.cache = None
+        self.median = median_ms / 1000
+        self.per_char = ms_per_char / 1000
+        self.sigma = sigma
+        self.random = random.Random(seed)
+
+    def generate_audio(self, text: str, voice="af_sarah", speed=1.0, lang="en-us") -> bytes:
+        time.sleep((self.median + self.per_char * len(text)) * self.random.lognormvariate(0, self.sigma))
+        n = int(len(text) * 0.06 * SAMPLE_RATE / speed) # about 60 ms of speech per character
+        t = np.arange(n) / SAMPLE_RATE
+        return (np.sin(2 * np.pi * 220 * t) * 1000).astype(np.int16).tobytes()
+
+
+# Process-pool support: init_worker loads the model into this module, then
+# worker processes handle generate_in_worker calls. With a "fork" stage the
+# model is loaded once and the forked workers share it; with a "process"
+# stage each worker runs init_worker itself.
+_worker_tts = None
+
+def init_worker(model_path="kokoro-v0_19.onnx", voices_path="voices.index.npz", cache_dir=None, cache_mb=64,
+                threads=None):
+    global _worker_tts
+    _worker_tts = TTSService(model_path, voices_path, cache_dir=cache_dir, cache_mb=cache_mb, threads=threads)
+
+def partition_worker_cache(index: int, count: int):
+    """Run in each forked worker: it takes its share of the cache inherited from init_worker."""
+    if _worker_tts.cache:
+        _worker_tts.cache.partition(index, count)
+
+def generate_in_worker(text: str, voice="af_sarah") -> bytes:
+    # Results go back to the parent process, so cache hits must become bytes
+    return bytes(_worker_tts.generate_audio(text, voice=voice))
@@ -1,8 +1,41 @@
-import torch
+import os
+import asyncio
+import collections
 import numpy as np
+from server.audio_buffers import PcmReframer
+from shared.thread_budget import session_options, configure_torch
+
+# Silero VAD v5 exported to ONNX; setup.py downloads it next to this file.
+DEFAULT_ONNX_MODEL = os.path.join(os.path.dirname(__file__), "silero_vad.onnx")
 
 class VADService:
-    def __init__(self, threshold=0.5, sampling_rate=16000):
+    """
+    Owns the shared Silero model. Speech state lives in VADSession objects,
+    one per connection, so clients never see each other's hidden state.
+    This backend loads the TorchScript model through torch.hub; threads sets
+    torch's intra-op thread count (process-wide), None leaves torch's default.
+    """
+    def __init__(self, threshold=0.5, sampling_rate=16000, min_silence_duration_ms=100, speech_pad_ms=30,
+                 threads=None):
+        self.threshold = threshold
+        self.threads = threads
+        self.sampling_rate = sampling_rate
+        self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+
+        # Silero only accepts fixed windows: 512 samples (32 ms) at 16 kHz, 256 at 8 kHz.
+        # The model also expects the tail of the previous window as context.
+        self.window_size = 512 if sampling_rate == 16000 else 256
+        self.context_size = 64 if sampling_rate == 16000 else 32
+
+        self.load()
+        # Session used by the synchronous process_chunk() API.
+        self._default_session = self.create_session()
+
+    def load(self):
+        import torch
+        if self.threads:
+            configure_torch(self.threads)
         self.model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad',
                                            model='silero_vad',
                                            force_reload=False,
@@ -12,30 +45,287 @@ class VADService:
          self.read_audio,
          self.VADIterator,
          self.collect_chunks) = utils
-        
-        self.threshold = threshold
-        self.sampling_rate = sampling_rate
-        self.vad_iterator = self.VADIterator(self.model)
-        
-    def process_chunk(self, audio_chunk: bytes) -> dict:
+        # The scripted wrapper keeps a single hidden state internally; the inner
+        # network takes the state explicitly, which is what lets us batch sessions.
+        self.net = self.model._model if self.sampling_rate == 16000 else self.model._model_8k
+
+    def ensure_loaded(self):
+        # The torch.hub model is loaded in __init__
+        pass
+
+    def create_session(self):
+        return VADSession(self)
+
+    def infer_batch(self, sessions, frames: np.ndarray) -> np.ndarray:
+        """
+        Run one forward pass over frames[i] for sessions[i].
+        frames is float32 with shape (batch, window_size). Updates every
+        session's hidden state and context, returns speech probabilities.
         """
-        Process a raw audio chunk (bytes) and return VAD status.
+        import torch
+        x = np.concatenate([np.concatenate([s.context for s in sessions], axis=0), frames], axis=1)
+        state = np.concatenate([s.state for s in sessions], axis=1)
+        with torch.no_grad():
+            out, state = self.net(torch.from_numpy(x), torch.from_numpy(state))
+        store_state(sessions, state.numpy(), x, self.context_size)
+        return out.reshape(-1).numpy()
+
+    def process_chunk(self, audio_chunk: bytes) -> list:
+        """
+        Process a raw audio chunk (bytes) and return its VAD events in order.
         Assumes 16kHz, 16-bit mono audio.
         """
-        # Convert bytes to float32 tensor
-        audio_int16 = np.frombuffer(audio_chunk, dtype=np.int16)
-        audio_float32 = audio_int16.astype(np.float32) / 32768.0
-        tensor = torch.from_numpy(audio_float32)
-        
-        # Get speech probability/status
-        # VADIterator keeps state, so we just feed it chunks
-        speech_dict = self.vad_iterator(tensor, return_seconds=True)
-        
-        # vad_iterator returns a dict when a speech segment starts or ends
-        # e.g., {'start': 0.5} or {'end': 1.2}
-        # If nothing interesting happens, it returns None
-        
-        return speech_dict
+        return self._default_session.process_chunk(audio_chunk)
+
+    def is_speech(self, audio_chunk: bytes) -> np.ndarray:
+        """
+        Per-window speech decision (bool per VAD window) for a raw audio chunk.
+        """
+        return self._default_session.is_speech(audio_chunk)
 
     def reset(self):
-        self.vad_iterator.reset_states()
+        self._default_session.reset()
+
+
+class OnnxVADService(VADService):
+    """
+    Silero VAD through onnxruntime: no torch import and no network access.
+    The model is loaded on first use (or by an explicit ensure_loaded() at
+    startup) and a warmup inference runs right away, so the first real chunk
+    does not pay for session initialization. options (onnxruntime
+    SessionOptions, e.g. from a ThreadBudget) replaces the default of threads
+    intra-op threads.
+    """
+    def __init__(self, model_path=DEFAULT_ONNX_MODEL, threshold=0.5, sampling_rate=16000,
+                 min_silence_duration_ms=100, speech_pad_ms=30, threads=1, options=None):
+        self.model_path = model_path
+        self.options = options
+        self.session = None
+        self._sr = np.array(sampling_rate, dtype=np.int64)
+        super().__init__(threshold, sampling_rate, min_silence_duration_ms, speech_pad_ms, threads)
+
+    def load(self):
+        # Deferred to ensure_loaded()
+        pass
+
+    def ensure_loaded(self):
+        if self.session is not None:
+            return
+        import onnxruntime
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Silero VAD model not found at {self.model_path}; run setup.py")
+        # One 512-sample window is tiny; extra threads only add synchronization
+        options = self.options or session_options(self.threads)
+        self.session = onnxruntime.InferenceSession(self.model_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        # Warmup on a throwaway session so allocations happen before the first client
+        self.infer_batch([VADSession(self)], np.zeros((1, self.window_size), dtype=np.float32))
+
+    def infer_batch(self, sessions, frames: np.ndarray) -> np.ndarray:
+        self.ensure_loaded()
+        x = np.concatenate([np.concatenate([s.context for s in sessions], axis=0), frames], axis=1)
+        state = np.concatenate([s.state for s in sessions], axis=1)
+        out, state = self.session.run(None, {"input": x, "state": state, "sr": self._sr})
+        store_state(sessions, state, x, self.context_size)
+        return out.reshape(-1)
+
+
+def create_vad_service(backend="onnx", **kwargs) -> VADService:
+    if backend == "onnx":
+        return OnnxVADService(**kwargs)
+    if backend == "torch":
+        kwargs.pop("model_path", None)
+        return VADService(**kwargs)
+    raise ValueError(f"Unknown VAD backend: {backend}")
+
+def store_state(sessions, state, x, context_size):
+    # Copies, so a session does not keep the whole batch's arrays alive
+    for i, session in enumerate(sessions):
+        session.state = state[:, i:i + 1].copy()
+        session.context = x[i:i + 1, -context_size:].copy()
+
+
+class VADSession:
+    """
+    Per-connection VAD state: the model's hidden state and context plus the
+    start/end state machine from Silero's VADIterator.
+    """
+    def __init__(self, service: VADService):
+        self.service = service
+        self.reframer = PcmReframer(service.window_size)
+        self.reset()
+
+    def reset(self):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros((1, self.service.context_size), dtype=np.float32)
+        self.triggered = False
+        self.speech = False # decision for the latest window
+        self.temp_end = 0
+        self.current_sample = 0
+        self.reframer.clear()
+
+    @property
+    def trailing_silence_ms(self) -> float:
+        """
+        How long the current utterance has been silent, before the end event fires.
+        0 while speech continues or when not in an utterance.
+        """
+        if not self.triggered or not self.temp_end:
+            return 0.0
+        return (self.current_sample - self.temp_end) * 1000 / self.service.sampling_rate
+
+    def split_frames(self, audio_chunk: bytes) -> np.ndarray:
+        """
+        Cut int16 bytes into whole VAD windows, keeping the remainder for the next call.
+        Returns float32 frames with shape (n, window_size).
+        """
+        return self.reframer.feed(audio_chunk)
+
+    def apply(self, speech_prob: float):
+        """
+        Advance the start/end state machine by one window.
+        Mirrors VADIterator.__call__ with return_seconds=True.
+        """
+        svc = self.service
+        window = svc.window_size
+        self.current_sample += window
+        self.speech = speech_prob >= svc.threshold
+
+        if speech_prob >= svc.threshold and self.temp_end:
+            self.temp_end = 0
+
+        if speech_prob >= svc.threshold and not self.triggered:
+            self.triggered = True
+            speech_start = max(0, self.current_sample - svc.speech_pad_samples - window)
+            return {'start': round(speech_start / svc.sampling_rate, 1)}
+
+        if speech_prob < svc.threshold - 0.15 and self.triggered:
+            if not self.temp_end:
+                self.temp_end = self.current_sample
+            if self.current_sample - self.temp_end < svc.min_silence_samples:
+                return None
+            speech_end = self.temp_end + svc.speech_pad_samples - window
+            self.temp_end = 0
+            self.triggered = False
+            return {'end': round(speech_end / svc.sampling_rate, 1)}
+
+        return None
+
+    def process_chunk(self, audio_chunk: bytes) -> list:
+        """
+        Synchronous path: run this session's windows through the model one by one.
+        Returns the transitions, {'start': t} or {'end': t}, in the order they
+        happened; a chunk spanning several windows can hold both (a blip, or a
+        pause that ends and speech that resumes). Empty if there were none.
+        """
+        events = []
+        for frame in self.split_frames(audio_chunk):
+            prob = self.service.infer_batch([self], frame[None, :])[0]
+            event = self.apply(float(prob))
+            if event:
+                events.append(event)
+        return events
+
+    def is_speech(self, audio_chunk: bytes) -> np.ndarray:
+        """
+        Like process_chunk, but returns the speech decision for every window.
+        """
+        flags = []
+        for frame in self.split_frames(audio_chunk):
+            prob = self.service.infer_batch([self], frame[None, :])[0]
+            self.apply(float(prob))
+            flags.append(self.speech)
+        return np.array(flags, dtype=bool)
+
+
+class VADScheduler:
+    """
+    Gathers the pending windows of all active sessions and runs them through
+    the model as one batch. A session contributes at most one window per
+    forward pass because its next window depends on the updated hidden state.
+    """
+    def __init__(self, vad_service: VADService, max_batch_size=64, max_wait_ms=2, executor=None):
+        self.vad_service = vad_service
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # session -> deque of [frames, next_index, future, events]
+        self._pending = collections.OrderedDict()
+        self._wakeup = None
+        self._task = None
+
+    async def process_chunk(self, session: VADSession, audio_chunk: bytes) -> list:
+        """
+        Queue a chunk for batched inference and wait for its VAD events, in
+        order (see VADSession.process_chunk).
+        """
+        frames = session.split_frames(audio_chunk)
+        if len(frames) == 0:
+            return []
+
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+        future = loop.create_future()
+        self._pending.setdefault(session, collections.deque()).append([frames, 0, future, []])
+        self._wakeup.set()
+        return await future
+
+    def depth(self) -> int:
+        """Windows queued for inference across all sessions."""
+        return sum(len(job[0]) - job[1] for jobs in self._pending.values() for job in jobs)
+
+    def remove(self, session: VADSession):
+        """Drop any queued work for a closed connection."""
+        jobs = self._pending.pop(session, None)
+        for job in jobs or ():
+            if not job[2].done():
+                job[2].cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Give other connections a moment to add their windows to this batch.
+            if self.max_wait and len(self._pending) < self.max_batch_size:
+                await asyncio.sleep(self.max_wait)
+
+            while self._pending:
+                batch = list(self._pending.items())[:self.max_batch_size]
+                sessions = [session for session, _ in batch]
+                frames = np.stack([jobs[0][0][jobs[0][1]] for _, jobs in batch])
+
+                try:
+                    probs = await loop.run_in_executor(self.executor, self.vad_service.infer_batch, sessions, frames)
+                except Exception as e:
+                    print(f"VAD Error: {e}")
+                    for session in sessions:
+                        self._fail(session, e)
+                    continue
+
+                for session, prob in zip(sessions, probs):
+                    jobs = self._pending.get(session)
+                    if not jobs:
+                        continue  # removed while the batch was running
+                    job = jobs[0]
+                    event = session.apply(float(prob))
+                    if event:
+                        job[3].append(event)
+                    job[1] += 1
+                    if job[1] == len(job[0]):
+                        jobs.popleft()
+                        if not job[2].done():
+                            job[2].set_result(job[3])
+                    if not jobs:
+                        del self._pending[session]
+                    else:
+                        # Round-robin so sessions beyond max_batch_size are not starved.
+                        self._pending.move_to_end(session)
+
+    def _fail(self, session, error):
+        for job in self._pending.pop(session, ()):
+            if not job[2].done():
+                job[2].set_exception(error)
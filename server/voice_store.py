@@ -0,0 +1,157 @@
+import os
+import numpy as np
+
+# Voice store: every voice embedding back to back in one raw float32 file
+# (voices.f32), plus a small index (voices.index.npz) of name -> offset and shape.
+# The data file is opened with np.memmap, so all server processes share the
+# same page-cache pages and a lookup only touches the voice it returns.
+DATA_SUFFIX = ".f32"
+
+
+class VoiceStore:
+    def __init__(self, index_path="voices.index.npz"):
+        with np.load(index_path) as index:
+            self.names = [str(name) for name in index["names"]]
+            offsets = index["offsets"].tolist()
+            shapes = [tuple(shape) for shape in index["shapes"].tolist()]
+            data_file = str(index["data_file"])
+        self.index = {name: (offset, shape) for name, offset, shape in zip(self.names, offsets, shapes)}
+        self.data_path = os.path.join(os.path.dirname(index_path), data_file)
+        self.data = np.memmap(self.data_path, dtype=np.float32, mode="r")
+
+    @staticmethod
+    def is_store(path) -> bool:
+        """True for a voice store index, False for e.g. a plain npz of voices."""
+        try:
+            with np.load(path) as index:
+                return "offsets" in index.files
+        except (OSError, ValueError):
+            return False
+
+    def __getitem__(self, name) -> np.ndarray:
+        """Read-only view of one voice; nothing is read until it is used."""
+        offset, shape = self.index[name]
+        return self.data[offset:offset + int(np.prod(shape))].reshape(shape)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def keys(self):
+        return list(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class VoiceStoreWriter:
+    """Appends voices to a new store; close() writes the index."""
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.data_file = os.path.basename(index_path).replace(".index.npz", "") + DATA_SUFFIX
+        self.out = open(os.path.join(os.path.dirname(index_path), self.data_file), "wb")
+        self.names = []
+        self.offsets = []
+        self.shapes = []
+        self.size = 0 # floats written
+
+    def begin(self, name):
+        self.names.append(name)
+        self.offsets.append(self.size)
+
+    def write(self, values):
+        values = np.asarray(values, dtype=np.float32)
+        values.tofile(self.out)
+        self.size += values.size
+
+    def end(self, shape):
+        shape = tuple(shape)
+        if int(np.prod(shape)) != self.size - self.offsets[-1]:
+            raise ValueError(f"Voice {self.names[-1]}: {self.size - self.offsets[-1]} values do not fit shape {shape}")
+        if self.shapes and len(shape) != len(self.shapes[0]):
+            raise ValueError(f"Voice {self.names[-1]} has shape {shape}, others have {len(self.shapes[0])} dimensions")
+        self.shapes.append(shape)
+
+    def add(self, name, array):
+        array = np.asarray(array, dtype=np.float32)
+        self.begin(name)
+        self.write(array.ravel())
+        self.end(array.shape)
+
+    def close(self):
+        self.out.close()
+        np.savez(self.index_path, names=np.array(self.names), offsets=np.array(self.offsets, dtype=np.int64),
+                 shapes=np.array(self.shapes, dtype=np.int64).reshape(len(self.shapes), -1),
+                 data_file=np.array(self.data_file))
+
+
+def convert_npz(npz_path, index_path):
+    """Build a store from an npz of voices (the old voices.bin.npz)."""
+    writer = VoiceStoreWriter(index_path)
+    with np.load(npz_path) as voices:
+        for name in voices.files:
+            writer.add(name, voices[name])
+    writer.close()
+    return len(writer.names)
+
+
+def convert_json(json_path, index_path, chunk_chars=1 << 20):
+    """
+    Build a store from voices.json ({"name": nested lists of floats, ...})
+    without loading it: the text is read chunk_chars at a time, and each
+    innermost list of numbers is parsed in one np.fromstring call and
+    appended to the data file right away.
+    """
+    writer = VoiceStoreWriter(index_path)
+    counts = [] # per open bracket, elements seen so far
+    dims = {} # depth -> length of the lists at that depth
+    name = None
+    with open(json_path, "r", encoding="utf-8") as f:
+        text, pos = "", 0
+
+        def more():
+            # Keep the unparsed tail and read the next chunk; False at the end of the file
+            nonlocal text, pos
+            chunk = f.read(chunk_chars)
+            text, pos = text[pos:] + chunk, 0
+            return bool(chunk)
+
+        while pos < len(text) or more():
+            c = text[pos]
+            if c in " \t\r\n,:{}":
+                pos += 1
+            elif c == '"':
+                end = text.find('"', pos + 1)
+                if end < 0:
+                    if not more():
+                        raise ValueError("Unterminated string in voices JSON")
+                    continue
+                name = text[pos + 1:end]
+                writer.begin(name)
+                dims = {}
+                pos = end + 1
+            elif c == "[":
+                if counts:
+                    counts[-1] += 1
+                counts.append(0)
+                pos += 1
+            elif c == "]":
+                depth = len(counts) - 1
+                length = counts.pop()
+                if dims.setdefault(depth, length) != length:
+                    raise ValueError(f"Voice {name} is not a rectangular array")
+                if not counts:
+                    writer.end(dims[d] for d in range(len(dims)))
+                pos += 1
+            else:
+                # A run of numbers up to the end of the innermost list
+                end = text.find("]", pos)
+                if end < 0:
+                    if not more():
+                        raise ValueError("Unterminated list in voices JSON")
+                    continue
+                values = np.fromstring(text[pos:end], dtype=np.float32, sep=",")
+                writer.write(values)
+                counts[-1] += len(values)
+                pos = end
+    writer.close()
+    return len(writer.names)
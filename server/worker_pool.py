@@ -0,0 +1,183 @@
+import itertools
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.connection import wait as wait_any
+from multiprocessing.shared_memory import SharedMemory
+
+class ForkedWorkerPool(Executor):
+    """
+    Process pool for models that are expensive to load. The initializer runs
+    once, in this process, and the workers are forked afterwards, so they
+    share the loaded weights copy-on-write instead of each loading a copy.
+
+    Jobs go over one queue to whichever worker is free. Bytes-like results
+    (PCM) are written into a multiprocessing.shared_memory block and only its
+    name goes back over the pipe; everything else is pickled as usual.
+
+    Fork before the process starts other threads (i.e. at import time, as the
+    stage pools are), and keep libraries single-threaded inside the workers:
+    threads of the parent do not exist in a forked child. worker_init(index)
+    runs in each worker right after the fork, e.g. to pin it to its cores.
+
+    A job whose future is cancelled while it waits in the queue (a barge-in)
+    is skipped by the worker that takes it, instead of being run for nothing.
+
+    Like ProcessPoolExecutor, the pool breaks when a worker dies (OOM kill,
+    crash in native code): pending futures fail with BrokenProcessPool, the
+    other workers are stopped and submit() raises.
+    """
+    def __init__(self, max_workers, initializer=None, initargs=(), worker_init=None):
+        if initializer:
+            initializer(*initargs)
+        # One resource tracker for all processes, so blocks created by a worker
+        # and unlinked here are not reported as leaked.
+        resource_tracker.ensure_running()
+        ctx = multiprocessing.get_context("fork")
+        self.jobs = ctx.SimpleQueue()
+        self.results = ctx.SimpleQueue()
+        # Cancelled flags shared with the workers, one slot per job id modulo the size
+        self.cancelled = ctx.Array("b", CANCEL_SLOTS, lock=False)
+        self.workers = [ctx.Process(target=_worker_loop,
+                                    args=(self.jobs, self.results, self.cancelled, worker_init, i),
+                                    daemon=True, name=f"forked-worker-{i}") for i in range(max_workers)]
+        for worker in self.workers:
+            worker.start()
+
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.shm_bytes = 0 # result bytes returned through shared memory
+        self.closed = False
+        self.broken = None # why the pool stopped working
+        self.reader = threading.Thread(target=self._read_results, name="forked-pool-results", daemon=True)
+        self.reader.start()
+        self.watcher = threading.Thread(target=self._watch_workers, name="forked-pool-watcher", daemon=True)
+        self.watcher.start()
+
+    def submit(self, fn, /, *args, **kwargs):
+        """fn must be picklable, e.g. a module-level function."""
+        if self.closed:
+            raise RuntimeError("cannot submit after shutdown")
+        future = Future()
+        with self.lock:
+            if self.broken:
+                raise BrokenProcessPool(self.broken)
+            job_id = next(self.ids)
+            self.futures[job_id] = future
+        self.cancelled[job_id % CANCEL_SLOTS] = 0
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        self.jobs.put((job_id, fn, args, kwargs))
+        return future
+
+    def _on_done(self, job_id, future):
+        if future.cancelled():
+            self.cancelled[job_id % CANCEL_SLOTS] = 1
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self.workers:
+            self.jobs.put(None)
+        if cancel_futures:
+            with self.lock:
+                for future in self.futures.values():
+                    future.cancel()
+        if wait:
+            for worker in self.workers:
+                worker.join()
+        if not self.broken: # a killed worker may hold the queue's lock; the reader is a daemon anyway
+            self.results.put(None)
+
+    def _read_results(self):
+        # Never lets an exception end the thread: every later job would hang
+        while True:
+            try:
+                message = self.results.get()
+            except Exception as e: # e.g. an exception from a worker that does not unpickle
+                print(f"Forked pool: unreadable result: {e!r}")
+                continue
+            if message is None:
+                return
+            job_id, kind, value = message
+            if kind == "shm":
+                try:
+                    value = self._take_shm(*value)
+                except Exception as e:
+                    kind, value = "error", e
+            with self.lock:
+                future = self.futures.pop(job_id, None)
+            # A job cancelled after a worker took it still runs; its result is dropped
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            if kind == "error":
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+    def _take_shm(self, name, size):
+        block = SharedMemory(name=name)
+        try:
+            value = bytes(block.buf[:size])
+        finally:
+            block.close()
+            block.unlink()
+        self.shm_bytes += size
+        return value
+
+    def _watch_workers(self):
+        sentinels = {worker.sentinel: worker for worker in self.workers}
+        ready = wait_any(list(sentinels))
+        if self.closed:
+            return # workers exit on shutdown
+        dead = sentinels[ready[0]]
+        dead.join()
+        reason = f"worker {dead.name} exited unexpectedly (exit code {dead.exitcode})"
+        print(f"Forked pool: {reason}")
+        with self.lock:
+            self.broken = reason
+            futures, self.futures = list(self.futures.values()), {}
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+        for future in futures:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(BrokenProcessPool(reason))
+
+
+CANCEL_SLOTS = 4096 # far more than ever wait in the queue at once
+
+
+def _worker_loop(jobs, results, cancelled, worker_init=None, index=0):
+    # Ctrl-C is for the parent; it shuts the workers down through the queue.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if worker_init:
+        worker_init(index)
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, fn, args, kwargs = job
+        if cancelled[job_id % CANCEL_SLOTS]:
+            results.put((job_id, "cancelled", None))
+            continue
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            try:
+                results.put((job_id, "error", e))
+            except Exception: # the exception itself does not pickle
+                results.put((job_id, "error", RuntimeError(repr(e))))
+            continue
+        if isinstance(result, (bytes, bytearray, memoryview)) and len(result):
+            data = memoryview(result).cast("B")
+            block = SharedMemory(create=True, size=len(data))
+            block.buf[:len(data)] = data
+            block.close()
+            results.put((job_id, "shm", (block.name, len(data))))
+        else:
+            results.put((job_id, "value", result))
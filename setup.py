@@ -1,7 +1,6 @@
 import os
 import urllib.request
-import json
-import numpy as np
+from server.voice_store import convert_json, convert_npz
 
 def download_file(url, dest_path):
     print(f"Downloading {url} to {dest_path}...")
@@ -11,18 +10,12 @@ def download_file(url, dest_path):
     except Exception as e:
         print(f"Error downloading {url}: {e}")
 
-def convert_voices():
-    print("Converting voices.json to voices.bin.npz...")
+def convert_voices(voices_path="server/voices.json", index_path="server/voices.index.npz"):
+    print(f"Converting {voices_path} to the voice store {index_path}...")
     try:
-        with open("server/voices.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        voices = {}
-        for name, embedding in data.items():
-            voices[name] = np.array(embedding, dtype=np.float32)
-            
-        np.savez("server/voices.bin.npz", **voices)
-        print("Conversion complete.")
+        # Streams the JSON, so the whole file is never held in memory
+        count = convert_json(voices_path, index_path)
+        print(f"Conversion complete: {count} voices.")
     except Exception as e:
         print(f"Error converting voices: {e}")
 
@@ -47,11 +40,23 @@ def main():
     else:
         print(f"{voices_path} already exists.")
 
-    # 3. Convert voices.json to voices.bin.npz
-    if os.path.exists(voices_path) and not os.path.exists("server/voices.bin.npz"):
-        convert_voices()
+    # 3. Download the Silero VAD ONNX model (the server's default VAD backend)
+    vad_url = "https://github.com/snakers4/silero-vad/raw/master/src/silero_vad/data/silero_vad.onnx"
+    vad_path = "server/silero_vad.onnx"
+    if not os.path.exists(vad_path):
+        download_file(vad_url, vad_path)
+    else:
+        print(f"{vad_path} already exists.")
+
+    # 4. Convert voices.json to the memory-mapped voice store
+    index_path = "server/voices.index.npz"
+    if os.path.exists(voices_path) and not os.path.exists(index_path):
+        convert_voices(voices_path, index_path)
+    elif os.path.exists(index_path):
+        print(f"{index_path} already exists.")
     elif os.path.exists("server/voices.bin.npz"):
-         print("server/voices.bin.npz already exists.")
+        # Left over from an older setup
+        print(f"Converted {convert_npz('server/voices.bin.npz', index_path)} voices from server/voices.bin.npz.")
     else:
         print("Skipping conversion because voices.json is missing.")
 
@@ -0,0 +1,168 @@
+import struct
+import numpy as np
+
+# Codecs for audio on the WebSocket link, negotiated per connection (see protocol.negotiate_codec).
+# Both work on whole frames: every encoded frame decodes on its own, so a frame
+# dropped by the jitter buffer does not corrupt the ones after it.
+
+# IMA ADPCM tables
+INDEX_TABLE = [-1, -1, -1, -1, 2, 4, 6, 8] * 2
+STEP_TABLE = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+]
+INDEX_DELTAS = np.array(INDEX_TABLE, dtype=np.int64)
+STEPS = np.array(STEP_TABLE, dtype=np.int64)
+
+# predictor (i16) | step index (u8) | flags (u8), then two 4-bit codes per byte, low nibble first
+ADPCM_FRAME_HEADER = struct.Struct("<hBB")
+ADPCM_FLAG_ODD = 0x01 # last high nibble is padding
+
+
+class PcmEncoder:
+    def encode(self, pcm) -> bytes:
+        return pcm
+
+class PcmDecoder:
+    def decode(self, payload) -> bytes:
+        if len(payload) % 2:
+            raise ValueError(f"PCM frame with an odd length: {len(payload)} bytes")
+        return payload
+
+
+class AdpcmEncoder:
+    """
+    Streaming IMA ADPCM encoder (4 bits per sample).
+    The predictor state carries over between frames; each frame starts with
+    that state so the decoder can pick up at any frame.
+    """
+    def __init__(self):
+        self.predictor = 0
+        self.index = 0
+
+    def encode(self, pcm) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16).tolist()
+        header = ADPCM_FRAME_HEADER.pack(self.predictor, self.index, ADPCM_FLAG_ODD if len(samples) % 2 else 0)
+        codes = bytearray(len(samples) + len(samples) % 2)
+        predictor, index = self.predictor, self.index
+        for i, sample in enumerate(samples):
+            step = STEP_TABLE[index]
+            diff = sample - predictor
+            code = 0
+            if diff < 0:
+                code = 8
+                diff = -diff
+            delta = step >> 3
+            if diff >= step:
+                code |= 4
+                diff -= step
+                delta += step
+            step >>= 1
+            if diff >= step:
+                code |= 2
+                diff -= step
+                delta += step
+            step >>= 1
+            if diff >= step:
+                code |= 1
+                delta += step
+
+            predictor = predictor - delta if code & 8 else predictor + delta
+            predictor = -32768 if predictor < -32768 else 32767 if predictor > 32767 else predictor
+            index += INDEX_TABLE[code]
+            index = 0 if index < 0 else 88 if index > 88 else index
+            codes[i] = code
+
+        self.predictor, self.index = predictor, index
+        nibbles = np.frombuffer(codes, dtype=np.uint8)
+        return header + (nibbles[0::2] | (nibbles[1::2] << 4)).tobytes()
+
+
+def clamped_cumsum(start: int, deltas: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    """
+    x[n] = clip(x[n-1] + deltas[n], lo, hi) with x[-1] = start, without a
+    per-sample loop. Each step is the map x -> clip(x + a, l, h), and two such
+    maps compose into one of the same form, so a prefix scan over (a, l, h)
+    gets every x in log2(n) vector operations.
+    """
+    x = start + np.cumsum(deltas, dtype=np.int64)
+    if len(x) == 0 or (x.min() >= lo and x.max() <= hi):
+        return x # never clamped, the common case for the predictor
+    a = deltas.astype(np.int64)
+    bounds = np.empty((2, len(a)), dtype=np.int64) # rows l and h
+    bounds[0], bounds[1] = lo, hi
+    shift = 1
+    while shift < len(a):
+        # Element n absorbs the map that ends at n - shift, which runs first
+        later = a[shift:]
+        merged = np.minimum(np.maximum(bounds[:, :-shift] + later, bounds[0, shift:]), bounds[1, shift:])
+        a[shift:] = a[:-shift] + later
+        bounds[:, shift:] = merged
+        shift *= 2
+    return np.minimum(np.maximum(start + a, bounds[0]), bounds[1])
+
+
+class AdpcmDecoder:
+    """
+    IMA ADPCM decoder, vectorized: the step index and the predictor are both
+    clamped running sums (see clamped_cumsum), so a frame decodes without a
+    Python loop over its samples.
+    """
+    def decode(self, payload) -> bytes:
+        if len(payload) == 0: # end-of-stream frame
+            return b""
+        if len(payload) < ADPCM_FRAME_HEADER.size:
+            raise ValueError(f"ADPCM frame too short: {len(payload)} bytes")
+        predictor, index, flags = ADPCM_FRAME_HEADER.unpack_from(payload)
+        if index >= len(STEPS):
+            raise ValueError(f"ADPCM frame with step index {index}")
+        packed = np.frombuffer(payload, dtype=np.uint8, offset=ADPCM_FRAME_HEADER.size)
+        codes = np.empty(len(packed) * 2, dtype=np.uint8)
+        codes[0::2] = packed & 0x0F
+        codes[1::2] = packed >> 4
+        if flags & ADPCM_FLAG_ODD:
+            codes = codes[:-1]
+
+        if len(codes) == 0:
+            return b""
+
+        # Step index in effect for each sample: the one left by the samples before it
+        indexes = np.empty(len(codes), dtype=np.int64)
+        indexes[0] = index
+        indexes[1:] = clamped_cumsum(index, INDEX_DELTAS[codes[:-1]], 0, 88)
+        step = STEPS[indexes]
+        delta = (step >> 3) + np.where(codes & 4, step, 0) + np.where(codes & 2, step >> 1, 0) \
+            + np.where(codes & 1, step >> 2, 0)
+        delta = np.where(codes & 8, -delta, delta)
+        return clamped_cumsum(predictor, delta, -32768, 32767).astype(np.int16).tobytes()
+
+
+class Codec:
+    def __init__(self, name, bits_per_sample, encoder, decoder):
+        self.name = name
+        self.bits_per_sample = bits_per_sample
+        self._encoder = encoder
+        self._decoder = decoder
+
+    def encoder(self):
+        """New encoder; use one per stream."""
+        return self._encoder()
+
+    def decoder(self):
+        return self._decoder()
+
+
+CODECS = {
+    "pcm": Codec("pcm", 16, PcmEncoder, PcmDecoder),
+    "adpcm": Codec("adpcm", 4, AdpcmEncoder, AdpcmDecoder),
+}
+
+def get_codec(name: str) -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown audio codec: {name}")
+    return CODECS[name]
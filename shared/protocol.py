@@ -1,12 +1,117 @@
+import json
+import time
+import struct
+import collections
+
 # Message Types
 MSG_START_LISTENING = "start_listening"
 MSG_AUDIO_CHUNK = "audio_chunk"
 MSG_END_SPEECH = "end_speech" # Optional, if client detects end of speech (e.g. VAD on client)
 MSG_PLAY_AUDIO = "play_audio"
 MSG_TEXT_RESPONSE = "text_response" # Optional, to show text on client if needed
+MSG_INTERRUPT = "interrupt" # Client -> server: abort the current reply. Server -> client: reply aborted, drop queued audio
 MSG_ERROR = "error"
+MSG_HELLO = "hello" # Client -> server: codecs it can use, in order of preference. Server -> client: the chosen codec
 
 # Keys
 KEY_TYPE = "type"
 KEY_DATA = "data"
 KEY_AUDIO = "audio" # For binary audio data, usually sent as separate binary message or base64
+KEY_CODECS = "codecs"
+KEY_CODEC = "codec"
+KEY_SESSION = "session"
+KEY_SAMPLE_RATE = "sample_rate"
+
+# Audio codec negotiation
+# After connecting, the client sends a hello control frame {"type": "hello", "codecs": [...]},
+# optionally with "sample_rate": hz, the rate it wants reply audio played at.
+# The server answers {"type": "hello", "codec": name, "session": id, "sample_rate": hz}.
+# Audio frames in both directions then use that codec (see shared/audio_codec.py), and
+# reply audio comes at the answered rate. Connections that skip the handshake use PCM.
+DEFAULT_CODEC = "pcm"
+MIN_OUTPUT_RATE = 8000
+MAX_OUTPUT_RATE = 48000
+
+def negotiate_codec(offered, supported) -> str:
+    """First codec in the client's preference order that the server supports."""
+    for name in offered or ():
+        if name in supported:
+            return name
+    return DEFAULT_CODEC
+
+def negotiate_output_rate(requested, native: int) -> int:
+    """The client's playback rate if the server can resample to it, else the native TTS rate."""
+    if isinstance(requested, int) and MIN_OUTPUT_RATE <= requested <= MAX_OUTPUT_RATE:
+        return requested
+    return native
+
+# Frames
+# Every WebSocket message, in both directions, is one binary frame:
+#   kind (u8) | flags (u8) | stream_id (u16) | session_id (u32) | seq (u32) |
+#   timestamp_us (i64) | payload_len (u32) | payload...
+# FRAME_AUDIO payloads are one frame of int16 PCM encoded with the connection's codec.
+# FRAME_CONTROL payloads are a JSON object with a "type" (the MSG_* above).
+# FRAME_TEXT payloads are UTF-8 reply text.
+# session_id is assigned by the server in its hello reply. seq counts frames per
+# stream; reply audio gets a new stream_id per reply with seq restarting at 0, and
+# the last frame of a reply carries FLAG_END_OF_STREAM (its payload may be empty).
+# timestamp_us is wall-clock time in microseconds: when the audio was captured for
+# uplink audio, when the frame was sent otherwise.
+FRAME_HEADER = struct.Struct("<BBHIIqI")
+FRAME_AUDIO = 0x01
+FRAME_CONTROL = 0x02
+FRAME_TEXT = 0x03
+FLAG_END_OF_STREAM = 0x01
+AUDIO_FRAME_MS = 40 # Audio per frame; small frames let playback start early
+DEFAULT_OUTPUT_RATE = 24000 # Reply audio rate, until the server's hello says otherwise
+
+
+class Frame(collections.namedtuple("Frame", "kind flags stream_id session_id seq timestamp_us payload")):
+    __slots__ = ()
+
+    @property
+    def end_of_stream(self):
+        return bool(self.flags & FLAG_END_OF_STREAM)
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+def pack_frame(kind: int, payload=b"", session_id=0, seq=0, stream_id=0, timestamp_us=None,
+               end_of_stream=False) -> bytes:
+    """
+    Serialize one frame. payload can be any bytes-like object; it is copied
+    once, straight after the header.
+    """
+    flags = FLAG_END_OF_STREAM if end_of_stream else 0
+    if timestamp_us is None:
+        timestamp_us = now_us()
+    payload = memoryview(payload).cast("B")
+    header = FRAME_HEADER.pack(kind, flags, stream_id & 0xFFFF, session_id, seq & 0xFFFFFFFF,
+                               timestamp_us, len(payload))
+    return b"".join((header, payload))
+
+def unpack_frame(message: bytes) -> Frame:
+    """
+    Parse a frame. The payload is a memoryview into message, not a copy.
+    """
+    if len(message) < FRAME_HEADER.size:
+        raise ValueError(f"Frame too short: {len(message)} bytes")
+    kind, flags, stream_id, session_id, seq, timestamp_us, length = FRAME_HEADER.unpack_from(message)
+    if FRAME_HEADER.size + length > len(message):
+        raise ValueError(f"Truncated frame: {len(message) - FRAME_HEADER.size} of {length} payload bytes")
+    payload = memoryview(message)[FRAME_HEADER.size:FRAME_HEADER.size + length]
+    return Frame(kind, flags, stream_id, session_id, seq, timestamp_us, payload)
+
+def pack_control(msg_type: str, session_id=0, **data) -> bytes:
+    return pack_frame(FRAME_CONTROL, json.dumps({KEY_TYPE: msg_type, **data}).encode("utf-8"), session_id)
+
+def parse_control(frame: Frame) -> dict:
+    """Raises ValueError unless the payload is a JSON object."""
+    data = json.loads(bytes(frame.payload))
+    if not isinstance(data, dict):
+        raise ValueError(f"Control message is not an object: {data!r}")
+    return data
+
+def pack_text(text: str, session_id=0, stream_id=0) -> bytes:
+    return pack_frame(FRAME_TEXT, text.encode("utf-8"), session_id, stream_id=stream_id)
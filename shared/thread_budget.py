@@ -0,0 +1,141 @@
+import os
+
+# Thread budget: how many threads each inference engine in this process may use,
+# so torch and onnxruntime do not each start a pool the size of the machine and
+# fight over the same cores. Engines are named ("vad", "tts", "wakeword"); each
+# gets intra-op threads (parallelism inside one operator), inter-op threads
+# (operators run side by side, 1 = sequential) and a number of workers, e.g.
+# forked TTS processes, that each run with that many threads.
+#
+# Environment overrides: THREADS_<ENGINE>=intra or intra:inter (e.g. THREADS_TTS=3),
+# PIN_THREADS=1 to pin every engine to its own cores where the OS allows it.
+
+
+def available_cpus() -> list:
+    """CPUs this process may run on (its affinity mask where the OS has one)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_thread(cpus) -> bool:
+    """
+    Restrict the calling thread to cpus; threads it starts afterwards inherit
+    that. Returns False where the OS has no affinity API.
+    """
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        print(f"WARNING: could not pin to CPUs {sorted(cpus)}: {e}")
+        return False
+    return True
+
+
+def session_options(intra=1, inter=1, spin=True, cpus=None):
+    """
+    onnxruntime SessionOptions with fixed thread counts. spin=False stops idle
+    pool threads busy-waiting for work, which only pays off when they have a
+    core to themselves. cpus pins the session's own pool threads (the calling
+    thread is the first of the intra threads and is not pinned here).
+    """
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = intra
+    options.inter_op_num_threads = inter
+    if inter == 1:
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    if not spin:
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        options.add_session_config_entry("session.inter_op.allow_spinning", "0")
+    if cpus and intra > 1:
+        # One entry per pool thread, with onnxruntime's 1-based processor ids
+        ids = [str(cpus[i % len(cpus)] + 1) for i in range(1, intra)]
+        options.add_session_config_entry("session.intra_op_thread_affinities", ";".join(ids))
+    return options
+
+
+def configure_torch(intra=1, inter=1):
+    """Set torch's process-wide thread pools. The inter-op pool can only be sized before first use."""
+    import torch
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(inter)
+    except RuntimeError:
+        # Already started (or already set); the intra-op count still applies
+        pass
+
+
+class ThreadBudget:
+    def __init__(self, cpus=None, pin=False):
+        self.cpus = list(cpus) if cpus is not None else available_cpus()
+        self.pin_cpus = pin
+        self.engines = {} # name -> [intra, inter, workers], in core assignment order
+
+    @classmethod
+    def from_env(cls, defaults: dict, environ=None):
+        """
+        Budget with defaults[name] intra-op threads per engine, overridden by
+        THREADS_<NAME>; PIN_THREADS=1 turns on pinning.
+        """
+        environ = os.environ if environ is None else environ
+        budget = cls(pin=environ.get("PIN_THREADS", "0") == "1")
+        for name, intra in defaults.items():
+            inter = 1
+            value = environ.get(f"THREADS_{name.upper()}")
+            if value:
+                try:
+                    parts = [int(part) for part in value.split(":")]
+                    intra, inter = parts[0], (parts[1] if len(parts) > 1 else 1)
+                except ValueError:
+                    print(f"WARNING: invalid THREADS_{name.upper()}={value!r}, using {intra}")
+            budget.assign(name, intra, inter)
+        return budget
+
+    def assign(self, name, intra, inter=1, workers=1):
+        self.engines[name] = [max(1, int(intra)), max(1, int(inter)), max(1, int(workers))]
+        return self
+
+    def threads(self, name) -> int:
+        return self.engines[name][0]
+
+    def inter(self, name) -> int:
+        return self.engines[name][1]
+
+    @property
+    def total(self) -> int:
+        return sum(intra * workers for intra, _, workers in self.engines.values())
+
+    @property
+    def oversubscribed(self) -> bool:
+        return self.total > len(self.cpus)
+
+    def cpus_for(self, name, worker=0) -> list:
+        """
+        The engine's share of the cores: engines take consecutive slices in the
+        order they were assigned, wrapping around when the budget exceeds the
+        machine.
+        """
+        start = 0
+        for other, (intra, _, workers) in self.engines.items():
+            if other == name:
+                break
+            start += intra * workers
+        intra = self.threads(name)
+        start += worker * intra
+        return [self.cpus[(start + i) % len(self.cpus)] for i in range(min(intra, len(self.cpus)))]
+
+    def session_options(self, name, worker=0):
+        """onnxruntime SessionOptions for the engine; create the session from the thread you pin."""
+        cpus = self.cpus_for(name, worker) if self.pin_cpus else None
+        return session_options(self.threads(name), self.inter(name), spin=not self.oversubscribed, cpus=cpus)
+
+    def pin(self, name, worker=0) -> bool:
+        """Pin the calling thread to the engine's cores, if pinning is on."""
+        return self.pin_cpus and pin_thread(self.cpus_for(name, worker))
+
+    def describe(self) -> str:
+        parts = [f"{name}={intra}x{workers}" + (f":{inter}" if inter > 1 else "")
+                 for name, (intra, inter, workers) in self.engines.items()]
+        return f"{', '.join(parts)} on {len(self.cpus)} CPUs" + (" (pinned)" if self.pin_cpus else "")
@@ -0,0 +1,41 @@
+import sys
+import os
+import asyncio
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.acknowledgements import AcknowledgementBank, LatencyPredictor
+
+def test_acknowledgement_clips_are_prepared_once():
+    async def synthesize(text):
+        return b"" if text == "broken" else np.full(len(text) * 2400, 1000, dtype=np.int16).tobytes()
+
+    bank = AcknowledgementBank(["Mm-hmm.", "Okay.", "broken"], sample_rate=24000, seed=1)
+    assert bank.pick(16000, "pcm") is None # nothing loaded yet
+
+    async def run():
+        await bank.load(synthesize, [(16000, "adpcm")])
+        picks = [bank.pick(16000, "adpcm") for _ in range(6)]
+        # Another pair is prepared in the background; until then there is no clip for it
+        assert bank.pick(24000, "pcm") is None
+        ready = bank.prepare(24000, "pcm")
+        assert bank.prepare(24000, "pcm") is ready
+        await ready
+        return picks, bank.pick(24000, "pcm")
+
+    picks, native = asyncio.run(run())
+    assert len(bank.clips) == 2
+    assert all(a is not b for a, b in zip(picks, picks[1:])) # never the same clip twice in a row
+    assert all(pick in bank.frames[(16000, "adpcm")] for pick in picks) # prepared once, not per pick
+    encoded, pcm = picks[0][0]
+    assert len(pcm) == 640 * 2 and len(encoded) < len(pcm) # 40 ms frames at 16 kHz
+    assert native[0][0] == native[0][1] and len(native[0][1]) == 960 * 2
+
+    predictor = LatencyPredictor(alpha=0.5)
+    assert predictor.predict_ms() == 0 # no clip before a turn has been measured
+    predictor.observe(0.2)
+    assert predictor.predict_ms() == 200
+    predictor.observe(0.6)
+    assert predictor.predict_ms() == 400
@@ -0,0 +1,41 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.audio_buffers import PcmRingBuffer, PcmReframer
+
+def pcm(values):
+    return np.asarray(values, dtype=np.int16).tobytes()
+
+def drained(ring):
+    return np.frombuffer(bytes(ring.drain_into(bytearray())), dtype=np.int16).tolist()
+
+def test_ring_keeps_most_recent_samples():
+    ring = PcmRingBuffer(10)
+    storage = ring.buffer
+    for start in range(0, 25, 3):
+        ring.write(pcm(range(start, start + 3)))
+    assert ring.buffer is storage # never reallocated
+    assert drained(ring) == list(range(17, 27))
+    assert len(ring) == 0
+
+def test_ring_partial_and_oversized_writes():
+    ring = PcmRingBuffer(10)
+    ring.write(pcm(range(4)))
+    assert drained(ring) == [0, 1, 2, 3]
+    ring.write(pcm(range(30)))
+    assert drained(ring) == list(range(20, 30))
+
+def test_reframer_same_windows_for_any_chunk_size():
+    audio = np.arange(-5000, 5000, dtype=np.int16)
+    expected = (audio[:19 * 512].astype(np.float32) / 32768.0).reshape(19, 512)
+    for chunk in (1, 100, 320, 512, 1000, 4096, len(audio)):
+        reframer = PcmReframer(512)
+        pending = reframer.pending
+        frames = [reframer.feed(audio[i:i + chunk].tobytes()) for i in range(0, len(audio), chunk)]
+        assert np.array_equal(np.concatenate(frames), expected)
+        assert len(reframer) == len(audio) - 19 * 512
+        assert reframer.pending is pending # never reallocated
@@ -0,0 +1,41 @@
+import sys
+import os
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared import protocol
+from server.audio_stream import FrameSender
+
+class RecordingSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_bytes(self, data):
+        self.frames.append(protocol.unpack_frame(data))
+
+def test_adpcm_reply_frames_are_encoded_on_the_executor():
+    pcm = (np.sin(np.arange(24000) / 9) * 8000).astype(np.int16).tobytes()
+    encoding_threads = set()
+
+    class Pool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            return super().submit(lambda: encoding_threads.add(threading.get_ident()) or fn(*args))
+
+    async def send(executor):
+        socket = RecordingSocket()
+        stream = FrameSender(socket, 1, codec="adpcm", executor=executor).audio_stream(24000)
+        await stream.write(pcm[:10002])
+        await stream.write(pcm[10002:])
+        await stream.close()
+        return [(f.seq, f.payload) for f in socket.frames]
+
+    with Pool(1) as pool:
+        offloaded = asyncio.run(send(pool))
+    assert encoding_threads and threading.get_ident() not in encoding_threads
+    assert offloaded == asyncio.run(send(None)) # same frames, in order, as encoding inline
+    assert offloaded[-1][1] == b"" # end of stream
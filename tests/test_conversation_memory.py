@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.conversation_memory import ConversationMemory
+
+def test_memory_stays_within_budget():
+    memory = ConversationMemory("system", max_tokens=100, keep_turns=2)
+    for i in range(20):
+        memory.add_user(f"question {i} " * 10)
+        memory.add_assistant(f"answer {i} " * 10)
+    messages = memory.messages()
+    assert messages[0]["role"] == "system"
+    assert sum(len(m["content"]) // 4 + 1 for m in messages) <= 100
+    assert messages[-1]["content"].startswith("answer 19")
+
+    assert memory.needs_compaction()
+    old = memory.compactable()
+    assert len(old) == 36
+    memory.apply_summary("We talked about questions.", len(old))
+    assert len(memory.messages_list) == 4
+    assert "We talked about questions." in memory.messages()[0]["content"]
@@ -0,0 +1,70 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.endpointing import Endpointer, UtteranceBuffer
+from server.audio_buffers import PcmRingBuffer
+
+def chunk(ms, value=0):
+    return np.full(16 * ms, value, dtype=np.int16).tobytes()
+
+def test_utterance_buffer_blocks_and_cap():
+    buffer = UtteranceBuffer(max_bytes=100, block_bytes=16)
+    data = bytes(range(120))
+    assert buffer.extend(data[:30]) == 30
+    assert buffer.extend(data[30:]) == 70 # stops at the cap
+    assert buffer.full and len(buffer) == 100 and len(buffer.blocks) == 7
+    assert buffer[5:50] == data[5:50]
+    assert buffer[90:] == data[90:100]
+    assert bytes(buffer) == data[:100]
+
+def test_endpointer_hangover_joins_pauses():
+    endpointer = Endpointer(hangover_ms=200, min_utterance_ms=100)
+    assert [e["type"] for e in endpointer.feed(chunk(20), [{'start': 0.0}])] == ["start"]
+    for _ in range(10):
+        assert endpointer.feed(chunk(20), []) == []
+    assert endpointer.feed(chunk(20), [{'end': 0.2}]) == [] # hangover begins
+    assert endpointer.trailing_silence_ms(0.0) == 20
+    assert endpointer.feed(chunk(20), [{'start': 0.3}]) == [] # same utterance continues
+    assert endpointer.feed(chunk(20), [{'end': 0.5}]) == []
+    events = []
+    for _ in range(10):
+        events += endpointer.feed(chunk(20), [])
+    assert [(e["type"], e["reason"]) for e in events] == [("end", "silence")]
+    assert len(events[0]["audio"]) == 23 * 640 and events[0]["duration_ms"] == 260
+    assert not endpointer.active
+
+def test_endpointer_follows_vad_events_in_order():
+    endpointer = Endpointer(min_utterance_ms=0)
+    endpointer.feed(chunk(20), [{'start': 0.0}])
+    # Speech resumed within the chunk after the pause: the utterance goes on
+    assert endpointer.feed(chunk(100), [{'end': 0.1}, {'start': 0.2}]) == [] and endpointer.active
+    # A blip inside one chunk is an utterance that both starts and ends there
+    endpointer = Endpointer(min_utterance_ms=0)
+    events = endpointer.feed(chunk(100), [{'start': 0.0}, {'end': 0.1}])
+    assert [e["type"] for e in events] == ["start", "end"] and not endpointer.active
+
+def test_endpointer_drops_clicks():
+    endpointer = Endpointer(min_utterance_ms=250)
+    endpointer.feed(chunk(20), [{'start': 0.0}])
+    events = endpointer.feed(chunk(20), [{'end': 0.1}])
+    assert [(e["type"], e["reason"]) for e in events] == [("discard", "too_short")]
+
+def test_endpointer_cuts_stuck_vad():
+    endpointer = Endpointer(min_utterance_ms=0, max_utterance_ms=1000)
+    pre_roll = PcmRingBuffer.from_duration(100)
+    pre_roll.write(chunk(100))
+    events = endpointer.feed(chunk(20), [{'start': 0.0}], pre_roll)
+    for _ in range(200): # the VAD never reports the end
+        events += endpointer.feed(chunk(20), [])
+    assert [e["type"] for e in events] == ["start", "end"]
+    # The cap is on the utterance's own audio, the pre-roll comes on top
+    assert events[1]["reason"] == "max_duration" and len(events[1]["audio"]) == 3200 + 32000
+    # The rest of that speech is neither an utterance nor pre-roll for the next one
+    assert not endpointer.active and endpointer.in_speech
+    assert endpointer.feed(chunk(20), [{'end': 4.0}]) == []
+    assert not endpointer.in_speech
+    assert [e["type"] for e in endpointer.feed(chunk(20), [{'start': 5.0}])] == ["start"]
@@ -0,0 +1,46 @@
+import sys
+import os
+import asyncio
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.incremental_stt import IncrementalTranscriber
+
+WORDS = {1000: "one", 2000: "two", 3000: "three", 4000: "four"}
+
+def speech(*spans, sample_rate=16000):
+    """(amplitude, ms) spans as int16 PCM; amplitude 0 is a pause."""
+    return np.concatenate([np.full(sample_rate * ms // 1000, amp, dtype=np.int16) for amp, ms in spans]).tobytes()
+
+def test_incremental_transcriber_cuts_between_words_and_joins_in_order():
+    calls = []
+
+    async def transcribe(audio):
+        # Each run of non-zero samples is one word; a word cut in two would show up twice
+        samples = np.frombuffer(audio, dtype=np.int16)
+        starts = np.flatnonzero(np.diff(samples, prepend=0) != 0)
+        calls.append(len(audio))
+        await asyncio.sleep(0)
+        return " ".join(WORDS[int(samples[i])] for i in starts if samples[i])
+
+    audio = speech((1000, 300), (0, 40), (2000, 240), (0, 60), (3000, 260), (0, 40), (4000, 260))
+    transcriber = IncrementalTranscriber(transcribe, segment_ms=500, search_ms=200)
+
+    async def run():
+        buffer = bytearray()
+        for i in range(0, len(audio), 640): # 20 ms chunks, as they arrive
+            buffer.extend(audio[i:i + 640])
+            transcriber.feed(buffer)
+            await asyncio.sleep(0)
+        preview = await transcriber.preview(buffer)
+        return preview, await transcriber.finish(buffer)
+
+    preview, text = asyncio.run(run())
+    # Cut in the first silent frame after 500 ms (580-600 ms), at its middle
+    assert len(transcriber.segments) == 1 and transcriber.committed == 590 * 32
+    assert text == preview == "one two three four"
+    # The segment, the preview's tail, then only the tail again at the end
+    tail = len(audio) - 590 * 32
+    assert calls == [590 * 32, tail, tail]
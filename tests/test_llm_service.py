@@ -0,0 +1,37 @@
+import sys
+import os
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.llm_service import FakeLLMService
+
+def test_fake_llm_streams_and_keeps_history():
+    llm = FakeLLMService(reply="Nice to meet you. How are you?", first_token_ms=1, token_ms=0, seed=1)
+    memory = llm.create_memory()
+
+    async def run():
+        return [token async for token in llm.stream_response("Hi there", memory)]
+
+    assert "".join(asyncio.run(run())) == "Nice to meet you. How are you?"
+    assert [m["role"] for m in memory.messages_list] == ["user", "assistant"]
+
+def test_reply_cancelled_before_its_first_token_takes_back_the_user_turn():
+    llm = FakeLLMService(first_token_ms=1000, sigma=0)
+    memory = llm.create_memory()
+
+    async def consume(text):
+        return [token async for token in llm.stream_response(text, memory)]
+
+    async def run():
+        barged_in = asyncio.create_task(consume("Hi there"))
+        await asyncio.sleep(0.01)
+        barged_in.cancel() # barge-in while waiting for the first token
+        await asyncio.gather(barged_in, return_exceptions=True)
+        llm.first_token = 0
+        await consume("Sorry, I meant hello")
+
+    asyncio.run(run())
+    assert [(m["role"], m["content"]) for m in memory.messages_list][0] == ("user", "Sorry, I meant hello")
+    assert [m["role"] for m in memory.messages_list] == ["user", "assistant"]
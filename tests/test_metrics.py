@@ -0,0 +1,22 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.metrics import MetricsRegistry
+
+def test_metrics_histogram_renders_prometheus_text():
+    metrics = MetricsRegistry(prefix="t_")
+    latency = metrics.histogram("latency_seconds", "Test latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    metrics.gauge("depth", "Queue depth", fn=lambda: {"tts": 2}, label="stage")
+
+    text = metrics.render()
+    assert '# TYPE t_latency_seconds histogram' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 2' in text # buckets are cumulative, upper bound inclusive
+    assert 't_latency_seconds_bucket{le="1.0"} 3' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 't_latency_seconds_count 4' in text
+    assert 't_depth{stage="tts"} 2' in text
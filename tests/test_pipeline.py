@@ -0,0 +1,26 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.text_chunker import SentenceChunker
+
+def chunk(text, **kwargs):
+    chunker = SentenceChunker(**kwargs)
+    fragments = []
+    for token in text.split(" "):
+        fragments += chunker.push(token + " ")
+    tail = chunker.flush()
+    return fragments + ([tail] if tail else [])
+
+def test_chunker_splits_sentences_not_abbreviations():
+    text = "Hello there! Nice to meet you, Mr. Smith. It costs 3.5 dollars."
+    assert chunk(text, first_clause_chars=1000) == [
+        "Hello there!", "Nice to meet you, Mr. Smith.", "It costs 3.5 dollars."]
+
+def test_chunker_cuts_long_first_sentence_at_clause():
+    text = "Well, that is a really interesting question, and I think the answer depends on the context."
+    fragments = chunk(text, first_clause_chars=40)
+    assert fragments[0] == "Well, that is a really interesting question,"
+    assert " ".join(fragments) == text
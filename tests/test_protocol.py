@@ -0,0 +1,110 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared import protocol
+from client.jitter_buffer import JitterBuffer
+
+def test_frame_roundtrip():
+    pcm = np.arange(960, dtype=np.int16).tobytes()
+    message = protocol.pack_frame(protocol.FRAME_AUDIO, pcm, session_id=9, seq=3, stream_id=7, timestamp_us=123456)
+    assert len(message) == protocol.FRAME_HEADER.size + len(pcm)
+    frame = protocol.unpack_frame(message)
+    assert (frame.kind, frame.session_id, frame.stream_id, frame.seq, frame.timestamp_us) == \
+        (protocol.FRAME_AUDIO, 9, 7, 3, 123456)
+    assert not frame.end_of_stream
+    assert isinstance(frame.payload, memoryview) and bytes(frame.payload) == pcm
+
+    end = protocol.unpack_frame(protocol.pack_frame(protocol.FRAME_AUDIO, stream_id=7, seq=4, end_of_stream=True))
+    assert end.end_of_stream and len(end.payload) == 0
+
+    control = protocol.unpack_frame(protocol.pack_control(protocol.MSG_HELLO, 9, codecs=["pcm"]))
+    assert control.kind == protocol.FRAME_CONTROL
+    assert protocol.parse_control(control) == {"type": protocol.MSG_HELLO, "codecs": ["pcm"]}
+
+    try:
+        protocol.unpack_frame(message[:-1])
+        assert False, "truncated frame accepted"
+    except ValueError:
+        pass
+
+def test_jitter_buffer_prebuffer_and_reorder():
+    jitter = JitterBuffer(prebuffer_samples=200)
+    out = np.empty(150, dtype=np.int16)
+
+    jitter.put(1, np.full(100, 2, dtype=np.int16).tobytes())
+    assert jitter.read(out) == 0 # frame 0 missing, nothing playable yet
+    jitter.put(0, np.full(100, 1, dtype=np.int16).tobytes())
+
+    assert jitter.read(out) == 150
+    assert (out[:100] == 1).all() and (out[100:] == 2).all()
+
+    jitter.put(2, b"", end_of_stream=True)
+    assert jitter.read(out) == 50
+    assert (out[50:] == 0).all()
+    assert jitter.finished.is_set()
+
+def test_jitter_buffer_underrun_rebuffers():
+    jitter = JitterBuffer(prebuffer_samples=100)
+    out = np.empty(80, dtype=np.int16)
+    jitter.put(0, np.ones(100, dtype=np.int16).tobytes())
+    jitter.read(out)
+    jitter.read(out) # only 20 samples left
+    assert jitter.underruns == 1 and not jitter.playing
+
+    jitter.put(1, np.ones(50, dtype=np.int16).tobytes())
+    assert jitter.read(out) == 0 # waiting for the prebuffer again
+
+def test_codec_negotiation_and_adpcm_frames():
+    from shared.audio_codec import CODECS, get_codec
+    assert protocol.negotiate_codec(["opus", "adpcm", "pcm"], CODECS) == "adpcm"
+    assert protocol.negotiate_codec(None, CODECS) == protocol.DEFAULT_CODEC
+
+    t = np.arange(4801)
+    pcm = (np.sin(t / 9) * 8000).astype(np.int16)
+    codec = get_codec("adpcm")
+    encoder = codec.encoder()
+    frames = [encoder.encode(pcm[i:i + 960].tobytes()) for i in range(0, len(pcm), 960)]
+    assert sum(len(f) for f in frames) < pcm.nbytes / 3
+
+    decoded = np.frombuffer(b"".join(codec.decoder().decode(f) for f in frames), dtype=np.int16)
+    assert len(decoded) == len(pcm) # odd-length last frame
+    assert np.abs(decoded.astype(int) - pcm).mean() < 200
+
+    # Every frame carries its decoder state, so one can be decoded without the others
+    assert codec.decoder().decode(frames[3]) == codec.decoder().decode(frames[3])
+    middle = np.frombuffer(codec.decoder().decode(frames[3]), dtype=np.int16)
+    assert (middle == decoded[2880:3840]).all()
+
+def test_clamped_cumsum_matches_a_sequential_clamp():
+    from shared.audio_codec import clamped_cumsum
+    rng = np.random.default_rng(0)
+    for n in (0, 1, 5, 64, 1000):
+        deltas = rng.integers(-3, 9, n)
+        x, expected = 40, []
+        for d in deltas:
+            x = min(max(x + d, 0), 88)
+            expected.append(x)
+        assert clamped_cumsum(40, deltas, 0, 88).tolist() == expected
+
+def test_adpcm_decoder_tracks_the_encoder_through_clipping():
+    from shared.audio_codec import get_codec
+    codec = get_codec("adpcm")
+    # Full-scale square wave: the predictor saturates and the step index hits both ends
+    pcm = np.where(np.arange(3000) % 400 < 200, 32767, -32768).astype(np.int16)
+    pcm[1500:] //= 64
+    encoder, predictors = codec.encoder(), []
+    for sample in pcm:
+        encoder.encode(sample.tobytes())
+        predictors.append(encoder.predictor)
+    decoded = np.frombuffer(codec.decoder().decode(codec.encoder().encode(pcm.tobytes())), dtype=np.int16)
+    assert decoded.tolist() == predictors
+
+def test_output_rate_negotiation():
+    assert protocol.negotiate_output_rate(48000, 24000) == 48000
+    assert protocol.negotiate_output_rate(None, 24000) == 24000
+    assert protocol.negotiate_output_rate(192000, 24000) == 24000
+    assert protocol.negotiate_output_rate("16000", 24000) == 24000
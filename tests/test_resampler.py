@@ -0,0 +1,26 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.resampler import StreamingResampler, polyphase_bank
+
+def test_resampler_streams_sentences_seamlessly():
+    t = np.arange(24000) / 24000
+    tone = (10000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    for rate in (16000, 44100, 48000):
+        resampler = StreamingResampler(24000, rate)
+        assert resampler.bank is polyphase_bank(24000, rate)[2] # built once per rate pair
+        pieces = [resampler.process(tone[i:i + 3001].tobytes()) for i in range(0, len(tone), 3001)]
+        out = np.frombuffer(b"".join(pieces) + resampler.flush(), dtype=np.int16)
+        assert len(out) == rate
+        expected = 10000 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate)
+        assert np.abs(out[100:-100] - expected[100:-100]).max() < 5
+
+def test_resampler_removes_aliases():
+    t = np.arange(24000) / 24000
+    tone = (10000 * np.sin(2 * np.pi * 10000 * t)).astype(np.int16) # above 8 kHz Nyquist
+    out = np.frombuffer(StreamingResampler(24000, 16000).process(tone.tobytes()), dtype=np.int16)
+    assert np.abs(out[100:-100]).max() < 50
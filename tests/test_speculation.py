@@ -0,0 +1,123 @@
+import sys
+import os
+import asyncio
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.conversation_memory import ConversationMemory
+from server.speculation import SpeculationController, SpeculationStats
+from server.vad_service import VADService
+from server.endpointing import Endpointer
+from server.audio_buffers import PcmRingBuffer
+
+def test_speculation_hit_miss_and_memory_fork():
+    async def run(partial, final):
+        memory = ConversationMemory("system")
+        stats = SpeculationStats()
+
+        async def preview(audio_buffer):
+            return partial
+
+        async def reply(text, memory):
+            memory.add_user(text)
+            memory.add_assistant("Sure.")
+
+        def start_reply(text, memory):
+            return asyncio.Queue(), asyncio.create_task(reply(text, memory))
+
+        controller = SpeculationController(preview, start_reply, memory, stats, silence_ms=60, stable_ms=0)
+        controller.observe(bytearray(100), 100) # pause began: partial transcription starts
+        await asyncio.sleep(0.01)
+        early = controller.resolve(final)
+        if early:
+            early.commit(memory)
+            await early.producer
+        await asyncio.sleep(0)
+        return early, stats, memory
+
+    early, stats, memory = asyncio.run(run("Turn on the lights.", "turn on the lights"))
+    assert early is not None and stats.hits == 1
+    assert [m["content"] for m in memory.messages_list] == ["Turn on the lights.", "Sure."]
+
+    early, stats, memory = asyncio.run(run("Turn on the", "Turn on the lights"))
+    assert early is None and stats.misses == 1
+    assert memory.messages_list == [] # the dropped reply never touched the history
+
+def test_partial_finishing_just_before_resolve_starts_nothing():
+    async def run():
+        partial = asyncio.get_running_loop().create_future()
+        replies = []
+
+        def start_reply(text, memory):
+            replies.append(text)
+            return asyncio.Queue(), asyncio.create_task(asyncio.sleep(0))
+
+        controller = SpeculationController(lambda audio_buffer: partial, start_reply, ConversationMemory("system"),
+                                           SpeculationStats(), silence_ms=60, stable_ms=0)
+        controller.observe(bytearray(100), 100) # the pause's partial
+        controller.stop()
+        partial.set_result("Turn on the lights.") # done, its callback still queued
+        early = controller.resolve("Turn on the lights, please.")
+        await asyncio.sleep(0.01)
+        return early, replies, controller
+
+    early, replies, controller = asyncio.run(run())
+    assert early is None and replies == [] and controller.speculation is None
+
+class LoudnessVAD(VADService):
+    """Stands in for the model: a window is speech when it is loud."""
+    def load(self):
+        pass
+
+    def infer_batch(self, sessions, frames):
+        return (np.abs(frames).mean(axis=1) > 0.1).astype(np.float32)
+
+def test_pause_partial_arriving_after_end_of_speech_still_speculates():
+    async def run():
+        memory = ConversationMemory("system")
+        stats = SpeculationStats()
+        vad = LoudnessVAD() # 100 ms of silence ends the utterance
+        session = vad.create_session()
+        endpointer = Endpointer(min_utterance_ms=100)
+        pre_roll = PcmRingBuffer.from_duration(100)
+        previews = []
+
+        async def transcribe():
+            await asyncio.sleep(0.1) # slower than the rest of the pause
+            return "Turn on the lights."
+
+        def preview(audio_buffer):
+            previews.append(len(audio_buffer))
+            return transcribe()
+
+        async def reply(text, memory):
+            memory.add_user(text)
+
+        def start_reply(text, memory):
+            return asyncio.Queue(), asyncio.create_task(reply(text, memory))
+
+        # Default settings: 60 ms pause, 300 ms stable, 500 ms between polls
+        controller = SpeculationController(preview, start_reply, memory, stats)
+        speech = np.full(320, 10000, dtype=np.int16).tobytes()
+        silence = bytes(640)
+        ended = None
+        # In real time and in the same order as the websocket loop: VAD, endpointer events, then observe
+        for chunk in [speech] * 20 + [silence] * 10:
+            await asyncio.sleep(0.02)
+            for event in endpointer.feed(chunk, session.process_chunk(chunk), pre_roll):
+                if event["type"] == "end":
+                    controller.stop()
+                    ended = event
+            if endpointer.active:
+                controller.observe(endpointer.buffer, endpointer.trailing_silence_ms(session.trailing_silence_ms))
+        # A poll at the start and one when the pause began, still in flight at the end event
+        assert ended is not None and len(previews) == 2
+
+        await asyncio.sleep(0.15) # the final transcript takes longer than the pause's partial
+        early = controller.resolve("turn on the lights")
+        return early, stats
+
+    early, stats = asyncio.run(run())
+    assert early is not None and stats.started == 1 and stats.hits == 1
@@ -0,0 +1,31 @@
+import sys
+import os
+import asyncio
+import httpx
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.stt_backends import GroqSTTBackend
+
+def test_stt_backend_retries_and_hedges():
+    calls = []
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, text="overloaded") # retried
+        if len(calls) == 2:
+            await asyncio.sleep(2) # stuck request, hedged
+        return httpx.Response(200, text="hello world\n")
+
+    async def run():
+        backend = GroqSTTBackend("key", transport=httpx.MockTransport(handler),
+                                 backoff_base=0.01, hedge_default_delay=0.05)
+        try:
+            return await backend.transcribe(b"\0\0" * 1600), backend.stats()
+        finally:
+            await backend.close()
+
+    text, stats = asyncio.run(run())
+    assert text == "hello world"
+    assert stats["retries"] == 1 and stats["hedges"] == 1 and stats["hedge_wins"] == 1
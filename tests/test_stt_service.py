@@ -0,0 +1,22 @@
+import sys
+import os
+import io
+import numpy as np
+import soundfile as sf
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.stt_service import STTUpload
+
+def test_stt_upload_streams_wav_without_copying():
+    pcm = bytearray((np.arange(5000) % 2000 - 1000).astype(np.int16).tobytes())
+    name, reader, content_type = STTUpload(pcm).file()
+    assert name == "audio.wav" and content_type == "audio/wav"
+    wav = b"".join(iter(lambda: reader.read(4096), b""))
+    audio, sample_rate = sf.read(io.BytesIO(wav), dtype="int16")
+    assert sample_rate == 16000 and audio.tobytes() == pcm
+
+    flac = STTUpload(pcm, upload_format="flac")
+    audio, _ = sf.read(io.BytesIO(flac.file()[1]), dtype="int16")
+    assert audio.tobytes() == pcm and flac.nbytes < len(wav)
@@ -0,0 +1,25 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.thread_budget import ThreadBudget
+
+def test_thread_budget_splits_cores_and_builds_session_options():
+    budget = ThreadBudget.from_env({"vad": 1, "tts": 3}, environ={"THREADS_TTS": "2:1", "PIN_THREADS": "1"})
+    budget.cpus = [0, 1, 2, 3]
+    assert (budget.threads("vad"), budget.threads("tts"), budget.total) == (1, 2, 3)
+    assert budget.cpus_for("vad") == [0] and budget.cpus_for("tts") == [1, 2]
+    assert budget.pin_cpus and not budget.oversubscribed
+
+    # 1-thread TTS workers take the cores after the VAD's, wrapping around past the last one
+    budget.assign("tts", 1, workers=4)
+    assert [budget.cpus_for("tts", i) for i in range(4)] == [[1], [2], [3], [0]]
+    assert budget.oversubscribed
+
+    budget.assign("tts", 3)
+    options = budget.session_options("tts")
+    assert (options.intra_op_num_threads, options.inter_op_num_threads) == (3, 1)
+    # The calling thread is pool thread 0; the other two go to cores 2 and 3 (1-based ids)
+    assert options.get_session_config_entry("session.intra_op_thread_affinities") == "3;4"
@@ -0,0 +1,49 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.tts_cache import TTSCache
+
+def test_tts_cache_memory_and_disk_tiers(tmp_path):
+    cache = TTSCache(str(tmp_path), max_memory_bytes=1000, model_id="m1")
+    key = cache.key("Hello   there ", "af_sarah", 1.0, "en-us")
+    assert key == cache.key("Hello there", "af_sarah", 1.0, "en-us")
+    assert cache.get(key) is None
+
+    pcm = bytes(range(200)) * 2
+    cache.put(key, pcm)
+    assert bytes(cache.get(key)) == pcm
+
+    # A fresh instance (server restart) finds the entry on disk
+    restarted = TTSCache(str(tmp_path), max_memory_bytes=1000, model_id="m1")
+    assert bytes(restarted.get(key)) == pcm
+    assert restarted.stats()["hits_disk"] == 1
+    assert TTSCache(str(tmp_path), model_id="m2").key("Hello there", "af_sarah", 1.0, "en-us") != key
+
+    # The memory tier evicts least recently used entries past its byte budget
+    for i in range(5):
+        cache.put(cache.key(f"phrase {i}", "af_sarah", 1.0, "en-us"), bytes(300))
+    assert cache.stats()["memory_bytes"] <= 1000
+
+def test_tts_cache_partitioned_between_workers(tmp_path):
+    before = TTSCache(str(tmp_path), model_id="m1")
+    keys = [before.key(f"phrase {i}", "af_sarah", 1.0, "en-us") for i in range(8)]
+    for key in keys:
+        before.put(key, bytes(100))
+
+    # Forked workers all start from the cache loaded before the fork
+    workers = [TTSCache(str(tmp_path), max_memory_bytes=1000, max_disk_bytes=4000, model_id="m1") for _ in range(2)]
+    for index, worker in enumerate(workers):
+        worker.partition(index, 2)
+    assert [(w.max_memory_bytes, w.max_disk_bytes) for w in workers] == [(500, 2000)] * 2
+    # Every existing file has exactly one owner
+    assert sorted(list(workers[0].disk) + list(workers[1].disk)) == sorted(keys)
+    assert workers[0].disk_bytes + workers[1].disk_bytes == 800
+
+    # A phrase one worker synthesized is a disk hit for the other, which leaves it to its owner
+    key = before.key("new phrase", "af_sarah", 1.0, "en-us")
+    workers[0].put(key, bytes(200))
+    assert bytes(workers[1].get(key)) == bytes(200)
+    assert workers[1].stats()["hits_disk"] == 1 and key not in workers[1].disk and key in workers[0].disk
@@ -0,0 +1,61 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.executor import StageExecutor
+from server.tts_scheduler import TTSScheduler
+
+def test_scheduler_coalesces_identical_sentences_in_the_window():
+    executor = StageExecutor()
+    executor.add_stage("tts", 1)
+    batches = []
+
+    def batch_fn(keys):
+        batches.append([text for text, _ in keys])
+        return [text.encode() for text, _ in keys]
+
+    scheduler = TTSScheduler(None, executor, window_ms=20, max_batch=2, batch_fn=batch_fn)
+
+    async def run():
+        # Four sessions within one window, two of them saying the same thing
+        return await asyncio.gather(*(scheduler.synthesize(text) for text in ("Hello.", "Sure.", "Hello.", "One moment.")))
+
+    try:
+        assert asyncio.run(run()) == [b"Hello.", b"Sure.", b"Hello.", b"One moment."]
+    finally:
+        executor.shutdown()
+    # One inference per distinct sentence, batched in arrival order
+    assert batches == [["Hello.", "Sure."], ["One moment."]]
+    assert scheduler.stats() == {"requests": 4, "coalesced": 1, "jobs": 2, "waiting": 0, "inflight": 0}
+
+def test_scheduler_serves_sessions_in_turn_when_the_pool_is_busy():
+    executor = StageExecutor()
+    executor.add_stage("tts", 1)
+    order = []
+
+    def synthesize(text, voice):
+        order.append(text)
+        time.sleep(0.05)
+        return text.encode()
+
+    scheduler = TTSScheduler(synthesize, executor, window_ms=10)
+
+    async def session(name):
+        # Like a reply: the next sentence is requested once the previous one is back
+        for i in range(3):
+            assert await scheduler.synthesize(f"{name}{i}") == f"{name}{i}".encode()
+
+    async def run():
+        await asyncio.gather(session("a"), session("b"), session("c"))
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+    # A session's next sentence queues behind the ones the others are already waiting on
+    assert order == ["a0", "b0", "c0", "a1", "b1", "c1", "a2", "b2", "c2"]
+    assert scheduler.jobs == 9 and scheduler.coalesced == 0
@@ -0,0 +1,117 @@
+import sys
+import os
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# The server with the offline stand-ins benchmarks/load_test.py uses
+for name, value in {"STT_BACKEND": "fake", "LLM_BACKEND": "fake", "TTS_BACKEND": "stub", "FAKE_STT_MS": "5",
+                    "FAKE_LLM_FIRST_TOKEN_MS": "5", "FAKE_LLM_TOKEN_MS": "0", "FAKE_TTS_MS": "5",
+                    "SPECULATION": "0", "ACK_CLIPS": "0", "TTS_CACHE_DIR": ""}.items():
+    os.environ.setdefault(name, value)
+
+from shared import protocol
+from server import main
+from server.audio_stream import FrameSender
+
+class RecordingSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_bytes(self, data):
+        self.frames.append(protocol.unpack_frame(data))
+
+    def controls(self):
+        return [protocol.parse_control(f)[protocol.KEY_TYPE] for f in self.frames if f.kind == protocol.FRAME_CONTROL]
+
+def test_barge_in_cancels_the_reply_in_flight():
+    socket = RecordingSocket()
+    link = FrameSender(socket, 1)
+    memory = main.llm_service.create_memory()
+    interrupts = main.interrupts.value
+
+    async def run():
+        turn = asyncio.create_task(main.run_turn(link, bytearray(16000), memory))
+        while not any(f.kind == protocol.FRAME_AUDIO for f in socket.frames):
+            await asyncio.sleep(0.001)
+        await main.interrupt_turn(link, turn)
+        return turn
+
+    turn = asyncio.run(run())
+    assert turn.cancelled()
+    assert socket.controls() == [protocol.MSG_INTERRUPT]
+    assert main.interrupts.value == interrupts + 1
+
+def test_compaction_is_not_part_of_the_turn():
+    socket = RecordingSocket()
+    link = FrameSender(socket, 1)
+    memory = main.llm_service.create_memory()
+    interrupts = main.interrupts.value
+    release = None
+    compactions = []
+
+    async def slow_compact(memory):
+        compactions.append("started")
+        await release.wait()
+        compactions.append("done")
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        turn = asyncio.create_task(main.run_turn(link, bytearray(16000), memory))
+        # The turn ends with the reply, while the summary is still being written
+        await asyncio.wait_for(turn, 5)
+        assert compactions == ["started"]
+        # Speech now has no reply to interrupt, and leaves the compaction running
+        await main.interrupt_turn(link, turn)
+        release.set()
+        await main._compactions[id(memory)]
+
+    original, main.llm_service.compact = main.llm_service.compact, slow_compact
+    try:
+        asyncio.run(run())
+    finally:
+        main.llm_service.compact = original
+    assert compactions == ["started", "done"]
+    assert protocol.MSG_INTERRUPT not in socket.controls() and main.interrupts.value == interrupts
+
+class ScriptedSocket(RecordingSocket):
+    """A client sending the given messages (bytes or text), then hanging up."""
+    def __init__(self, messages):
+        super().__init__()
+        self.messages = list(messages)
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if not self.messages:
+            return {"type": "websocket.disconnect", "code": 1000}
+        message = self.messages.pop(0)
+        key = "bytes" if isinstance(message, bytes) else "text"
+        return {"type": "websocket.receive", key: message}
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+def test_malformed_frames_are_dropped_and_the_session_goes_on():
+    hello = protocol.pack_control(protocol.MSG_HELLO, codecs=["adpcm"])
+    socket = ScriptedSocket([
+        hello[:10], # truncated header
+        protocol.pack_frame(protocol.FRAME_AUDIO, b"\x01\x02\x03", 0), # odd-length PCM
+        protocol.pack_frame(protocol.FRAME_CONTROL, b"{not json", 0),
+        protocol.pack_frame(protocol.FRAME_CONTROL, b"[1, 2]", 0),
+        hello,
+        protocol.pack_frame(protocol.FRAME_AUDIO, b"\x01", 0), # shorter than an ADPCM header
+        hello,
+    ])
+    asyncio.run(main.websocket_endpoint(socket))
+    assert socket.controls() == [protocol.MSG_HELLO, protocol.MSG_HELLO]
+    assert socket.close_code is None
+
+def test_text_messages_close_the_connection():
+    socket = ScriptedSocket(["hello", protocol.pack_control(protocol.MSG_HELLO)])
+    asyncio.run(main.websocket_endpoint(socket))
+    assert socket.close_code == 1003 and socket.controls() == []
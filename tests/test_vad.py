@@ -0,0 +1,69 @@
+import sys
+import os
+import asyncio
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.vad_service import VADService, OnnxVADService, VADScheduler, create_vad_service
+
+class LoudnessVAD(VADService):
+    """Stands in for the model: a window is speech when it is loud."""
+    def load(self):
+        pass
+
+    def infer_batch(self, sessions, frames):
+        return (np.abs(frames).mean(axis=1) > 0.1).astype(np.float32)
+
+def windows(*loud):
+    return b"".join(np.full(512, 10000 if l else 0, dtype=np.int16).tobytes() for l in loud)
+
+def test_is_speech_per_window():
+    vad = LoudnessVAD()
+    audio = windows(0, 1, 1, 0)
+    # A chunk that is not a whole number of windows keeps the rest for the next call
+    assert vad.is_speech(audio[:2100]).tolist() == [False, True]
+    assert vad.is_speech(audio[2100:]).tolist() == [True, False]
+    assert vad.is_speech(b"").tolist() == []
+
+def test_process_chunk_events():
+    vad = LoudnessVAD(min_silence_duration_ms=64)
+    assert vad.process_chunk(windows(0, 1)) == [{'start': 0.0}]
+    assert vad.process_chunk(windows(1, 0)) == []
+    assert [list(e) for e in vad.process_chunk(windows(0, 0))] == [['end']]
+    # A blip, a pause and the speech after it in one chunk come back in the order they happened
+    events = LoudnessVAD(min_silence_duration_ms=64).process_chunk(windows(1, 0, 0, 0, 1))
+    assert [next(iter(e)) for e in events] == ['start', 'end', 'start']
+
+def test_scheduler_batches_one_window_per_session_round_robin():
+    batches = []
+
+    class RecordingVAD(LoudnessVAD):
+        def infer_batch(self, sessions, frames):
+            batches.append([names[s] for s in sessions])
+            return super().infer_batch(sessions, frames)
+
+    vad = RecordingVAD(min_silence_duration_ms=32)
+    scheduler = VADScheduler(vad, max_batch_size=2, max_wait_ms=1)
+    audio = {"a": windows(1, 1, 1), "b": windows(0, 0, 0), "c": windows(1, 0, 0)}
+    names = {vad.create_session(): name for name in audio}
+
+    async def run():
+        return await asyncio.gather(*(scheduler.process_chunk(s, audio[name]) for s, name in names.items()))
+
+    events = asyncio.run(run())
+    # Sessions past max_batch_size take their turn instead of waiting for the first ones to finish
+    assert batches == [["a", "b"], ["c", "a"], ["b", "c"], ["a", "b"], ["c"]]
+    assert events == [[{'start': 0.0}], [], [{'start': 0.0}, {'end': 0.1}]]
+    assert scheduler.depth() == 0
+
+def test_onnx_backend_loads_lazily(tmp_path):
+    missing = str(tmp_path / "silero_vad.onnx")
+    vad = create_vad_service("onnx", model_path=missing) # no model needed yet
+    assert isinstance(vad, OnnxVADService) and vad.session is None
+    with pytest.raises(FileNotFoundError):
+        vad.process_chunk(windows(0))
+    with pytest.raises(ValueError):
+        create_vad_service("webrtc")
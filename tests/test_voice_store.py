@@ -0,0 +1,29 @@
+import sys
+import os
+import json
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.voice_store import VoiceStore, convert_json, convert_npz
+
+def test_voice_store_streams_json_into_memmap(tmp_path):
+    rng = np.random.default_rng(0)
+    voices = {"af_sarah": rng.standard_normal((5, 1, 8)), "am_adam": rng.standard_normal((5, 1, 8))}
+    with open(tmp_path / "voices.json", "w") as f:
+        json.dump({name: v.tolist() for name, v in voices.items()}, f)
+
+    # Chunks far smaller than one list make every token straddle a read
+    assert convert_json(str(tmp_path / "voices.json"), str(tmp_path / "voices.index.npz"), chunk_chars=7) == 2
+    store = VoiceStore(str(tmp_path / "voices.index.npz"))
+    assert store.keys() == ["af_sarah", "am_adam"] and "am_adam" in store
+    assert isinstance(store["am_adam"], np.memmap) and store["am_adam"].shape == (5, 1, 8)
+    for name, v in voices.items():
+        assert np.allclose(store[name], v)
+
+    np.savez(tmp_path / "old.npz", **voices)
+    assert not VoiceStore.is_store(str(tmp_path / "old.npz"))
+    convert_npz(str(tmp_path / "old.npz"), str(tmp_path / "old.index.npz"))
+    assert VoiceStore.is_store(str(tmp_path / "old.index.npz"))
+    assert np.allclose(VoiceStore(str(tmp_path / "old.index.npz"))["af_sarah"], voices["af_sarah"])
@@ -0,0 +1,95 @@
+import sys
+import os
+import time
+import asyncio
+import pytest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from server.executor import StageExecutor
+from server.worker_pool import ForkedWorkerPool
+
+_forked_state = {}
+
+def _load_forked_state(value):
+    _forked_state["loaded"] = value
+
+def _forked_worker_init(index):
+    _forked_state["worker"] = index
+
+def _forked_job(kind):
+    if kind == "worker":
+        return _forked_state.get("worker")
+    if kind == "pcm":
+        return _forked_state["loaded"] * 3
+    if kind == "fail":
+        raise ValueError("bad text")
+    return os.getpid()
+
+def test_forked_pool_shares_initializer_and_returns_pcm_through_shm():
+    async def run():
+        executor = StageExecutor()
+        executor.add_stage("tts", 2, kind="fork", initializer=_load_forked_state, initargs=(b"\x01\x02",),
+                           worker_init=_forked_worker_init)
+        pool = executor.pool("tts")
+        # Loaded once, here, before the workers were forked
+        assert _forked_state["loaded"] == b"\x01\x02"
+        assert await executor.run("tts", _forked_job, "pcm") == b"\x01\x02" * 3
+        assert pool.shm_bytes == 6
+        assert await executor.run("tts", _forked_job, "pid") != os.getpid()
+        assert await executor.run("tts", _forked_job, "worker") in (0, 1)
+        assert "worker" not in _forked_state
+        try:
+            await executor.run("tts", _forked_job, "fail")
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert str(e) == "bad text"
+        executor.shutdown(wait=True)
+        assert not any(worker.is_alive() for worker in pool.workers)
+
+    asyncio.run(run())
+
+def _exit_worker():
+    os._exit(3) # like an OOM kill: no result, no exception
+
+def test_forked_pool_breaks_when_a_worker_dies():
+    pool = ForkedWorkerPool(2)
+    assert pool.submit(_forked_job, "pid").result(timeout=10) != os.getpid()
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(_exit_worker).result(timeout=10)
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(_forked_job, "pid")
+    pool.shutdown(wait=True)
+    assert not any(worker.is_alive() for worker in pool.workers)
+
+def test_forked_pool_reader_survives_a_lost_shm_block():
+    pool = ForkedWorkerPool(1)
+    # A result naming a block that does not exist fails that job only
+    with pool.lock:
+        pool.futures[-1] = lost = Future()
+    pool.results.put((-1, "shm", ("no-such-block", 10)))
+    with pytest.raises(FileNotFoundError):
+        lost.result(timeout=10)
+    assert pool.submit(_forked_job, "fail").exception(timeout=10).args == ("bad text",)
+    pool.shutdown(wait=True)
+
+def _slow_job(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+def _touch(path):
+    open(path, "w").close()
+
+def test_forked_pool_skips_jobs_cancelled_while_queued(tmp_path):
+    pool = ForkedWorkerPool(1)
+    busy = pool.submit(_slow_job, 0.3)
+    queued = pool.submit(_touch, str(tmp_path / "ran"))
+    assert queued.cancel() # still waiting behind the busy worker
+    after = pool.submit(_forked_job, "pid")
+    assert busy.result(timeout=10) == after.result(timeout=10)
+    assert not (tmp_path / "ran").exists()
+    assert not pool.futures # the skipped job was accounted for
+    pool.shutdown(wait=True)